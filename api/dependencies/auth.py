@@ -1,34 +1,91 @@
 # api/dependencies.py
+import asyncio
+from typing import Optional
+
 from fastapi import Depends, HTTPException, status
+from fastapi.security import HTTPAuthorizationCredentials, HTTPBearer
 from sqlalchemy.orm import Session
+
+from core import auth, config, invalidation
+from core.cache import LocalCache
+from db import statements
 from db.session import get_db
-from db.models.appointment_models import Doctor, Patient
 
-async def get_current_user_id():
-        
-    return 1
+bearer_scheme = HTTPBearer(auto_error=False)
+
+# Only existing ids are cached (a miss raises, so nothing is stored); doctor
+# entries are dropped when the doctor changes, patients just age out.
+_doctor_exists = LocalCache(
+    "auth_doctor_exists",
+    maxsize=config.AUTH_TOKEN_CACHE_SIZE,
+    ttl=config.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+    topics=(invalidation.DOCTOR,),
+)
+_patient_exists = LocalCache(
+    "auth_patient_exists",
+    maxsize=config.AUTH_TOKEN_CACHE_SIZE,
+    ttl=config.AUTH_PRINCIPAL_CACHE_TTL_SECONDS,
+)
+
+
+def _unauthorized(detail: str) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_401_UNAUTHORIZED, detail=detail, headers={"WWW-Authenticate": "Bearer"}
+    )
+
+
+async def get_current_principal(
+    credentials: Optional[HTTPAuthorizationCredentials] = Depends(bearer_scheme),
+) -> auth.Principal:
+    if credentials is None:
+        raise _unauthorized("Not authenticated")
+    token = credentials.credentials
+    principal = auth.cached_principal(token)
+    if principal is not None:
+        return principal
+    try:
+        kid = auth.key_id(token)
+        if auth.keys.needs_refresh(kid):
+            await asyncio.to_thread(auth.keys.refresh)
+        return auth.verify(token)
+    except auth.InvalidToken as exc:
+        raise _unauthorized(str(exc))
+
+async def get_current_user_id(principal: auth.Principal = Depends(get_current_principal)) -> int:
+    return principal.user_id
 
-async def get_current_user_type():
-        
-    return "patient"
+async def get_current_user_type(principal: auth.Principal = Depends(get_current_principal)) -> str:
+    return principal.user_type
 
 
-async def get_current_doctor(doctor_id: int, db: Session = Depends(get_db)) -> Doctor:
-    doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
-    if not doctor:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Doctor not found")
-    return doctor
+def _exists(db: Session, statement, param: str, entity_id: int, label: str) -> bool:
+    if db.execute(statement, {param: entity_id}).first() is None:
+        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail=f"{label} not found")
+    return True
 
-async def get_current_patient(patient_id: int, db: Session = Depends(get_db)) -> Patient:
-    patient = db.query(Patient).filter(Patient.id == patient_id).first()
-    if not patient:
-        raise HTTPException(status_code=status.HTTP_404_NOT_FOUND, detail="Patient not found")
-    return patient
 
-# More realistic (but requires full auth setup):
-# from fastapi.security import OAuth2PasswordBearer
-# oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/token") # Example token URL
+def get_current_doctor(
+    principal: auth.Principal = Depends(get_current_principal), db: Session = Depends(get_db)
+) -> int:
+    """
+    Id of the authenticated doctor; the existence check is usually served from
+    the cache. Sync on purpose: a cache miss queries the DB, so FastAPI runs this
+    in its threadpool rather than on the event loop.
+    """
+    if principal.user_type != auth.DOCTOR:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Doctor account required")
+    _doctor_exists.get_or_load(
+        principal.user_id, lambda: _exists(db, statements.DOCTOR_EXISTS, "doctor_id", principal.user_id, "Doctor")
+    )
+    return principal.user_id
 
-# async def get_current_active_doctor(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-#     # ... (JWT decoding and user lookup logic) ...
-#     pass
\ No newline at end of file
+def get_current_patient(
+    principal: auth.Principal = Depends(get_current_principal), db: Session = Depends(get_db)
+) -> int:
+    """Id of the authenticated patient; the existence check is usually served from the cache."""
+    if principal.user_type != auth.PATIENT:
+        raise HTTPException(status_code=status.HTTP_403_FORBIDDEN, detail="Patient account required")
+    _patient_exists.get_or_load(
+        principal.user_id, lambda: _exists(db, statements.PATIENT_EXISTS, "patient_id", principal.user_id, "Patient")
+    )
+    return principal.user_id
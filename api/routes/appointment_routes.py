@@ -1,18 +1,24 @@
 # api/routes/appointment_routes.py
-from fastapi import APIRouter, Depends, HTTPException, status
+from fastapi import APIRouter, Depends, HTTPException, Query, status
 from sqlalchemy.orm import Session, selectinload # Make sure selectinload is imported if used directly here
-from typing import List
+from typing import List, Optional
+from datetime import date
 
 from db.session import get_db
 from services import appointment_service # Main service
+from services import dashboard_service
+from services import export_service
+from utils.export import streaming_export
 from db.models.appointment_models import ( # Import models if directly querying here
     Appointment as AppointmentModel,
     Doctor as DoctorModel
 )
 from api.schemas.appointment_schemas import (
     AppointmentDetailsSchema,
+    AppointmentDetailsBatchSchema,
     AppointmentSchema,
-    DoctorAppointmentViewSchema
+    DoctorAppointmentViewSchema,
+    DoctorDashboardSchema
 )
 
 router = APIRouter(
@@ -26,6 +32,11 @@ def read_all_appointments_with_details(db: Session = Depends(get_db)):
     appointments_details = appointment_service.get_all_detailed_appointments(db=db)
     return appointments_details
 
+# Endpoint for several appointments' details in one round trip: /details/batch?ids=1&ids=2
+@router.get("/details/batch", response_model=AppointmentDetailsBatchSchema)
+def read_appointments_details_batch(ids: List[int] = Query(...), db: Session = Depends(get_db)):
+    return appointment_service.get_detailed_appointments_by_ids(db=db, appointment_ids=ids)
+
 # Endpoint for a specific patient's detailed appointments
 @router.get("/patient/{patient_id}/details", response_model=List[AppointmentDetailsSchema])
 def read_patient_appointments_with_details(patient_id: int, db: Session = Depends(get_db)):
@@ -38,6 +49,33 @@ def read_doctor_appointments_with_details(doctor_id: int, db: Session = Depends(
     appointments_details = appointment_service.get_detailed_appointments_for_doctor(db=db, doctor_id=doctor_id)
     return appointments_details
 
+# Endpoint for a doctor's dashboard: aggregate counts instead of the full appointment list
+@router.get("/doctor/{doctor_id}/dashboard", response_model=DoctorDashboardSchema)
+def read_doctor_dashboard(
+    doctor_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    return dashboard_service.get_doctor_dashboard(db=db, doctor_id=doctor_id, date_from=date_from, date_to=date_to)
+
+# Bulk export for analytics, streamed as csv / ndjson / parquet; resume with after_id=<last id received>
+@router.get("/export")
+def export_appointments(
+    format: str = "csv",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+    institution_id: Optional[int] = None,
+    after_id: Optional[int] = None
+):
+    rows = export_service.iter_appointments(
+        date_from=date_from, date_to=date_to, doctor_id=doctor_id, institution_id=institution_id, after_id=after_id
+    )
+    return streaming_export(
+        "appointments", format, export_service.APPOINTMENT_COLUMNS, rows, export_service.APPOINTMENT_COLUMN_TYPES
+    )
+
 # Original simple list of all appointments (basic info)
 @router.get("/", response_model=List[AppointmentSchema])
 def read_all_appointments_simple(db: Session = Depends(get_db)):
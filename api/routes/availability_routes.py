@@ -0,0 +1,48 @@
+# api/routes/availability_routes.py
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query, Request, Response
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import DoctorCalendarSchema, SlotSearchResultSchema
+from db.session import get_db
+from services import availability_service
+
+router = APIRouter(
+    prefix="/doctors",
+    tags=["Availability"]
+)
+
+# "Soonest appointment near me": earliest free slots across all doctors of a specialty
+@router.get("/earliest-slots", response_model=List[SlotSearchResultSchema])
+def search_earliest_slots(
+    specialty_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    latitude: Optional[float] = Query(None, ge=-90, le=90),
+    longitude: Optional[float] = Query(None, ge=-180, le=180),
+    radius_km: Optional[float] = Query(None, gt=0, le=500),
+    limit: int = Query(10, ge=1, le=50),
+    db: Session = Depends(get_db)
+):
+    return availability_service.search_earliest_slots(
+        db=db, specialty_id=specialty_id, date_from=date_from, date_to=date_to,
+        latitude=latitude, longitude=longitude, radius_km=radius_km, limit=limit
+    )
+
+# Month view for the booking UI: per-day available slot counts and first free time, in one request.
+# Clients should send If-None-Match with the last ETag; unchanged calendars answer 304.
+@router.get("/{doctor_id}/calendar", response_model=DoctorCalendarSchema)
+def read_doctor_calendar(
+    doctor_id: int,
+    request: Request,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    db: Session = Depends(get_db)
+):
+    calendar = availability_service.get_doctor_calendar(db=db, doctor_id=doctor_id, date_from=date_from, date_to=date_to)
+    headers = {"ETag": calendar.etag, "Cache-Control": "private, no-cache"}
+    if calendar.etag in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+    return Response(content=calendar.body, media_type="application/json", headers=headers)
@@ -0,0 +1,53 @@
+# api/routes/directory_routes.py
+from datetime import date
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Query
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import (
+    DoctorBatchSchema,
+    DoctorProfileSchema,
+    HealthInstitutionBatchSchema,
+    HealthInstitutionSchema,
+    TimeSlot as TimeSlotSchema
+)
+from db.session import get_db
+from services import directory_service
+
+router = APIRouter(
+    tags=["Directory"]
+)
+
+# Doctor list for the app's list views; ?fields=id,first_name,photo_url limits columns and payload
+@router.get("/doctors")
+def read_doctors(fields: Optional[str] = None, db: Session = Depends(get_db)):
+    return JSONResponse(directory_service.list_doctors(db=db, fields=fields))
+
+# Patient list; same ?fields= selection as /doctors
+@router.get("/patients")
+def read_patients(fields: Optional[str] = None, db: Session = Depends(get_db)):
+    return JSONResponse(directory_service.list_patients(db=db, fields=fields))
+
+# Several doctors in one round trip: /doctors/batch?ids=1&ids=2; declared before /doctors/{doctor_id}
+@router.get("/doctors/batch", response_model=DoctorBatchSchema)
+def read_doctors_batch(ids: List[int] = Query(...), db: Session = Depends(get_db)):
+    return directory_service.get_doctors_by_ids(db=db, doctor_ids=ids)
+
+# Profile and free slots of one doctor; concurrent identical requests share one query
+@router.get("/doctors/{doctor_id}", response_model=DoctorProfileSchema)
+def read_doctor(doctor_id: int, db: Session = Depends(get_db)):
+    return directory_service.get_doctor(db, doctor_id)
+
+@router.get("/doctors/{doctor_id}/slots", response_model=List[TimeSlotSchema])
+def read_doctor_slots(doctor_id: int, date: Optional[date] = None, db: Session = Depends(get_db)):
+    return directory_service.get_available_slots(db, doctor_id, date)
+
+@router.get("/health-institutions/batch", response_model=HealthInstitutionBatchSchema)
+def read_health_institutions_batch(ids: List[int] = Query(...), db: Session = Depends(get_db)):
+    return directory_service.get_health_institutions_by_ids(db=db, institution_ids=ids)
+
+@router.get("/health-institutions/{institution_id}", response_model=HealthInstitutionSchema)
+def read_health_institution(institution_id: int, db: Session = Depends(get_db)):
+    return directory_service.get_health_institution(db=db, institution_id=institution_id)
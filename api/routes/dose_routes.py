@@ -0,0 +1,24 @@
+# api/routes/dose_routes.py
+from typing import List
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import MedicationDoseDueSchema
+from core import config
+from db.session import get_db
+from services import dose_schedule
+
+router = APIRouter(
+    prefix="/patients",
+    tags=["Medication doses"]
+)
+
+# A patient's medication doses due in the next `hours` hours, in time order
+@router.get("/{patient_id}/doses/due", response_model=List[MedicationDoseDueSchema])
+def read_doses_due(
+    patient_id: int,
+    hours: int = Query(24, ge=1, le=config.MEDICATION_DOSE_DUE_MAX_HOURS),
+    db: Session = Depends(get_db)
+):
+    return dose_schedule.get_doses_due(db=db, patient_id=patient_id, hours=hours)
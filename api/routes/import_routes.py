@@ -0,0 +1,18 @@
+# api/routes/import_routes.py
+from typing import Optional
+
+from fastapi import APIRouter, File, UploadFile
+
+from services import import_service
+
+router = APIRouter(
+    prefix="/imports",
+    tags=["Imports"]
+)
+
+# Institution onboarding: bulk load doctors, working_hours or time_slots from a CSV / NDJSON upload.
+# Invalid rows are listed in the report; the rest of the file is still imported.
+@router.post("/{entity}")
+def bulk_import(entity: str, file: UploadFile = File(...), format: Optional[str] = None):
+    fmt = format or ("ndjson" if (file.filename or "").endswith((".ndjson", ".jsonl")) else "csv")
+    return import_service.import_rows(file.file, entity, fmt)
@@ -0,0 +1,36 @@
+# api/routes/ops_routes.py
+from fastapi import APIRouter, Response
+
+from core import config, metrics, singleflight, sql_profiler
+
+router = APIRouter(tags=["Operations"])
+
+
+@router.get("/debug/sql-profile")
+def read_sql_profile():
+    """
+    Per-route SQL statistics aggregated from sampled requests (SQL_PROFILING=prod).
+    """
+    return {
+        "mode": config.SQL_PROFILING,
+        "sample_rate": config.SQL_PROFILING_SAMPLE_RATE,
+        "n_plus_one_threshold": config.SQL_N_PLUS_ONE_THRESHOLD,
+        "routes": sql_profiler.get_route_stats(),
+    }
+
+
+@router.get("/debug/singleflight")
+def read_singleflight_stats():
+    """
+    Request coalescing per group, with the busiest keys of this worker process.
+    """
+    return singleflight.get_stats()
+
+
+@router.get("/metrics", include_in_schema=False)
+def read_metrics():
+    """
+    Prometheus exposition of request, DB pool, cache and push metrics (aggregated over workers).
+    """
+    payload, content_type = metrics.render_latest()
+    return Response(content=payload, media_type=content_type)
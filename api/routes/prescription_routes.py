@@ -0,0 +1,30 @@
+# api/routes/prescription_routes.py
+from datetime import date
+from typing import Optional
+
+from fastapi import APIRouter
+
+from services import export_service
+from utils.export import streaming_export
+
+router = APIRouter(
+    prefix="/prescriptions",
+    tags=["Prescriptions"]
+)
+
+# Bulk export for analytics, streamed as csv / ndjson / parquet; resume with after_id=<last id received>
+@router.get("/export")
+def export_prescriptions(
+    format: str = "csv",
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+    institution_id: Optional[int] = None,
+    after_id: Optional[int] = None
+):
+    rows = export_service.iter_prescriptions(
+        date_from=date_from, date_to=date_to, doctor_id=doctor_id, institution_id=institution_id, after_id=after_id
+    )
+    return streaming_export(
+        "prescriptions", format, export_service.PRESCRIPTION_COLUMNS, rows, export_service.PRESCRIPTION_COLUMN_TYPES
+    )
@@ -0,0 +1,24 @@
+# api/routes/timeline_routes.py
+from typing import Optional
+
+from fastapi import APIRouter, Depends, Query
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import PatientTimelineSchema
+from db.session import get_db
+from services import timeline_service
+
+router = APIRouter(
+    prefix="/patients",
+    tags=["Timeline"]
+)
+
+# A patient's appointments and prescriptions in one list, newest first; pass next_cursor back as cursor
+@router.get("/{patient_id}/timeline", response_model=PatientTimelineSchema)
+def read_patient_timeline(
+    patient_id: int,
+    limit: int = Query(20, ge=1, le=100),
+    cursor: Optional[str] = None,
+    db: Session = Depends(get_db)
+):
+    return timeline_service.get_patient_timeline(db=db, patient_id=patient_id, limit=limit, cursor=cursor)
@@ -0,0 +1,61 @@
+# api/routes/waitlist_routes.py
+from typing import List, Optional
+
+from fastapi import APIRouter, Depends, Header, status
+from sqlalchemy.orm import Session
+
+from api.dependencies.auth import get_current_patient
+from api.schemas.appointment_schemas import WaitlistEntrySchema, WaitlistJoinRequest
+from db.session import get_db
+from services import waitlist_service
+from services.idempotency_service import HEADER as IDEMPOTENCY_HEADER, IdempotentRequest
+
+router = APIRouter(
+    prefix="/waitlist",
+    tags=["Waitlist"]
+)
+
+# Join the queue for a doctor on a day (optionally a time window); freed slots are offered in join order.
+# A retry with the same Idempotency-Key gets the original response back.
+@router.post("", response_model=WaitlistEntrySchema, status_code=status.HTTP_201_CREATED)
+def join_waitlist(
+    request: WaitlistJoinRequest,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    patient_id: int = Depends(get_current_patient),
+    db: Session = Depends(get_db)
+):
+    idem = IdempotentRequest(db, f"POST /waitlist patient:{patient_id}", idempotency_key, request)
+    if idem.replay is not None:
+        return idem.replay
+    return waitlist_service.join_waitlist(
+        db=db, patient_id=patient_id, doctor_id=request.doctor_id, day=request.date,
+        window_start=request.window_start, window_end=request.window_end, idem=idem,
+    )
+
+# The patient's waiting entries and pending offers
+@router.get("", response_model=List[WaitlistEntrySchema])
+def read_my_waitlist(patient_id: int = Depends(get_current_patient), db: Session = Depends(get_db)):
+    return waitlist_service.get_patient_entries(db=db, patient_id=patient_id)
+
+# Book the slot held for this entry (before offer_expires_at); also honours Idempotency-Key
+@router.post("/{entry_id}/accept", response_model=WaitlistEntrySchema)
+def accept_offer(
+    entry_id: int,
+    idempotency_key: Optional[str] = Header(None, alias=IDEMPOTENCY_HEADER),
+    patient_id: int = Depends(get_current_patient),
+    db: Session = Depends(get_db)
+):
+    idem = IdempotentRequest(db, f"POST /waitlist/{entry_id}/accept patient:{patient_id}", idempotency_key, None)
+    if idem.replay is not None:
+        return idem.replay
+    return waitlist_service.accept_offer(db=db, entry_id=entry_id, patient_id=patient_id, idem=idem)
+
+# Turn the offer down; the slot goes to the next patient in the queue
+@router.post("/{entry_id}/decline", response_model=WaitlistEntrySchema)
+def decline_offer(entry_id: int, patient_id: int = Depends(get_current_patient), db: Session = Depends(get_db)):
+    return waitlist_service.decline_offer(db=db, entry_id=entry_id, patient_id=patient_id)
+
+@router.delete("/{entry_id}", status_code=status.HTTP_204_NO_CONTENT)
+def leave_waitlist(entry_id: int, patient_id: int = Depends(get_current_patient), db: Session = Depends(get_db)):
+    waitlist_service.leave_waitlist(db=db, entry_id=entry_id, patient_id=patient_id)
+    return None
@@ -178,4 +178,174 @@ class AppointmentSchema(BaseModel):
     status: str
     qr_code_url: Optional[str] = None
 
-    model_config = ConfigDict(from_attributes=True) # Pydantic v2 style
\ No newline at end of file
+    model_config = ConfigDict(from_attributes=True) # Pydantic v2 style
+
+
+# --- Doctor dashboard ---
+class DashboardStatusCounts(BaseModel):
+    pending: int = 0
+    confirmed: int = 0
+    completed: int = 0
+    declined: int = 0
+    total: int = 0
+
+class DashboardDaySchema(DashboardStatusCounts):
+    date: date
+
+class DashboardNextAppointmentSchema(BaseModel):
+    appointment_id: int
+    appointment_status: str
+    date: date
+    start_time: time
+    end_time: time
+
+class DashboardSlotUtilizationSchema(BaseModel):
+    total: int
+    booked: int
+    available: int
+    utilization: float  # booked / total, 0.0 when there are no slots
+
+class DoctorDashboardSchema(BaseModel):
+    doctor_id: int
+    date_from: date
+    date_to: date
+    totals: DashboardStatusCounts
+    by_day: List[DashboardDaySchema]
+    next_appointment: Optional[DashboardNextAppointmentSchema] = None
+    slots: DashboardSlotUtilizationSchema
+
+
+# --- Batch lookups: results keyed by id, null (and listed in not_found) when missing ---
+class AppointmentDetailsBatchSchema(BaseModel):
+    results: Dict[int, Optional[AppointmentDetailsSchema]]
+    not_found: List[int]
+
+class DoctorProfileSchema(BaseModel):
+    id: int
+    first_name: str
+    last_name: str
+    photo_url: Optional[str] = None
+    email: str
+    specialty_id: Optional[int] = None
+    health_institution_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class DoctorBatchSchema(BaseModel):
+    results: Dict[int, Optional[DoctorProfileSchema]]
+    not_found: List[int]
+
+class HealthInstitutionSchema(BaseModel):
+    id: int
+    name: str
+    address: Optional[str] = None
+    latitude: Optional[Decimal] = None
+    longitude: Optional[Decimal] = None
+    type: Optional[str] = None
+
+    model_config = ConfigDict(from_attributes=True)
+
+class HealthInstitutionBatchSchema(BaseModel):
+    results: Dict[int, Optional[HealthInstitutionSchema]]
+    not_found: List[int]
+
+
+# --- Doctor availability calendar (days without slots are omitted) ---
+class CalendarDaySchema(BaseModel):
+    date: date
+    total: int
+    available: int
+    first_available: Optional[time] = None
+
+class DoctorCalendarSchema(BaseModel):
+    doctor_id: int
+    date_from: date
+    date_to: date
+    days: List[CalendarDaySchema]
+
+
+# --- Earliest available slot search ---
+class SlotSearchDoctorSchema(BaseModel):
+    doctor_id: int
+    first_name: str
+    last_name: str
+    photo_url: Optional[str] = None
+
+class SlotSearchInstitutionSchema(BaseModel):
+    id: int
+    name: str
+    address: Optional[str] = None
+    latitude: Optional[Decimal] = None
+    longitude: Optional[Decimal] = None
+
+class SlotSearchResultSchema(BaseModel):
+    time_slot_id: int
+    date: date
+    start_time: time
+    end_time: time
+    doctor: SlotSearchDoctorSchema
+    health_institution: Optional[SlotSearchInstitutionSchema] = None
+    distance_km: Optional[float] = None  # only when searching by location
+
+
+# --- Patient timeline (newest first, keyset-paginated with next_cursor) ---
+class TimelineMedicationSchema(BaseModel):
+    medication_id: int
+    name: str
+    dosage: Optional[str] = None
+    frequency: Optional[str] = None
+    duration: Optional[str] = None
+
+class TimelinePrescriptionSchema(BaseModel):
+    prescription_id: int
+    doctor_id: int
+    doctor_first_name: Optional[str] = None
+    doctor_last_name: Optional[str] = None
+    instructions: str
+    created_at: Optional[datetime] = None
+    expires_at: datetime
+    status: Optional[str] = None
+    medications: List[TimelineMedicationSchema]
+
+class TimelineItemSchema(BaseModel):
+    type: str  # "appointment" or "prescription"
+    occurred_at: datetime
+    appointment: Optional[AppointmentDetailsSchema] = None
+    prescription: Optional[TimelinePrescriptionSchema] = None
+
+class PatientTimelineSchema(BaseModel):
+    patient_id: int
+    items: List[TimelineItemSchema]
+    next_cursor: Optional[str] = None
+
+
+# --- Medication doses due (precomputed from the medication's frequency/duration) ---
+class MedicationDoseDueSchema(BaseModel):
+    due_at: datetime
+    patient_id: int
+    medication_id: int
+    name: Optional[str] = None
+    dosage: Optional[str] = None
+
+
+# --- Slot waitlist ---
+class WaitlistJoinRequest(BaseModel):
+    doctor_id: int
+    date: date
+    window_start: Optional[time] = None
+    window_end: Optional[time] = None
+
+class WaitlistEntrySchema(BaseModel):
+    id: int
+    patient_id: int
+    doctor_id: int
+    date: date
+    window_start: Optional[time] = None
+    window_end: Optional[time] = None
+    status: str
+    created_at: datetime
+    offered_slot_id: Optional[int] = None
+    offer_expires_at: Optional[datetime] = None
+    appointment_id: Optional[int] = None
+
+    model_config = ConfigDict(from_attributes=True)
@@ -0,0 +1,126 @@
+# benchmarks/fcm_mock.py
+"""
+Local stand-in for the FCM HTTP v1 API, for load tests of the push path.
+
+Serves the OAuth token endpoint and messages:send with configurable latency,
+failure rate (503, or 429 with Retry-After) and UNREGISTERED rate. Tokens
+starting with "unregistered-" always get 404 UNREGISTERED, so benchmarks can
+seed stale devices deterministically.
+
+    python -m benchmarks.fcm_mock --port 8765 --latency-ms 40 --error-rate 0.05
+
+Point the API at it with:
+
+    FCM_SEND_URL=http://127.0.0.1:8765/v1/projects/bench/messages:send
+    FCM_TOKEN_URI=http://127.0.0.1:8765/token
+
+GET /stats returns counters and, per notification body, the receipt time
+(time.time()) and number of attempts; POST /reset clears them.
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from typing import Any, Dict
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+UNREGISTERED_PREFIX = "unregistered-"
+
+
+def create_app(
+    latency_ms: float = 20.0,
+    jitter_ms: float = 10.0,
+    error_rate: float = 0.0,
+    throttle_rate: float = 0.0,
+    unregistered_rate: float = 0.0,
+    retry_after: int = 1,
+) -> FastAPI:
+    app = FastAPI(title="FCM stand-in")
+    counters: Counter = Counter()
+    received: Dict[str, Dict[str, Any]] = {}
+
+    @app.post("/token")
+    async def token():
+        counters["token"] += 1
+        return {"access_token": f"bench-token-{counters['token']}", "expires_in": 3600, "token_type": "Bearer"}
+
+    @app.post("/v1/projects/{project}/messages:send")
+    async def send(project: str, request: Request):
+        payload = await request.json()
+        message = payload.get("message", {})
+        body = message.get("notification", {}).get("body", "")
+        entry = received.setdefault(body, {"attempts": 0})
+        entry["attempts"] += 1
+        counters["requests"] += 1
+
+        await asyncio.sleep(max(0.0, latency_ms + random.uniform(-jitter_ms, jitter_ms)) / 1000)
+
+        if not request.headers.get("authorization", "").startswith("Bearer "):
+            counters["401"] += 1
+            return JSONResponse({"error": {"code": 401, "status": "UNAUTHENTICATED"}}, status_code=401)
+        roll = random.random()
+        if roll < error_rate:
+            counters["503"] += 1
+            return JSONResponse({"error": {"code": 503, "status": "UNAVAILABLE"}}, status_code=503)
+        if roll < error_rate + throttle_rate:
+            counters["429"] += 1
+            return JSONResponse(
+                {"error": {"code": 429, "status": "RESOURCE_EXHAUSTED"}},
+                status_code=429, headers={"Retry-After": str(retry_after)},
+            )
+        token = message.get("token", "")
+        if token.startswith(UNREGISTERED_PREFIX) or random.random() < unregistered_rate:
+            counters["unregistered"] += 1
+            return JSONResponse(
+                {"error": {
+                    "code": 404,
+                    "status": "NOT_FOUND",
+                    "details": [{
+                        "@type": "type.googleapis.com/google.firebase.fcm.v1.FcmError",
+                        "errorCode": "UNREGISTERED",
+                    }],
+                }},
+                status_code=404,
+            )
+        counters["delivered"] += 1
+        entry["delivered_at"] = time.time()
+        return {"name": f"projects/{project}/messages/{counters['delivered']}"}
+
+    @app.get("/stats")
+    async def stats():
+        return {"counters": dict(counters), "messages": received}
+
+    @app.post("/reset")
+    async def reset():
+        counters.clear()
+        received.clear()
+        return {"ok": True}
+
+    return app
+
+
+def main() -> None:
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Local FCM HTTP v1 stand-in.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=20.0)
+    parser.add_argument("--jitter-ms", type=float, default=10.0)
+    parser.add_argument("--error-rate", type=float, default=0.0, help="fraction answered 503")
+    parser.add_argument("--throttle-rate", type=float, default=0.0, help="fraction answered 429 + Retry-After")
+    parser.add_argument("--unregistered-rate", type=float, default=0.0, help="fraction answered 404 UNREGISTERED")
+    parser.add_argument("--retry-after", type=int, default=1, help="Retry-After seconds on 429")
+    args = parser.parse_args()
+
+    app = create_app(
+        args.latency_ms, args.jitter_ms, args.error_rate, args.throttle_rate, args.unregistered_rate, args.retry_after
+    )
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
+
+
+if __name__ == "__main__":
+    main()
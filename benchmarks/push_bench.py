@@ -0,0 +1,266 @@
+# benchmarks/push_bench.py
+"""
+Load test of the notification pipeline against a local FCM stand-in
+(benchmarks/fcm_mock.py): notifications are created through
+NotificationService at a fixed rate, either one by one (create_notification)
+or in batches (create_notifications_bulk), and pushed to the mock.
+
+Reports sends/s, push outcomes and retries (from the Prometheus counters),
+end-to-end latency (create call until the mock accepted the push), attempts
+per delivered push, pruned device tokens and how long the event loop was
+blocked while all of this ran.
+
+    python -m benchmarks.push_bench --notifications 2000 --rate 400
+    python -m benchmarks.push_bench --bulk-size 100 --error-rate 0.05 --throttle-rate 0.02
+    python -m benchmarks.push_bench --url postgresql://...   # default: a throwaway sqlite file
+
+A throwaway service account (fresh RSA key) points google-auth at the mock's
+token endpoint, so no Google credentials are needed.
+"""
+import argparse
+import asyncio
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+OUTCOMES = ("success", "error", "unregistered", "exception")
+RETRY_REASONS = ("429", "500", "502", "503", "504", "transport", "unauthorized")
+
+
+def _write_service_account(path: str, token_uri: str) -> None:
+    from cryptography.hazmat.primitives import serialization
+    from cryptography.hazmat.primitives.asymmetric import rsa
+
+    key = rsa.generate_private_key(public_exponent=65537, key_size=2048)
+    pem = key.private_bytes(
+        serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8, serialization.NoEncryption()
+    ).decode("ascii")
+    with open(path, "w") as f:
+        json.dump({
+            "type": "service_account",
+            "project_id": "bench",
+            "private_key_id": "bench",
+            "private_key": pem,
+            "client_email": "bench@bench.iam.gserviceaccount.com",
+            "client_id": "0",
+            "token_uri": token_uri,
+        }, f)
+
+
+def _mock_request(base: str, path: str, method: str = "GET") -> dict:
+    request = urllib.request.Request(base + path, method=method, data=b"" if method == "POST" else None)
+    with urllib.request.urlopen(request, timeout=10) as response:
+        return json.loads(response.read())
+
+
+def _start_mock(args) -> subprocess.Popen:
+    process = subprocess.Popen(
+        [
+            sys.executable, "-m", "benchmarks.fcm_mock", "--port", str(args.port),
+            "--latency-ms", str(args.latency_ms), "--jitter-ms", str(args.jitter_ms),
+            "--error-rate", str(args.error_rate), "--throttle-rate", str(args.throttle_rate),
+            "--retry-after", str(args.retry_after),
+        ],
+        cwd=ROOT,
+    )
+    base = f"http://127.0.0.1:{args.port}"
+    deadline = time.perf_counter() + 15
+    while time.perf_counter() < deadline:
+        try:
+            _mock_request(base, "/stats")
+            return process
+        except OSError:
+            time.sleep(0.05)
+    process.terminate()
+    raise RuntimeError("FCM stand-in did not start")
+
+
+def _setup_schema(engine, users: int, unregistered: float) -> None:
+    from db.models.appointment_models import Base, DeviceToken, Notification
+
+    if engine.dialect.name == "sqlite":
+        Base.metadata.create_all(engine, tables=[DeviceToken.__table__, Notification.__table__])
+    stale = int(users * unregistered)
+    with engine.begin() as conn:
+        conn.execute(DeviceToken.__table__.delete().where(DeviceToken.user_id <= users))
+        conn.execute(DeviceToken.__table__.insert(), [
+            {"user_id": user_id, "token": f"{'unregistered-' if user_id <= stale else ''}device-{user_id}"}
+            for user_id in range(1, users + 1)
+        ])
+
+
+class LoopMonitor:
+    """Measures how late a periodic timer fires: time the event loop spent blocked."""
+
+    def __init__(self, interval: float = 0.005):
+        self.interval = interval
+        self.lags = []
+        self._task = None
+
+    async def _run(self) -> None:
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            self.lags.append(max(0.0, loop.time() - expected))
+
+    def start(self) -> None:
+        self._task = asyncio.create_task(self._run())
+
+    def stop(self) -> None:
+        self._task.cancel()
+
+
+async def _drive(args, started: dict) -> float:
+    from api.schemas.appointment_schemas import NotificationCreate
+    from db.models.appointment_models import NotificationType
+    from db.session import SessionLocal
+    from services.notification_service import NotificationService
+
+    def notification(i: int) -> NotificationCreate:
+        return NotificationCreate(
+            user_id=i % args.users + 1, user_type="patient", title="Benchmark",
+            message=f"bench-{i}", type=NotificationType.UPCOMING,
+        )
+
+    async def single(i: int) -> None:
+        db = SessionLocal()
+        try:
+            started[f"bench-{i}"] = time.time()
+            await NotificationService.create_notification(db, notification(i))
+        finally:
+            db.close()
+
+    async def bulk(first: int) -> None:
+        batch = [notification(i) for i in range(first, min(first + args.bulk_size, args.notifications))]
+        db = SessionLocal()
+        try:
+            now = time.time()
+            started.update((n.message, now) for n in batch)
+            await NotificationService.create_notifications_bulk(db, batch)
+        finally:
+            db.close()
+
+    step = args.bulk_size or 1
+    loop = asyncio.get_running_loop()
+    began = loop.time()
+    tasks = []
+    for first in range(0, args.notifications, step):
+        delay = began + first / args.rate - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.create_task(bulk(first) if args.bulk_size else single(first)))
+    results = await asyncio.gather(*tasks, return_exceptions=True)
+    failures = [r for r in results if isinstance(r, Exception)]
+    if failures:
+        print(f"{len(failures)} create calls raised, first: {failures[0]!r}")
+    return loop.time() - began
+
+
+def _percentile(values, q: float) -> float:
+    if not values:
+        return float("nan")
+    values = sorted(values)
+    return values[min(len(values) - 1, int(q * len(values)))]
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Notification/push pipeline load test against a local FCM stand-in.")
+    parser.add_argument("--url", default=None, help="database URL (default: a throwaway sqlite file)")
+    parser.add_argument("--notifications", type=int, default=1000)
+    parser.add_argument("--rate", type=float, default=200.0, help="notifications created per second")
+    parser.add_argument("--bulk-size", type=int, default=0, help="0: create_notification per item; n: bulk batches")
+    parser.add_argument("--users", type=int, default=500)
+    parser.add_argument("--unregistered", type=float, default=0.02, help="fraction of seeded devices that are stale")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=40.0)
+    parser.add_argument("--jitter-ms", type=float, default=20.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--throttle-rate", type=float, default=0.0)
+    parser.add_argument("--retry-after", type=int, default=1)
+    parser.add_argument("--retry-base", type=float, default=0.1, help="FCM_RETRY_BASE_SECONDS for the run")
+    parser.add_argument("--concurrency", type=int, default=None, help="FCM_MAX_CONCURRENCY for the run")
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp(prefix="push_bench_")
+    base = f"http://127.0.0.1:{args.port}"
+    service_account = os.path.join(workdir, "service_account.json")
+    _write_service_account(service_account, f"{base}/token")
+    # Read by core.config / db.session at import time, so set before importing the app
+    os.environ.update({
+        "DATABASE_URL": args.url or f"sqlite:///{os.path.join(workdir, 'bench.db')}",
+        "FCM_SEND_URL": f"{base}/v1/projects/bench/messages:send",
+        "FCM_TOKEN_URI": f"{base}/token",
+        "FCM_SERVICE_ACCOUNT_FILE": service_account,
+        "FCM_RETRY_BASE_SECONDS": str(args.retry_base),
+    })
+    if args.concurrency:
+        os.environ["FCM_MAX_CONCURRENCY"] = str(args.concurrency)
+
+    from prometheus_client import REGISTRY
+    from db.session import engine
+
+    _setup_schema(engine, args.users, args.unregistered)
+    mock = _start_mock(args)
+    try:
+        started: dict = {}
+        monitor = LoopMonitor()
+
+        async def run() -> float:
+            monitor.start()
+            try:
+                return await _drive(args, started)
+            finally:
+                monitor.stop()
+
+        elapsed = asyncio.run(run())
+        stats = _mock_request(base, "/stats")
+    finally:
+        mock.terminate()
+        mock.wait()
+
+    def counter(name: str, labels: dict) -> int:
+        return int(REGISTRY.get_sample_value(name, labels) or 0)
+
+    outcomes = {o: counter("push_sends_total", {"outcome": o}) for o in OUTCOMES}
+    retries = {r: counter("push_retries_total", {"reason": r}) for r in RETRY_REASONS}
+    messages = stats["messages"]
+    latencies = [
+        (m["delivered_at"] - started[body]) * 1000
+        for body, m in messages.items() if "delivered_at" in m and body in started
+    ]
+    attempts = [m["attempts"] for m in messages.values() if "delivered_at" in m]
+    with engine.connect() as conn:
+        remaining_stale = conn.exec_driver_sql(
+            "SELECT count(*) FROM device_tokens WHERE token LIKE 'unregistered-%'"
+        ).scalar()
+
+    lags = monitor.lags
+    mode = f"bulk x{args.bulk_size}" if args.bulk_size else "single"
+    print(f"mode                 {mode}")
+    print(f"notifications        {args.notifications} in {elapsed:.2f}s ({args.notifications / elapsed:.0f}/s)")
+    print(f"pushes delivered     {outcomes['success']} ({outcomes['success'] / elapsed:.0f} sends/s)")
+    print("outcomes             " + ", ".join(f"{o}={n}" for o, n in outcomes.items()))
+    print("retries              " + (", ".join(f"{r}={n}" for r, n in retries.items() if n) or "none"))
+    print(f"mock counters        {stats['counters']}")
+    print(
+        f"e2e latency ms       p50={_percentile(latencies, 0.5):.1f} p95={_percentile(latencies, 0.95):.1f} "
+        f"p99={_percentile(latencies, 0.99):.1f} max={max(latencies, default=float('nan')):.1f}"
+    )
+    if attempts:
+        print(f"attempts/delivered   mean={statistics.mean(attempts):.2f} max={max(attempts)}")
+    print(f"stale tokens left    {remaining_stale} (of {int(args.users * args.unregistered)} seeded)")
+    print(
+        f"event loop blocked   total={sum(lags) * 1000:.0f}ms max={max(lags, default=0) * 1000:.1f}ms "
+        f"p99={_percentile(lags, 0.99) * 1000:.1f}ms over {len(lags)} ticks"
+    )
+
+
+if __name__ == "__main__":
+    main()
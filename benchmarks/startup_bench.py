@@ -0,0 +1,115 @@
+# benchmarks/startup_bench.py
+"""
+Startup benchmark: import time of `main` and time-to-first-request per worker.
+
+Each worker is a separate `uvicorn main:app` process started at the same time
+(like a process manager spawning workers), timed from spawn until GET / answers.
+
+    python -m benchmarks.startup_bench --workers 4 --runs 3
+    python -m benchmarks.startup_bench --importtime   # slowest imports of `main`
+
+Schema creation on startup is disabled unless --with-schema is given, matching
+a deployment where `python -m db.migrate` runs as a separate step.
+"""
+import argparse
+import os
+import re
+import statistics
+import subprocess
+import sys
+import time
+import urllib.request
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+IMPORT_SNIPPET = (
+    "import time; t = time.perf_counter(); import main; "
+    "print((time.perf_counter() - t) * 1000)"
+)
+
+
+def _env(with_schema: bool) -> dict:
+    env = dict(os.environ)
+    env["DB_CREATE_SCHEMA_ON_STARTUP"] = "1" if with_schema else "0"
+    return env
+
+
+def measure_import(with_schema: bool) -> float:
+    out = subprocess.run(
+        [sys.executable, "-c", IMPORT_SNIPPET],
+        cwd=ROOT, env=_env(with_schema), capture_output=True, text=True, check=True,
+    )
+    return float(out.stdout.strip().splitlines()[-1])
+
+
+def slowest_imports(limit: int = 15) -> list:
+    out = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", "import main"],
+        cwd=ROOT, env=_env(False), capture_output=True, text=True, check=True,
+    )
+    rows = []
+    for line in out.stderr.splitlines():
+        match = re.match(r"import time:\s+(\d+) \|\s+(\d+) \|(\s*)(\S+)", line)
+        if match:
+            rows.append((int(match.group(2)), match.group(4)))
+    return sorted(rows, reverse=True)[:limit]
+
+
+def measure_workers(workers: int, base_port: int, with_schema: bool, timeout: float) -> list:
+    started_at = time.perf_counter()
+    procs = [
+        subprocess.Popen(
+            [sys.executable, "-m", "uvicorn", "main:app", "--port", str(base_port + i), "--log-level", "warning"],
+            cwd=ROOT, env=_env(with_schema),
+        )
+        for i in range(workers)
+    ]
+    results = [None] * workers
+    try:
+        deadline = started_at + timeout
+        while None in results and time.perf_counter() < deadline:
+            for i in range(workers):
+                if results[i] is not None:
+                    continue
+                try:
+                    with urllib.request.urlopen(f"http://127.0.0.1:{base_port + i}/", timeout=0.5) as response:
+                        if response.status == 200:
+                            results[i] = (time.perf_counter() - started_at) * 1000
+                except OSError:
+                    pass
+            time.sleep(0.005)
+    finally:
+        for proc in procs:
+            proc.terminate()
+        for proc in procs:
+            proc.wait()
+    return results
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--workers", type=int, default=1)
+    parser.add_argument("--runs", type=int, default=3)
+    parser.add_argument("--port", type=int, default=8700)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--with-schema", action="store_true", help="create the schema on startup (needs a database)")
+    parser.add_argument("--importtime", action="store_true", help="list the slowest imports of main and exit")
+    args = parser.parse_args()
+
+    if args.importtime:
+        for micros, module in slowest_imports():
+            print(f"{micros / 1000:8.1f} ms  {module}")
+        return
+
+    import_times = [measure_import(args.with_schema) for _ in range(args.runs)]
+    print(f"import main: min {min(import_times):.1f} ms, median {statistics.median(import_times):.1f} ms")
+
+    for run in range(args.runs):
+        results = measure_workers(args.workers, args.port, args.with_schema, args.timeout)
+        for worker, elapsed in enumerate(results):
+            shown = f"{elapsed:.1f} ms" if elapsed is not None else "timed out"
+            print(f"run {run + 1} worker {worker + 1}: time to first request {shown}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,109 @@
+# benchmarks/statement_cache_bench.py
+"""
+Per-call overhead of the hot read queries: ORM Query built on every call
+("query") versus the prebuilt statements in db/statements.py ("prebuilt").
+
+Queries run against ids that match no rows, so the numbers are dominated by
+statement construction, cache-key generation and compiled-cache lookup
+rather than by the database.
+
+    python -m benchmarks.statement_cache_bench --calls 5000
+    python -m benchmarks.statement_cache_bench --url sqlite://   # no Postgres needed
+"""
+import argparse
+import time
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import create_engine, func
+from sqlalchemy.orm import Session, selectinload
+
+from db import statements
+from db.models.appointment_models import Appointment, Base, Doctor, Notification, TimeSlot
+from db.session import DATABASE_URL
+
+SINCE = datetime.now() - timedelta(days=90)
+
+
+def _query_cases(db: Session):
+    return {
+        "appointments_for_patient": lambda: db.query(Appointment)
+            .filter(Appointment.patient_id == -1)
+            .options(
+                selectinload(Appointment.time_slot),
+                selectinload(Appointment.doctor).selectinload(Doctor.specialty),
+                selectinload(Appointment.doctor).selectinload(Doctor.health_institution),
+            ).all(),
+        "appointments_for_doctor": lambda: db.query(Appointment)
+            .filter(Appointment.doctor_id == -1)
+            .options(
+                selectinload(Appointment.time_slot),
+                selectinload(Appointment.patient),
+                selectinload(Appointment.doctor).selectinload(Doctor.health_institution),
+            ).all(),
+        "notifications_for_user": lambda: db.query(Notification)
+            .filter(Notification.user_id == -1)
+            .filter(Notification.user_type == "patient")
+            .filter(Notification.sent_at >= SINCE)
+            .order_by(Notification.sent_at.desc())
+            .offset(0).limit(20).all(),
+        "unread_count": lambda: db.query(func.count(Notification.id))
+            .filter(Notification.user_id == -1)
+            .filter(Notification.user_type == "patient")
+            .filter(Notification.sent_at >= SINCE)
+            .filter(Notification.is_read == False)
+            .scalar(),
+        "available_slots_on_date": lambda: db.query(TimeSlot)
+            .filter(TimeSlot.doctor_id == -1, TimeSlot.status == "available")
+            .filter(TimeSlot.date == date.today())
+            .all(),
+    }
+
+
+def _prebuilt_cases(db: Session):
+    user = {"user_id": -1, "user_type": "patient", "since": SINCE}
+    return {
+        "appointments_for_patient": lambda: db.execute(
+            statements.APPOINTMENTS_FOR_PATIENT, {"patient_id": -1}).scalars().all(),
+        "appointments_for_doctor": lambda: db.execute(
+            statements.APPOINTMENTS_FOR_DOCTOR, {"doctor_id": -1}).scalars().all(),
+        "notifications_for_user": lambda: db.execute(
+            statements.NOTIFICATIONS_FOR_USER, {**user, "skip": 0, "limit": 20}).scalars().all(),
+        "unread_count": lambda: db.execute(
+            statements.UNREAD_NOTIFICATION_COUNT_FOR_USER, user).scalar(),
+        "available_slots_on_date": lambda: db.execute(
+            statements.AVAILABLE_SLOTS_FOR_DOCTOR_ON_DATE, {"doctor_id": -1, "date": date.today()}).scalars().all(),
+    }
+
+
+def _per_call_us(fn, calls: int) -> float:
+    fn()  # compile once, outside the timing
+    started_at = time.perf_counter()
+    for _ in range(calls):
+        fn()
+    return (time.perf_counter() - started_at) / calls * 1e6
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Compare per-call overhead of ORM Query vs prebuilt statements.")
+    parser.add_argument("--url", default=DATABASE_URL, help="database URL (default: DATABASE_URL)")
+    parser.add_argument("--calls", type=int, default=2000)
+    args = parser.parse_args()
+
+    engine = create_engine(args.url)
+    if engine.dialect.name == "sqlite":
+        tables = [t for t in Base.metadata.sorted_tables if t.name in (
+            "specialties", "health_institutions", "patients", "doctors", "time_slots", "appointments",
+            "notifications")]
+        Base.metadata.create_all(engine, tables=tables)
+
+    with Session(bind=engine) as db:
+        query_cases, prebuilt_cases = _query_cases(db), _prebuilt_cases(db)
+        print(f"{'query':<26} {'query us':>10} {'prebuilt us':>12} {'speedup':>8}")
+        for name in query_cases:
+            before = _per_call_us(query_cases[name], args.calls)
+            after = _per_call_us(prebuilt_cases[name], args.calls)
+            print(f"{name:<26} {before:>10.1f} {after:>12.1f} {before / after:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
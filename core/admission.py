@@ -0,0 +1,188 @@
+# core/admission.py
+"""
+Admission control in front of the DB pool.
+
+Every request is put in a route class: "booking" (writes under
+/appointments), "write" (other writes) or "read" (GET/HEAD). Each class has:
+
+- a token bucket per client (the authenticated user once their token has
+  been verified, else the client address, so minting garbage tokens buys no
+  extra buckets): over the rate -> 429 with Retry-After;
+- a concurrency cap: requests beyond it wait in a bounded queue, and are shed
+  with 503 + Retry-After when the queue is full or the wait exceeds
+  max_wait, instead of piling up on the connection pool until everything
+  times out;
+- a statement timeout, applied with SET LOCAL statement_timeout at the start
+  of each transaction opened while serving the request.
+
+Limits are per worker process.
+"""
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from contextvars import ContextVar
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+
+from core import auth, metrics
+
+BOOKING = "booking"
+WRITE = "write"
+READ = "read"
+
+_EXEMPT_PREFIXES = ("/metrics", "/debug/", "/docs", "/redoc", "/openapi.json")
+_MAX_BUCKETS = 100_000
+_QUERY_CANCELED = "57014"
+
+_statement_timeout_ms: ContextVar[Optional[int]] = ContextVar("statement_timeout_ms", default=None)
+
+
+class RouteClassLimits(NamedTuple):
+    rate: float              # tokens per second, per client
+    burst: int               # bucket size
+    concurrency: int         # requests served at once
+    max_queue: int           # requests allowed to wait for a slot
+    max_wait: float          # seconds a queued request may wait
+    statement_timeout_ms: int
+
+
+def classify(method: str, path: str) -> str:
+    if method in ("GET", "HEAD", "OPTIONS"):
+        return READ
+    if path.startswith("/appointments"):
+        return BOOKING
+    return WRITE
+
+
+def client_key(scope) -> str:
+    for name, value in scope.get("headers", ()):
+        if name == b"authorization":
+            # One bucket per user across all their tokens; verified tokens are cached by core.auth
+            principal = auth.cached_principal(value.decode("latin-1").partition(" ")[2])
+            if principal is not None:
+                return f"user:{principal.user_type}:{principal.user_id}"
+            break
+    client = scope.get("client")
+    return "addr:" + (client[0] if client else "unknown")
+
+
+class TokenBuckets:
+    """Token buckets keyed by (client, class); least recently used buckets are dropped past _MAX_BUCKETS."""
+
+    def __init__(self):
+        self._buckets: "OrderedDict[Tuple[str, str], Tuple[float, float]]" = OrderedDict()
+
+    def take(self, key: Tuple[str, str], rate: float, burst: int) -> float:
+        """Take one token; returns 0 when admitted, else seconds until a token is available."""
+        now = time.monotonic()
+        tokens, updated_at = self._buckets.pop(key, (float(burst), now))
+        tokens = min(float(burst), tokens + (now - updated_at) * rate)
+        if tokens >= 1.0:
+            self._buckets[key] = (tokens - 1.0, now)
+            wait = 0.0
+        else:
+            self._buckets[key] = (tokens, now)
+            wait = (1.0 - tokens) / rate
+        if len(self._buckets) > _MAX_BUCKETS:
+            self._buckets.popitem(last=False)
+        return wait
+
+
+class ConcurrencyLimiter:
+    def __init__(self, limit: int, max_queue: int, max_wait: float):
+        self.max_queue = max_queue
+        self.max_wait = max_wait
+        self.in_flight = 0
+        self.waiting = 0
+        self._semaphore = asyncio.Semaphore(limit)
+
+    async def acquire(self) -> bool:
+        if not self._semaphore.locked():
+            await self._semaphore.acquire()
+            self.in_flight += 1
+            return True
+        if self.waiting >= self.max_queue:
+            return False
+        self.waiting += 1
+        try:
+            await asyncio.wait_for(self._semaphore.acquire(), timeout=self.max_wait)
+        except asyncio.TimeoutError:
+            return False
+        finally:
+            self.waiting -= 1
+        self.in_flight += 1
+        return True
+
+    def release(self) -> None:
+        self.in_flight -= 1
+        self._semaphore.release()
+
+
+def _reject(status_code: int, retry_after: float, detail: str) -> JSONResponse:
+    return JSONResponse(
+        {"detail": detail}, status_code=status_code, headers={"Retry-After": str(max(1, math.ceil(retry_after)))}
+    )
+
+
+class AdmissionMiddleware:
+    """Pure ASGI middleware; rejected requests never reach the router or the pool."""
+
+    def __init__(self, app, limits: Dict[str, RouteClassLimits]):
+        self.app = app
+        self.limits = limits
+        self.buckets = TokenBuckets()
+        self.limiters = {
+            name: ConcurrencyLimiter(cls.concurrency, cls.max_queue, cls.max_wait) for name, cls in limits.items()
+        }
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or scope["path"].startswith(_EXEMPT_PREFIXES) or scope["path"] == "/":
+            await self.app(scope, receive, send)
+            return
+
+        route_class = classify(scope["method"], scope["path"])
+        limits = self.limits[route_class]
+
+        wait = self.buckets.take((client_key(scope), route_class), limits.rate, limits.burst)
+        if wait > 0:
+            metrics.ADMISSION_REJECTIONS.labels(route_class, "rate_limited").inc()
+            await _reject(429, wait, "Too many requests")(scope, receive, send)
+            return
+
+        limiter = self.limiters[route_class]
+        if not await limiter.acquire():
+            metrics.ADMISSION_REJECTIONS.labels(route_class, "overloaded").inc()
+            await _reject(503, limiter.max_wait, "Server is busy, please retry")(scope, receive, send)
+            return
+
+        token = _statement_timeout_ms.set(limits.statement_timeout_ms)
+        try:
+            await self.app(scope, receive, send)
+        finally:
+            _statement_timeout_ms.reset(token)
+            limiter.release()
+
+
+def _set_statement_timeout(session, transaction, connection) -> None:
+    timeout_ms = _statement_timeout_ms.get()
+    if timeout_ms and connection.dialect.name == "postgresql":
+        connection.exec_driver_sql(f"SET LOCAL statement_timeout = {int(timeout_ms)}")
+
+
+async def _statement_timeout_handler(request: Request, exc: DBAPIError):
+    if getattr(exc.orig, "pgcode", None) == _QUERY_CANCELED:
+        metrics.ADMISSION_REJECTIONS.labels(classify(request.method, request.url.path), "statement_timeout").inc()
+        return _reject(503, 1, "The request took too long, please retry")
+    raise exc
+
+
+def install(app, limits: Dict[str, RouteClassLimits]) -> None:
+    event.listen(Session, "after_begin", _set_statement_timeout)
+    app.add_exception_handler(DBAPIError, _statement_timeout_handler)
+    app.add_middleware(AdmissionMiddleware, limits=limits)
@@ -0,0 +1,142 @@
+# core/auth.py
+"""
+Bearer token verification, done locally without a call to the identity
+provider or the database.
+
+Tokens are JWTs signed with AUTH_JWT_SECRET (HS256) or with one of the
+provider's keys published at AUTH_JWKS_URL (RS256/ES256). Keys are parsed
+once and kept for AUTH_JWKS_TTL_SECONDS; a token signed with an unknown key
+id (key rotation) triggers a refetch, at most once every
+AUTH_JWKS_MIN_REFRESH_SECONDS. The fetch is a blocking HTTP call, so async
+callers run refresh() in a thread.
+
+Verified tokens are remembered until they expire, so a client sending the
+same token on every request pays for signature and claim checks once.
+"""
+import threading
+import time
+from typing import Any, Dict, NamedTuple, Optional
+
+from cachetools import LRUCache
+from jose import jwk, jwt
+from jose.exceptions import JOSEError
+
+from core import config
+
+PATIENT = "patient"
+DOCTOR = "doctor"
+USER_TYPES = (PATIENT, DOCTOR)
+
+
+class InvalidToken(Exception):
+    pass
+
+
+class Principal(NamedTuple):
+    user_id: int
+    user_type: str
+    expires_at: float
+
+
+class KeySet:
+    """Signing keys by key id, parsed once; `None` is the key id of the shared secret."""
+
+    def __init__(
+        self,
+        jwks_url: str = config.AUTH_JWKS_URL,
+        secret: str = config.AUTH_JWT_SECRET,
+        ttl: float = config.AUTH_JWKS_TTL_SECONDS,
+        min_refresh: float = config.AUTH_JWKS_MIN_REFRESH_SECONDS,
+    ):
+        self.jwks_url = jwks_url
+        self.ttl = ttl
+        self.min_refresh = min_refresh
+        self._keys: Dict[Optional[str], Any] = {}
+        if secret:
+            self._keys[None] = jwk.construct(secret, "HS256")
+        self._fetched_at = float("-inf")
+        self._lock = threading.Lock()
+
+    def needs_refresh(self, kid: Optional[str]) -> bool:
+        if not self.jwks_url:
+            return False
+        age = time.monotonic() - self._fetched_at
+        return age > self.ttl or (kid not in self._keys and age > self.min_refresh)
+
+    def refresh(self) -> None:
+        import httpx
+
+        with self._lock:
+            if time.monotonic() - self._fetched_at <= self.min_refresh:
+                return  # another request refreshed meanwhile
+            response = httpx.get(self.jwks_url, timeout=5.0)
+            response.raise_for_status()
+            keys = {k: v for k, v in self._keys.items() if k is None}
+            for key in response.json().get("keys", []):
+                if key.get("use", "sig") == "sig" and key.get("alg", "RS256") in config.AUTH_JWT_ALGORITHMS:
+                    keys[key.get("kid")] = jwk.construct(key, key.get("alg", "RS256"))
+            self._keys = keys
+            self._fetched_at = time.monotonic()
+
+    def get(self, kid: Optional[str]):
+        # Tokens signed with the shared secret may carry any (or no) key id
+        return self._keys.get(kid) or self._keys.get(None)
+
+
+keys = KeySet()
+_verified: LRUCache = LRUCache(maxsize=config.AUTH_TOKEN_CACHE_SIZE)
+
+
+def cached_principal(token: str) -> Optional[Principal]:
+    principal = _verified.get(token)
+    if principal is not None and principal.expires_at > time.time():
+        return principal
+    return None
+
+
+def key_id(token: str) -> Optional[str]:
+    try:
+        return jwt.get_unverified_header(token).get("kid")
+    except JOSEError:
+        raise InvalidToken("Malformed token")
+
+
+def verify(token: str) -> Principal:
+    """Check signature and claims; keys must already be loaded (see KeySet.needs_refresh)."""
+    principal = cached_principal(token)
+    if principal is not None:
+        return principal
+
+    key = keys.get(key_id(token))
+    if key is None:
+        raise InvalidToken("Unknown signing key")
+    try:
+        claims = jwt.decode(
+            token, key,
+            algorithms=config.AUTH_JWT_ALGORITHMS,
+            audience=config.AUTH_JWT_AUDIENCE,
+            issuer=config.AUTH_JWT_ISSUER,
+            options={"leeway": config.AUTH_JWT_LEEWAY_SECONDS, "verify_aud": config.AUTH_JWT_AUDIENCE is not None},
+        )
+    except JOSEError as exc:
+        raise InvalidToken(str(exc))
+
+    try:
+        principal = Principal(int(claims["sub"]), claims["user_type"], float(claims["exp"]))
+    except (KeyError, TypeError, ValueError):
+        raise InvalidToken("Token is missing sub, user_type or exp")
+    if principal.user_type not in USER_TYPES:
+        raise InvalidToken("Unknown user type")
+    _verified[token] = principal
+    return principal
+
+
+def issue(user_id: int, user_type: str, ttl_seconds: int = 3600) -> str:
+    """HS256 token for a principal (development and benchmarks; production tokens come from the provider)."""
+    now = int(time.time())
+    claims = {"sub": str(user_id), "user_type": user_type, "iat": now, "exp": now + ttl_seconds}
+    if config.AUTH_JWT_ISSUER:
+        claims["iss"] = config.AUTH_JWT_ISSUER
+    if config.AUTH_JWT_AUDIENCE:
+        claims["aud"] = config.AUTH_JWT_AUDIENCE
+    return jwt.encode(claims, config.AUTH_JWT_SECRET, algorithm="HS256")
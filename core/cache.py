@@ -0,0 +1,82 @@
+# core/cache.py
+"""
+In-process TTL caches kept coherent across workers by the invalidation bus.
+
+Each cache subscribes to one or more bus topics; an invalidation for a key
+drops the entries registered under that key. Loads record the cache
+generation before querying and only store the result if no invalidation
+arrived meanwhile, so a slow read cannot put stale data back. For the same
+reason loads always read from the primary: a lagging replica could return
+the data an invalidation has just dropped.
+"""
+import threading
+from collections import defaultdict
+from typing import Any, Callable, Dict, Hashable, Iterable, Set
+
+from cachetools import TTLCache
+
+from core import invalidation, metrics
+from db.session import replica_reads
+
+_MISSING = object()
+
+
+class LocalCache:
+    def __init__(self, name: str, maxsize: int = 1024, ttl: float = 60.0, topics: Iterable[str] = ()):
+        self.name = name
+        self._data: TTLCache = TTLCache(maxsize=maxsize, ttl=ttl)
+        self._lock = threading.Lock()
+        self._generation = 0
+        # invalidation key -> cache keys stored under it
+        self._tags: Dict[Hashable, Set[Hashable]] = defaultdict(set)
+        for topic in topics:
+            invalidation.subscribe(topic, self._on_invalidation)
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+        metrics.record_cache_lookup(self.name, value is not _MISSING)
+        return default if value is _MISSING else value
+
+    def get_or_load(self, key: Hashable, loader: Callable[[], Any], tag: Hashable = None) -> Any:
+        """Return the cached value, or call loader() and cache its result under `tag` (defaults to key)."""
+        with self._lock:
+            value = self._data.get(key, _MISSING)
+            generation = self._generation
+        metrics.record_cache_lookup(self.name, value is not _MISSING)
+        if value is not _MISSING:
+            return value
+        with replica_reads(False):
+            value = loader()
+        with self._lock:
+            if generation == self._generation:
+                self._data[key] = value
+                self._tags[key if tag is None else tag].add(key)
+                if len(self._tags) > 2 * self._data.maxsize:
+                    self._prune_tags()
+        return value
+
+    def _prune_tags(self) -> None:
+        # Entries expire out of the TTLCache silently; forget tags that no longer point at anything.
+        for tag in list(self._tags):
+            live = {key for key in self._tags[tag] if key in self._data}
+            if live:
+                self._tags[tag] = live
+            else:
+                del self._tags[tag]
+
+    def invalidate(self, tag: Hashable) -> None:
+        with self._lock:
+            self._generation += 1
+            if tag == invalidation.ALL_KEYS:
+                self._data.clear()
+                self._tags.clear()
+                return
+            for key in self._tags.pop(tag, ()):
+                self._data.pop(key, None)
+
+    def clear(self) -> None:
+        self.invalidate(invalidation.ALL_KEYS)
+
+    def _on_invalidation(self, topic: str, key: invalidation.Key) -> None:
+        self.invalidate(key)
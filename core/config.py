@@ -0,0 +1,193 @@
+# core/config.py
+import os
+import tempfile
+from dotenv import load_dotenv
+
+load_dotenv()
+
+
+def _env_bool(name: str, default: bool = False) -> bool:
+    value = os.getenv(name)
+    if value is None:
+        return default
+    return value.strip().lower() in ("1", "true", "yes", "on")
+
+
+# --- SQL profiling ---
+# "off", "dev" (per-response headers on every request) or "prod" (sampled, aggregated per route)
+SQL_PROFILING = os.getenv("SQL_PROFILING", "off").strip().lower()
+SQL_PROFILING_SAMPLE_RATE = float(
+    os.getenv("SQL_PROFILING_SAMPLE_RATE", "1.0" if SQL_PROFILING == "dev" else "0.05")
+)
+# Same statement fingerprint executed this many times in one request is reported as N+1
+SQL_N_PLUS_ONE_THRESHOLD = int(os.getenv("SQL_N_PLUS_ONE_THRESHOLD", "5"))
+
+# --- Metrics ---
+# Prometheus /metrics endpoint and per-route latency recording.
+# Set PROMETHEUS_MULTIPROC_DIR as well when serving with several worker processes.
+METRICS_ENABLED = _env_bool("METRICS_ENABLED", True)
+
+# --- Startup ---
+# Create missing tables when a worker starts. Disable in deployments that run
+# `python -m db.migrate` as a separate step so workers start without a DB round trip.
+DB_CREATE_SCHEMA_ON_STARTUP = _env_bool("DB_CREATE_SCHEMA_ON_STARTUP", True)
+
+# --- Cross-worker cache invalidation ---
+# "local" (single process), "socket" (unix datagram sockets, one host) or "postgres" (LISTEN/NOTIFY)
+INVALIDATION_BACKEND = os.getenv("INVALIDATION_BACKEND", "local").strip().lower()
+INVALIDATION_SOCKET_DIR = os.getenv(
+    "INVALIDATION_SOCKET_DIR", os.path.join(tempfile.gettempdir(), "doctor-appointment-invalidation")
+)
+INVALIDATION_CHANNEL = os.getenv("INVALIDATION_CHANNEL", "cache_invalidation")
+
+# --- Appointment reminders ---
+# Run the UPCOMING reminder scheduler inside this process. Enable it in exactly one
+# process (or run `python -m services.reminder_scheduler` separately).
+REMINDER_SCHEDULER_ENABLED = _env_bool("REMINDER_SCHEDULER_ENABLED", False)
+REMINDER_LEAD_MINUTES = int(os.getenv("REMINDER_LEAD_MINUTES", "60"))
+REMINDER_HORIZON_HOURS = int(os.getenv("REMINDER_HORIZON_HOURS", "6"))
+REMINDER_BATCH_SIZE = int(os.getenv("REMINDER_BATCH_SIZE", "500"))
+REMINDER_REFILL_SECONDS = int(os.getenv("REMINDER_REFILL_SECONDS", "60"))
+
+# --- Transactional outbox ---
+# Relay outbox events (appointment status changes, ...) into notifications from this process.
+# Several processes may run it; batches are claimed with FOR UPDATE SKIP LOCKED.
+OUTBOX_RELAY_ENABLED = _env_bool("OUTBOX_RELAY_ENABLED", True)
+OUTBOX_BATCH_SIZE = int(os.getenv("OUTBOX_BATCH_SIZE", "200"))
+OUTBOX_POLL_SECONDS = float(os.getenv("OUTBOX_POLL_SECONDS", "1.0"))
+OUTBOX_MAX_ATTEMPTS = int(os.getenv("OUTBOX_MAX_ATTEMPTS", "10"))
+OUTBOX_RETENTION_DAYS = int(os.getenv("OUTBOX_RETENTION_DAYS", "7"))
+# Pushes are sent after the notifications commit; an event whose pushes failed is retried
+# with backoff, and one whose relay died mid-send is taken over after the lease expires.
+OUTBOX_PUSH_LEASE_SECONDS = float(os.getenv("OUTBOX_PUSH_LEASE_SECONDS", "300"))
+
+# --- Push notifications (FCM HTTP v1) ---
+# Endpoints can be pointed at a local stand-in (benchmarks/fcm_mock.py) for load tests.
+FCM_SEND_URL = os.getenv(
+    "FCM_SEND_URL", "https://fcm.googleapis.com/v1/projects/doctorappointmentapp-b2b59/messages:send"
+)
+FCM_TOKEN_URI = os.getenv("FCM_TOKEN_URI", "")  # empty: token_uri from the service account file
+FCM_SERVICE_ACCOUNT_FILE = os.getenv("FCM_SERVICE_ACCOUNT_FILE", "")  # empty: admin.json at the repo root
+# Concurrent FCM requests per process (also the HTTP connection pool size). httpx's pool
+# bookkeeping grows with the square of the connection count: 25 delivered ~3x the sends/s
+# of 50 in benchmarks/push_bench.py.
+FCM_MAX_CONCURRENCY = int(os.getenv("FCM_MAX_CONCURRENCY", "25"))
+# Throttled (429), 5xx and transport failures are retried with exponential backoff and jitter
+FCM_MAX_RETRIES = int(os.getenv("FCM_MAX_RETRIES", "3"))
+FCM_RETRY_BASE_SECONDS = float(os.getenv("FCM_RETRY_BASE_SECONDS", "0.5"))
+
+# --- Prescription expiry ---
+# Flip active prescriptions past expires_at to "expired" and notify patients
+# PRESCRIPTION_EXPIRY_NOTICE_DAYS ahead. Safe in several processes (FOR UPDATE SKIP LOCKED);
+# or run `python -m services.prescription_expiry` separately. Sent notices are remembered
+# through their outbox events, so the notice window must be shorter than OUTBOX_RETENTION_DAYS
+# (checked below): a purged event would otherwise let the same notice go out twice.
+PRESCRIPTION_EXPIRY_ENABLED = _env_bool("PRESCRIPTION_EXPIRY_ENABLED", False)
+PRESCRIPTION_EXPIRY_BATCH_SIZE = int(os.getenv("PRESCRIPTION_EXPIRY_BATCH_SIZE", "500"))
+PRESCRIPTION_EXPIRY_INTERVAL_SECONDS = float(os.getenv("PRESCRIPTION_EXPIRY_INTERVAL_SECONDS", "60"))
+PRESCRIPTION_EXPIRY_NOTICE_DAYS = int(os.getenv("PRESCRIPTION_EXPIRY_NOTICE_DAYS", "3"))
+if PRESCRIPTION_EXPIRY_NOTICE_DAYS >= OUTBOX_RETENTION_DAYS:
+    raise ValueError(
+        f"PRESCRIPTION_EXPIRY_NOTICE_DAYS ({PRESCRIPTION_EXPIRY_NOTICE_DAYS}) must be less than "
+        f"OUTBOX_RETENTION_DAYS ({OUTBOX_RETENTION_DAYS})"
+    )
+
+# --- Medication dose schedule ---
+# Dose times are precomputed at most this far past the prescription start
+MEDICATION_DOSE_MAX_DAYS = int(os.getenv("MEDICATION_DOSE_MAX_DAYS", "365"))
+MEDICATION_DOSE_DUE_MAX_HOURS = int(os.getenv("MEDICATION_DOSE_DUE_MAX_HOURS", "168"))
+
+# --- Notifications partitioning ---
+# Inbox queries only look at this many days of history (partition pruning)
+NOTIFICATION_INBOX_DAYS = int(os.getenv("NOTIFICATION_INBOX_DAYS", "90"))
+NOTIFICATION_PARTITION_MONTHS_AHEAD = int(os.getenv("NOTIFICATION_PARTITION_MONTHS_AHEAD", "3"))
+NOTIFICATION_RETENTION_MONTHS = int(os.getenv("NOTIFICATION_RETENTION_MONTHS", "12"))
+# "drop" old partitions, or "archive" them into the notifications_archive schema
+NOTIFICATION_RETENTION_MODE = os.getenv("NOTIFICATION_RETENTION_MODE", "drop").strip().lower()
+
+# --- Doctor dashboard ---
+# Aggregates are cached per doctor and dropped on appointment/slot changes; the TTL
+# only bounds how stale "next appointment" can get as time passes.
+DASHBOARD_CACHE_TTL_SECONDS = float(os.getenv("DASHBOARD_CACHE_TTL_SECONDS", "60"))
+DASHBOARD_DEFAULT_DAYS = int(os.getenv("DASHBOARD_DEFAULT_DAYS", "30"))
+DASHBOARD_MAX_DAYS = int(os.getenv("DASHBOARD_MAX_DAYS", "366"))
+
+# --- Statement warm-up ---
+# Compile the prebuilt hot-path statements (db/statements.py) when a worker starts
+STATEMENT_WARMUP_ENABLED = _env_bool("STATEMENT_WARMUP_ENABLED", True)
+
+# --- Slot waitlist ---
+# A freed slot is held for the first matching waitlisted patient for WAITLIST_HOLD_MINUTES;
+# the sweeper passes unanswered offers on to the next patient in the queue.
+WAITLIST_HOLD_MINUTES = int(os.getenv("WAITLIST_HOLD_MINUTES", "15"))
+WAITLIST_SWEEPER_ENABLED = _env_bool("WAITLIST_SWEEPER_ENABLED", True)
+WAITLIST_SWEEP_INTERVAL_SECONDS = float(os.getenv("WAITLIST_SWEEP_INTERVAL_SECONDS", "30"))
+WAITLIST_SWEEP_BATCH_SIZE = int(os.getenv("WAITLIST_SWEEP_BATCH_SIZE", "200"))
+
+# --- Read replicas ---
+# Replicas are listed in DATABASE_REPLICA_URLS (see db/session.py). After a client's own
+# write, its reads stay on the primary for this many seconds.
+REPLICA_READ_YOUR_WRITES_SECONDS = float(os.getenv("REPLICA_READ_YOUR_WRITES_SECONDS", "5"))
+
+# --- Availability calendar ---
+CALENDAR_CACHE_TTL_SECONDS = float(os.getenv("CALENDAR_CACHE_TTL_SECONDS", "300"))
+CALENDAR_DEFAULT_DAYS = int(os.getenv("CALENDAR_DEFAULT_DAYS", "31"))
+CALENDAR_MAX_DAYS = int(os.getenv("CALENDAR_MAX_DAYS", "92"))
+
+# --- Earliest slot search ---
+SLOT_SEARCH_DEFAULT_DAYS = int(os.getenv("SLOT_SEARCH_DEFAULT_DAYS", "30"))
+SLOT_SEARCH_MAX_DAYS = int(os.getenv("SLOT_SEARCH_MAX_DAYS", "92"))
+SLOT_SEARCH_MAX_RESULTS = int(os.getenv("SLOT_SEARCH_MAX_RESULTS", "50"))
+
+# --- Idempotency keys ---
+# Stored responses are replayed for retries within this window; older keys are purged
+IDEMPOTENCY_TTL_HOURS = int(os.getenv("IDEMPOTENCY_TTL_HOURS", "24"))
+
+# --- Admission control ---
+# Per route class (booking / write / read): per-client token bucket (rate per second, burst),
+# concurrent requests per worker, queue length and wait before shedding, and the Postgres
+# statement timeout. Keep the sum of the concurrency caps close to the DB pool size.
+ADMISSION_ENABLED = _env_bool("ADMISSION_ENABLED", True)
+ADMISSION_BOOKING_RATE = float(os.getenv("ADMISSION_BOOKING_RATE", "1"))
+ADMISSION_BOOKING_BURST = int(os.getenv("ADMISSION_BOOKING_BURST", "5"))
+ADMISSION_BOOKING_CONCURRENCY = int(os.getenv("ADMISSION_BOOKING_CONCURRENCY", "4"))
+ADMISSION_BOOKING_STATEMENT_TIMEOUT_MS = int(os.getenv("ADMISSION_BOOKING_STATEMENT_TIMEOUT_MS", "3000"))
+ADMISSION_WRITE_RATE = float(os.getenv("ADMISSION_WRITE_RATE", "5"))
+ADMISSION_WRITE_BURST = int(os.getenv("ADMISSION_WRITE_BURST", "20"))
+ADMISSION_WRITE_CONCURRENCY = int(os.getenv("ADMISSION_WRITE_CONCURRENCY", "4"))
+ADMISSION_WRITE_STATEMENT_TIMEOUT_MS = int(os.getenv("ADMISSION_WRITE_STATEMENT_TIMEOUT_MS", "5000"))
+ADMISSION_READ_RATE = float(os.getenv("ADMISSION_READ_RATE", "20"))
+ADMISSION_READ_BURST = int(os.getenv("ADMISSION_READ_BURST", "60"))
+ADMISSION_READ_CONCURRENCY = int(os.getenv("ADMISSION_READ_CONCURRENCY", "8"))
+ADMISSION_READ_STATEMENT_TIMEOUT_MS = int(os.getenv("ADMISSION_READ_STATEMENT_TIMEOUT_MS", "2000"))
+ADMISSION_MAX_QUEUE = int(os.getenv("ADMISSION_MAX_QUEUE", "50"))
+ADMISSION_MAX_WAIT_SECONDS = float(os.getenv("ADMISSION_MAX_WAIT_SECONDS", "2"))
+
+# --- Authentication ---
+# Bearer JWTs are verified locally: HS256 with AUTH_JWT_SECRET, or RS256/ES256 with the
+# identity provider's keys from AUTH_JWKS_URL. `sub` is the user id, `user_type` is
+# "patient" or "doctor".
+AUTH_JWT_SECRET = os.getenv("AUTH_JWT_SECRET", "")
+AUTH_JWKS_URL = os.getenv("AUTH_JWKS_URL", "")
+AUTH_JWT_ALGORITHMS = [
+    alg.strip() for alg in os.getenv("AUTH_JWT_ALGORITHMS", "HS256").split(",") if alg.strip()
+]
+AUTH_JWT_ISSUER = os.getenv("AUTH_JWT_ISSUER") or None
+AUTH_JWT_AUDIENCE = os.getenv("AUTH_JWT_AUDIENCE") or None
+AUTH_JWT_LEEWAY_SECONDS = int(os.getenv("AUTH_JWT_LEEWAY_SECONDS", "30"))
+# Parsed signing keys are kept this long; an unknown key id refetches at most every MIN_REFRESH
+AUTH_JWKS_TTL_SECONDS = float(os.getenv("AUTH_JWKS_TTL_SECONDS", "3600"))
+AUTH_JWKS_MIN_REFRESH_SECONDS = float(os.getenv("AUTH_JWKS_MIN_REFRESH_SECONDS", "60"))
+# Verified tokens are remembered (until they expire) so repeat requests skip signature checks
+AUTH_TOKEN_CACHE_SIZE = int(os.getenv("AUTH_TOKEN_CACHE_SIZE", "10000"))
+# Doctor/patient existence checks for authenticated principals
+AUTH_PRINCIPAL_CACHE_TTL_SECONDS = float(os.getenv("AUTH_PRINCIPAL_CACHE_TTL_SECONDS", "300"))
+
+# --- Batch lookups ---
+# Upper bound on ids per batch request (/doctors/batch, /appointments/details/batch, ...)
+BATCH_MAX_IDS = int(os.getenv("BATCH_MAX_IDS", "100"))
+
+# --- Bulk import ---
+# Rows validated, staged and merged per transaction; per-row errors kept in the report
+IMPORT_CHUNK_ROWS = int(os.getenv("IMPORT_CHUNK_ROWS", "5000"))
+IMPORT_MAX_REPORTED_ERRORS = int(os.getenv("IMPORT_MAX_REPORTED_ERRORS", "1000"))
@@ -0,0 +1,43 @@
+# core/fieldsets.py
+"""
+Sparse fieldsets for list endpoints: `?fields=id,first_name,photo_url`.
+
+A FieldSet maps API field names to model columns. Only the requested columns
+are SELECTed, in the order of the parsed names, so a row becomes a dict by
+zipping it with those names: no per-row lookups, however flexible the
+endpoint is. Fields not listed in the map (e.g. passwords) can never be
+requested.
+"""
+from typing import Any, Callable, Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException
+
+Serializer = Callable[[Tuple[Any, ...]], Dict[str, Any]]
+
+
+class FieldSet:
+    def __init__(self, columns: Dict[str, Any], default: Optional[Iterable[str]] = None, always: Iterable[str] = ("id",)):
+        self.columns = columns
+        self.default = tuple(default) if default is not None else tuple(columns)
+        self.always = tuple(always)
+
+    def parse(self, fields: Optional[str]) -> Tuple[str, ...]:
+        """Validate a comma-separated `fields` value; returns the names in canonical order."""
+        if not fields:
+            return self.default
+        requested = {name.strip() for name in fields.split(",") if name.strip()}
+        unknown = sorted(requested - self.columns.keys())
+        if unknown:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Unknown fields: {', '.join(unknown)}. Allowed: {', '.join(self.columns)}"
+            )
+        requested.update(self.always)
+        # Canonical order, so "a,b" and "b,a" share one query shape
+        return tuple(name for name in self.columns if name in requested)
+
+    def select(self, names: Tuple[str, ...]) -> List[Any]:
+        return [self.columns[name] for name in names]
+
+    def serializer(self, names: Tuple[str, ...]) -> Serializer:
+        return lambda row: dict(zip(names, row))
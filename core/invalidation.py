@@ -0,0 +1,266 @@
+# core/invalidation.py
+"""
+Cross-worker cache invalidation bus.
+
+Services announce writes with publish_after_commit(db, topic, key). The
+message is delivered to subscribers in the current process once the
+transaction commits, and to every other worker through the configured
+backend:
+
+- "local":    single process, nothing leaves the process.
+- "socket":   one unix datagram socket per worker in INVALIDATION_SOCKET_DIR;
+              a publisher sends to every socket in the directory.
+- "postgres": NOTIFY on INVALIDATION_CHANNEL, issued inside the writing
+              transaction so it is only delivered if the commit succeeds;
+              each worker LISTENs on a dedicated connection.
+
+Subscribers receive (topic, key). A key of "*" means "drop everything for
+this topic" and is sent after a listener reconnects, since messages may have
+been missed while it was disconnected.
+"""
+import json
+import logging
+import os
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import defaultdict
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from sqlalchemy import event, text
+from sqlalchemy.engine import make_url
+from sqlalchemy.orm import Session
+
+logger = logging.getLogger(__name__)
+
+Key = Union[int, str]
+Subscriber = Callable[[str, Key], None]
+
+# Topics published by the services
+DOCTOR = "doctor"              # key: doctor id
+SLOT = "slot"                  # key: doctor id whose time slots changed
+SPECIALTY = "specialty"        # key: specialty id
+NOTIFICATION = "notification"  # key: "<user_type>:<user_id>"
+APPOINTMENT = "appointment"    # key: appointment id
+DOCTOR_APPOINTMENTS = "doctor_appointments"  # key: doctor id whose appointments changed
+
+ALL_KEYS = "*"
+
+_SESSION_QUEUE = "pending_invalidations"
+
+
+class InvalidationBus:
+    def __init__(self, backend: str = "local", socket_dir: str = "", database_url: str = "", channel: str = ""):
+        self.backend = backend
+        self.socket_dir = socket_dir
+        self.database_url = database_url
+        self.channel = channel
+        self.origin = uuid.uuid4().hex[:12]
+        self._subscribers: Dict[str, List[Subscriber]] = defaultdict(list)
+        self._thread: Optional[threading.Thread] = None
+        self._stopping = threading.Event()
+        self._socket: Optional[socket.socket] = None
+        self._socket_path = ""
+        self._peers: List[str] = []
+        self._peers_listed_at = 0.0
+
+    # --- subscribing / delivering ---
+
+    def subscribe(self, topic: str, callback: Subscriber) -> None:
+        self._subscribers[topic].append(callback)
+
+    def _deliver(self, topic: str, key: Key) -> None:
+        for callback in self._subscribers.get(topic, ()):
+            try:
+                callback(topic, key)
+            except Exception:
+                logger.exception("Invalidation subscriber failed for %s:%s", topic, key)
+
+    def _deliver_all(self, key: Key = ALL_KEYS) -> None:
+        for topic in list(self._subscribers):
+            self._deliver(topic, key)
+
+    def _encode(self, messages: List[Tuple[str, Key]]) -> str:
+        return json.dumps({"o": self.origin, "m": messages}, separators=(",", ":"))
+
+    def _handle_payload(self, payload: Union[str, bytes]) -> None:
+        try:
+            data = json.loads(payload)
+        except ValueError:
+            logger.warning("Ignoring malformed invalidation payload")
+            return
+        if data.get("o") == self.origin:
+            return  # already delivered locally at commit time
+        for topic, key in data.get("m", ()):
+            self._deliver(topic, key)
+
+    # --- publishing ---
+
+    def publish(self, topic: str, key: Key) -> None:
+        """Publish immediately, outside of any transaction."""
+        self._deliver(topic, key)
+        self._broadcast([(topic, key)])
+
+    def publish_after_commit(self, db: Session, topic: str, key: Key) -> None:
+        """Queue an invalidation on the session; it is sent only if the transaction commits."""
+        db.info.setdefault(_SESSION_QUEUE, []).append((topic, key))
+
+    def _broadcast(self, messages: List[Tuple[str, Key]]) -> None:
+        if self.backend == "socket":
+            self._send_to_peers(self._encode(messages).encode("utf-8"))
+        elif self.backend == "postgres":
+            from db.session import engine
+            with engine.begin() as conn:
+                conn.execute(text("SELECT pg_notify(:channel, :payload)"),
+                             {"channel": self.channel, "payload": self._encode(messages)})
+
+    def _before_commit(self, db: Session) -> None:
+        if self.backend != "postgres":
+            return
+        messages = db.info.get(_SESSION_QUEUE)
+        if messages:
+            # NOTIFY is transactional: listeners only see it if this commit succeeds.
+            db.execute(text("SELECT pg_notify(:channel, :payload)"),
+                       {"channel": self.channel, "payload": self._encode(messages)})
+
+    def _after_commit(self, db: Session) -> None:
+        messages = db.info.pop(_SESSION_QUEUE, None)
+        if not messages:
+            return
+        for topic, key in dict.fromkeys(messages):
+            self._deliver(topic, key)
+        if self.backend == "socket":
+            self._send_to_peers(self._encode(messages).encode("utf-8"))
+
+    def _after_rollback(self, db: Session) -> None:
+        db.info.pop(_SESSION_QUEUE, None)
+
+    # --- socket backend ---
+
+    def _list_peers(self) -> List[str]:
+        now = time.monotonic()
+        if now - self._peers_listed_at > 1.0:
+            try:
+                names = os.listdir(self.socket_dir)
+            except FileNotFoundError:
+                names = []
+            self._peers = [
+                os.path.join(self.socket_dir, name) for name in names
+                if name.endswith(".sock") and os.path.join(self.socket_dir, name) != self._socket_path
+            ]
+            self._peers_listed_at = now
+        return self._peers
+
+    def _send_to_peers(self, payload: bytes) -> None:
+        sender = self._socket or socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+        for path in self._list_peers():
+            try:
+                sender.sendto(payload, path)
+            except (ConnectionRefusedError, FileNotFoundError):
+                # Worker is gone; remove its socket so we stop sending to it.
+                try:
+                    os.unlink(path)
+                except OSError:
+                    pass
+                self._peers_listed_at = 0.0
+            except OSError:
+                logger.exception("Could not send invalidation to %s", path)
+        if sender is not self._socket:
+            sender.close()
+
+    def _run_socket_listener(self) -> None:
+        while not self._stopping.is_set():
+            ready, _, _ = select.select([self._socket], [], [], 0.5)
+            if ready:
+                payload = self._socket.recv(65536)
+                self._handle_payload(payload)
+
+    # --- postgres backend ---
+
+    def _run_postgres_listener(self) -> None:
+        import psycopg2
+        from psycopg2.extensions import ISOLATION_LEVEL_AUTOCOMMIT
+
+        connected_before = False
+        while not self._stopping.is_set():
+            try:
+                conn = psycopg2.connect(self.database_url)
+            except psycopg2.OperationalError:
+                logger.warning("Invalidation listener could not connect, retrying")
+                self._stopping.wait(1.0)
+                continue
+            try:
+                conn.set_isolation_level(ISOLATION_LEVEL_AUTOCOMMIT)
+                with conn.cursor() as cur:
+                    cur.execute(f'LISTEN "{self.channel}"')
+                if connected_before:
+                    self._deliver_all()
+                connected_before = True
+                while not self._stopping.is_set():
+                    if select.select([conn], [], [], 0.5)[0]:
+                        conn.poll()
+                        while conn.notifies:
+                            self._handle_payload(conn.notifies.pop(0).payload)
+            except psycopg2.Error:
+                logger.warning("Invalidation listener lost its connection, reconnecting")
+            finally:
+                conn.close()
+
+    # --- lifecycle ---
+
+    def start(self) -> None:
+        if self._thread is not None or self.backend == "local":
+            return
+        self._stopping.clear()
+        if self.backend == "socket":
+            os.makedirs(self.socket_dir, exist_ok=True)
+            self._socket_path = os.path.join(self.socket_dir, f"{os.getpid()}.sock")
+            if os.path.exists(self._socket_path):
+                os.unlink(self._socket_path)
+            self._socket = socket.socket(socket.AF_UNIX, socket.SOCK_DGRAM)
+            self._socket.bind(self._socket_path)
+            target = self._run_socket_listener
+        elif self.backend == "postgres":
+            target = self._run_postgres_listener
+        else:
+            raise ValueError(f"Unknown invalidation backend: {self.backend}")
+        self._thread = threading.Thread(target=target, name="invalidation-listener", daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stopping.set()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        if self._socket is not None:
+            self._socket.close()
+            self._socket = None
+            try:
+                os.unlink(self._socket_path)
+            except OSError:
+                pass
+
+
+def _create_bus() -> InvalidationBus:
+    from core import config
+    from db.session import DATABASE_URL
+
+    return InvalidationBus(
+        backend=config.INVALIDATION_BACKEND,
+        socket_dir=config.INVALIDATION_SOCKET_DIR,
+        database_url=make_url(DATABASE_URL).set(drivername="postgresql").render_as_string(hide_password=False),
+        channel=config.INVALIDATION_CHANNEL,
+    )
+
+
+bus = _create_bus()
+
+event.listen(Session, "before_commit", bus._before_commit)
+event.listen(Session, "after_commit", bus._after_commit)
+event.listen(Session, "after_rollback", bus._after_rollback)
+
+publish = bus.publish
+publish_after_commit = bus.publish_after_commit
+subscribe = bus.subscribe
@@ -0,0 +1,169 @@
+# core/metrics.py
+"""
+Prometheus metrics.
+
+When PROMETHEUS_MULTIPROC_DIR is set (required when running several worker
+processes), prometheus_client keeps every value in a per-process mmap file and
+/metrics aggregates all of them; otherwise the default in-process registry is
+used. The directory must be emptied before the server starts, and a process
+manager should call mark_process_dead(pid) when a worker exits.
+"""
+import os
+import time
+from typing import Dict, Tuple
+
+from prometheus_client import (
+    CONTENT_TYPE_LATEST,
+    REGISTRY,
+    CollectorRegistry,
+    Counter,
+    Gauge,
+    Histogram,
+    generate_latest,
+    multiprocess,
+)
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+HTTP_REQUEST_DURATION = Histogram(
+    "http_request_duration_seconds",
+    "HTTP request latency by route template.",
+    ["method", "route"],
+)
+HTTP_REQUESTS = Counter(
+    "http_requests_total",
+    "HTTP responses by route template and status code.",
+    ["method", "route", "status"],
+)
+DB_POOL_CHECKED_OUT = Gauge(
+    "db_pool_checked_out_connections",
+    "Connections currently checked out of the SQLAlchemy pool.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+DB_POOL_SIZE = Gauge(
+    "db_pool_size",
+    "Configured SQLAlchemy pool size.",
+    ["engine"],
+    multiprocess_mode="livesum",
+)
+CACHE_REQUESTS = Counter(
+    "cache_requests_total",
+    "Cache lookups by cache name and result (hit/miss); hit ratio = hit / (hit + miss).",
+    ["cache", "result"],
+)
+PUSH_SEND_DURATION = Histogram(
+    "push_send_duration_seconds",
+    "Latency of FCM push sends, including OAuth token refresh.",
+)
+PUSH_SENDS = Counter(
+    "push_sends_total",
+    "FCM push sends by outcome (success, error, unregistered, exception).",
+    ["outcome"],
+)
+PUSH_RETRIES = Counter(
+    "push_retries_total",
+    "FCM send attempts retried, by reason (HTTP status, transport, unauthorized).",
+    ["reason"],
+)
+SINGLEFLIGHT_CALLS = Counter(
+    "singleflight_calls_total",
+    "Coalesced calls by group and role; coalescing ratio = follower / (leader + follower).",
+    ["group", "role"],
+)
+ADMISSION_REJECTIONS = Counter(
+    "admission_rejections_total",
+    "Requests rejected by admission control, by route class and reason.",
+    ["route_class", "reason"],
+)
+
+UNMATCHED_ROUTE = "unmatched"
+
+
+def record_cache_lookup(cache: str, hit: bool) -> None:
+    CACHE_REQUESTS.labels(cache, "hit" if hit else "miss").inc()
+
+
+def observe_push_send(started_at: float, outcome: str) -> None:
+    PUSH_SEND_DURATION.observe(time.perf_counter() - started_at)
+    PUSH_SENDS.labels(outcome).inc()
+
+
+def attach_engine(engine: Engine, name: str = "primary") -> None:
+    """Track pool usage through checkout/checkin events."""
+    checked_out = DB_POOL_CHECKED_OUT.labels(name)
+    size = getattr(engine.pool, "size", None)
+    if callable(size):
+        DB_POOL_SIZE.labels(name).set(size())
+
+    @event.listens_for(engine, "checkout")
+    def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+        checked_out.inc()
+
+    @event.listens_for(engine, "checkin")
+    def _on_checkin(dbapi_connection, connection_record):
+        checked_out.dec()
+
+
+def render_latest() -> Tuple[bytes, str]:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        registry = CollectorRegistry()
+        multiprocess.MultiProcessCollector(registry)
+        return generate_latest(registry), CONTENT_TYPE_LATEST
+    return generate_latest(REGISTRY), CONTENT_TYPE_LATEST
+
+
+def mark_process_dead(pid: int) -> None:
+    if os.environ.get("PROMETHEUS_MULTIPROC_DIR"):
+        multiprocess.mark_process_dead(pid)
+
+
+class MetricsMiddleware:
+    """
+    Pure ASGI middleware recording latency and status per route template.
+    Labelled children are cached so the hot path is a dict lookup plus two updates.
+    """
+
+    def __init__(self, app):
+        self.app = app
+        self._histograms: Dict[Tuple[str, str], object] = {}
+        self._counters: Dict[Tuple[str, str, int], object] = {}
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = 500
+        started_at = time.perf_counter()
+
+        async def send_with_status(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            elapsed = time.perf_counter() - started_at
+            route = getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+            method = scope["method"]
+
+            histogram = self._histograms.get((method, route))
+            if histogram is None:
+                histogram = self._histograms[(method, route)] = HTTP_REQUEST_DURATION.labels(method, route)
+            histogram.observe(elapsed)
+
+            counter = self._counters.get((method, route, status_code))
+            if counter is None:
+                counter = self._counters[(method, route, status_code)] = HTTP_REQUESTS.labels(
+                    method, route, str(status_code)
+                )
+            counter.inc()
+
+
+def install(app, engines: Dict[str, Engine]) -> None:
+    for name, engine in engines.items():
+        attach_engine(engine, name)
+    app.add_middleware(MetricsMiddleware)
@@ -0,0 +1,75 @@
+# core/replica_routing.py
+"""
+Read-replica routing per request (active when DATABASE_REPLICA_URLS is set).
+
+GET/HEAD requests may read from a replica; every other method uses the
+primary. After a successful write the response carries a
+`db_primary_until` cookie (and an X-DB-Primary-Until header for clients
+without a cookie jar, which they can send back as a request header). Until
+it expires, that client's reads also go to the primary, so it sees its own
+writes despite replication lag.
+
+Local setup with two instances, e.g. a streaming replica from the bitnami
+image (POSTGRESQL_REPLICATION_MODE=master/slave), then:
+
+    DATABASE_URL=postgresql://...:5432/doctor_appointment
+    DATABASE_REPLICA_URLS=postgresql://...:5433/doctor_appointment
+
+Responses carry X-DB-Route: replica|primary, showing where the reads went.
+"""
+import time
+
+from starlette.datastructures import MutableHeaders
+from starlette.requests import HTTPConnection
+
+from db.session import replica_reads
+
+COOKIE_NAME = "db_primary_until"
+HEADER_NAME = "X-DB-Primary-Until"
+_READ_METHODS = ("GET", "HEAD")
+
+
+def _primary_until(scope) -> float:
+    connection = HTTPConnection(scope)
+    value = connection.cookies.get(COOKIE_NAME) or connection.headers.get(HEADER_NAME)
+    try:
+        return float(value) if value else 0.0
+    except ValueError:
+        return 0.0
+
+
+class ReplicaRoutingMiddleware:
+    """Pure ASGI middleware deciding, per request, whether reads may go to a replica."""
+
+    def __init__(self, app, read_your_writes_seconds: float = 5.0):
+        self.app = app
+        self.read_your_writes_seconds = read_your_writes_seconds
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        is_read = scope["method"] in _READ_METHODS
+        use_replica = is_read and _primary_until(scope) <= time.time()
+
+        async def send_with_routing(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Route"] = "replica" if use_replica else "primary"
+                if not is_read and message["status"] < 400:
+                    until = time.time() + self.read_your_writes_seconds
+                    headers[HEADER_NAME] = f"{until:.3f}"
+                    headers.append(
+                        "set-cookie",
+                        f"{COOKIE_NAME}={until:.3f}; Max-Age={int(self.read_your_writes_seconds) + 1}; "
+                        "Path=/; HttpOnly; SameSite=Lax",
+                    )
+            await send(message)
+
+        with replica_reads(use_replica):
+            await self.app(scope, receive, send_with_routing)
+
+
+def install(app, read_your_writes_seconds: float) -> None:
+    app.add_middleware(ReplicaRoutingMiddleware, read_your_writes_seconds=read_your_writes_seconds)
@@ -0,0 +1,158 @@
+# core/singleflight.py
+"""
+Single-flight request coalescing.
+
+Concurrent calls with the same key share one execution: the first caller
+(the leader) runs the function, the others wait and receive its result or
+its exception. Nothing is cached once the call finishes; combine with
+core.cache when results may be reused afterwards.
+
+    @singleflight.coalesce("appointments_for_doctor", key=lambda db, doctor_id: doctor_id)
+    def get_detailed_appointments_for_doctor(db, doctor_id): ...
+
+The result object is handed to every waiter, so coalesced functions should
+return plain data (dicts, pydantic models), not ORM objects bound to the
+leader's session.
+"""
+import functools
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, List, Optional
+
+from sqlalchemy.orm import Session
+
+from core import metrics
+
+_MAX_TRACKED_KEYS = 1000
+_TOP_KEYS = 20
+
+
+class _Call:
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class _KeyStats:
+    __slots__ = ("calls", "executions")
+
+    def __init__(self):
+        self.calls = 0
+        self.executions = 0
+
+
+class SingleFlight:
+    def __init__(self, name: str):
+        self.name = name
+        self._lock = threading.Lock()
+        self._calls: Dict[Hashable, _Call] = {}
+        # Most recently used keys last; bounded so arbitrary ids cannot grow it forever
+        self._stats: "OrderedDict[Hashable, _KeyStats]" = OrderedDict()
+        self.calls = 0
+        self.executions = 0
+        self._leader_counter = metrics.SINGLEFLIGHT_CALLS.labels(name, "leader")
+        self._follower_counter = metrics.SINGLEFLIGHT_CALLS.labels(name, "follower")
+
+    def _record(self, key: Hashable, leader: bool) -> None:
+        stats = self._stats.get(key)
+        if stats is None:
+            stats = self._stats[key] = _KeyStats()
+            if len(self._stats) > _MAX_TRACKED_KEYS:
+                self._stats.popitem(last=False)
+        else:
+            self._stats.move_to_end(key)
+        stats.calls += 1
+        self.calls += 1
+        if leader:
+            stats.executions += 1
+            self.executions += 1
+
+    def do(self, key: Hashable, fn: Callable[[], Any]) -> Any:
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = _Call()
+            self._record(key, leader)
+
+        if not leader:
+            self._follower_counter.inc()
+            call.done.wait()
+            if call.error is not None:
+                raise call.error
+            return call.result
+
+        self._leader_counter.inc()
+        try:
+            call.result = fn()
+            return call.result
+        except BaseException as exc:
+            call.error = exc
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call.done.set()
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            top = sorted(self._stats.items(), key=lambda item: item[1].calls, reverse=True)[:_TOP_KEYS]
+            return {
+                "calls": self.calls,
+                "executions": self.executions,
+                "coalescing_ratio": _ratio(self.calls, self.executions),
+                "in_flight": len(self._calls),
+                "top_keys": [
+                    {
+                        "key": repr(key),
+                        "calls": stats.calls,
+                        "executions": stats.executions,
+                        "coalescing_ratio": _ratio(stats.calls, stats.executions),
+                    }
+                    for key, stats in top
+                ],
+            }
+
+
+def _ratio(calls: int, executions: int) -> float:
+    """Share of calls that were served by another caller's execution."""
+    return round(1 - executions / calls, 4) if calls else 0.0
+
+
+_groups: Dict[str, SingleFlight] = {}
+
+
+def group(name: str) -> SingleFlight:
+    if name not in _groups:
+        _groups[name] = SingleFlight(name)
+    return _groups[name]
+
+
+def _default_key(*args, **kwargs) -> Hashable:
+    # The DB session differs per request and must not be part of the key
+    return (
+        tuple(arg for arg in args if not isinstance(arg, Session)),
+        tuple(sorted((k, v) for k, v in kwargs.items() if not isinstance(v, Session))),
+    )
+
+
+def coalesce(name: str, key: Optional[Callable[..., Hashable]] = None):
+    """Decorator: concurrent calls with the same key share one execution."""
+    flight = group(name)
+    make_key = key or _default_key
+
+    def decorator(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            return flight.do(make_key(*args, **kwargs), lambda: fn(*args, **kwargs))
+        wrapper.singleflight = flight
+        return wrapper
+
+    return decorator
+
+
+def get_stats() -> Dict[str, Dict[str, Any]]:
+    return {name: flight.stats() for name, flight in sorted(_groups.items())}
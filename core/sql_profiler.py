@@ -0,0 +1,209 @@
+# core/sql_profiler.py
+"""
+Per-request SQL profiling.
+
+Engine event listeners record statement count, DB time and statement
+fingerprints for the request currently being profiled. A fingerprint that
+repeats more than the configured threshold within one request is reported as
+a likely N+1 pattern.
+
+In "dev" mode every request is profiled and the numbers are returned as
+response headers. In "prod" mode only a sample of requests is profiled and
+the results are aggregated per route (see get_route_stats()).
+"""
+import hashlib
+import logging
+import random
+import re
+import time
+from collections import Counter
+from contextvars import ContextVar
+from typing import Any, Dict, List, Optional, Tuple
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from starlette.datastructures import MutableHeaders
+
+from core.metrics import UNMATCHED_ROUTE
+
+logger = logging.getLogger(__name__)
+
+_current_profile: ContextVar[Optional["RequestProfile"]] = ContextVar("sql_request_profile", default=None)
+
+_IN_LIST_RE = re.compile(r"\((?:\s*%\(\w+\)s\s*,?)+\)|\((?:\s*\?\s*,?)+\)")
+_STRING_RE = re.compile(r"'(?:[^']|'')*'")
+_NUMBER_RE = re.compile(r"\b\d+\b")
+_SPACE_RE = re.compile(r"\s+")
+
+# Statements are parameterized, so the set of distinct texts is small; keep their fingerprints.
+_fingerprint_cache: Dict[str, str] = {}
+_FINGERPRINT_CACHE_SIZE = 2048
+
+
+def fingerprint(statement: str) -> str:
+    """Normalize literals and IN-lists so that the same query shape maps to the same key."""
+    cached = _fingerprint_cache.get(statement)
+    if cached is not None:
+        return cached
+    normalized = _IN_LIST_RE.sub("(?)", statement)
+    normalized = _STRING_RE.sub("?", normalized)
+    normalized = _NUMBER_RE.sub("?", normalized)
+    normalized = _SPACE_RE.sub(" ", normalized).strip()
+    if len(_fingerprint_cache) >= _FINGERPRINT_CACHE_SIZE:
+        _fingerprint_cache.clear()
+    _fingerprint_cache[statement] = normalized
+    return normalized
+
+
+def fingerprint_id(normalized: str) -> str:
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:10]
+
+
+class RequestProfile:
+    __slots__ = ("statement_count", "db_time", "fingerprints")
+
+    def __init__(self):
+        self.statement_count = 0
+        self.db_time = 0.0
+        self.fingerprints: Counter = Counter()
+
+    def record(self, statement: str, elapsed: float) -> None:
+        self.statement_count += 1
+        self.db_time += elapsed
+        self.fingerprints[fingerprint(statement)] += 1
+
+    def repeated(self, threshold: int) -> List[Tuple[str, int]]:
+        return [(fp, count) for fp, count in self.fingerprints.most_common() if count >= threshold]
+
+
+class RouteStats:
+    __slots__ = ("requests", "statements", "db_time", "max_statements", "n_plus_one_requests", "repeated")
+
+    def __init__(self):
+        self.requests = 0
+        self.statements = 0
+        self.db_time = 0.0
+        self.max_statements = 0
+        self.n_plus_one_requests = 0
+        self.repeated: Counter = Counter()
+
+    def add(self, profile: RequestProfile, repeated: List[Tuple[str, int]]) -> None:
+        self.requests += 1
+        self.statements += profile.statement_count
+        self.db_time += profile.db_time
+        self.max_statements = max(self.max_statements, profile.statement_count)
+        if repeated:
+            self.n_plus_one_requests += 1
+            for fp, count in repeated:
+                self.repeated[fp] += count
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "sampled_requests": self.requests,
+            "avg_statements": round(self.statements / self.requests, 2) if self.requests else 0,
+            "max_statements": self.max_statements,
+            "avg_db_time_ms": round(self.db_time * 1000 / self.requests, 3) if self.requests else 0,
+            "n_plus_one_requests": self.n_plus_one_requests,
+            "top_repeated": [
+                {"fingerprint": fingerprint_id(fp), "executions": count, "sql": fp[:300]}
+                for fp, count in self.repeated.most_common(5)
+            ],
+        }
+
+
+# Aggregates are only touched from the event loop thread, so no locking is needed.
+_route_stats: Dict[str, RouteStats] = {}
+
+
+def get_route_stats() -> Dict[str, Dict[str, Any]]:
+    return {route: stats.as_dict() for route, stats in sorted(_route_stats.items())}
+
+
+def reset_route_stats() -> None:
+    _route_stats.clear()
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    # On the execution context rather than conn.info: it is discarded with the statement, even one that raises
+    if _current_profile.get() is not None and context is not None:
+        context._sql_profiler_start = time.perf_counter()
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    profile = _current_profile.get()
+    started_at = getattr(context, "_sql_profiler_start", None)
+    if profile is None or started_at is None:
+        return
+    profile.record(statement, time.perf_counter() - started_at)
+
+
+def attach_engine(engine: Engine) -> None:
+    """Register the profiling listeners on an engine (idempotent)."""
+    if not event.contains(engine, "before_cursor_execute", _before_cursor_execute):
+        event.listen(engine, "before_cursor_execute", _before_cursor_execute)
+        event.listen(engine, "after_cursor_execute", _after_cursor_execute)
+
+
+def _route_path(scope) -> str:
+    # Raw paths of unmatched requests (404 scans) would grow _route_stats without bound
+    return getattr(scope.get("route"), "path", None) or UNMATCHED_ROUTE
+
+
+class SQLProfilingMiddleware:
+    """Pure ASGI middleware: requests that are not sampled pay one random() call."""
+
+    def __init__(self, app, mode: str = "dev", sample_rate: float = 1.0, n_plus_one_threshold: int = 5):
+        self.app = app
+        self.mode = mode
+        self.sample_rate = sample_rate
+        self.n_plus_one_threshold = n_plus_one_threshold
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http" or (self.sample_rate < 1.0 and random.random() >= self.sample_rate):
+            await self.app(scope, receive, send)
+            return
+
+        profile = RequestProfile()
+        token = _current_profile.set(profile)
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                repeated = profile.repeated(self.n_plus_one_threshold)
+                headers = MutableHeaders(scope=message)
+                headers["X-DB-Statement-Count"] = str(profile.statement_count)
+                headers["X-DB-Time-Ms"] = f"{profile.db_time * 1000:.2f}"
+                if repeated:
+                    headers["X-DB-N-Plus-One"] = ",".join(
+                        f"{fingerprint_id(fp)}x{count}" for fp, count in repeated
+                    )
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_headers if self.mode == "dev" else send)
+        finally:
+            _current_profile.reset(token)
+            route = _route_path(scope)
+            repeated = profile.repeated(self.n_plus_one_threshold)
+            if repeated:
+                for fp, count in repeated:
+                    logger.warning(
+                        "Possible N+1 on %s %s: %d executions of [%s] %s",
+                        scope.get("method"), route, count, fingerprint_id(fp), fp[:200],
+                    )
+            if self.mode == "prod":
+                stats = _route_stats.get(route)
+                if stats is None:
+                    stats = _route_stats[route] = RouteStats()
+                stats.add(profile, repeated)
+
+
+def install(app, engines, mode: str, sample_rate: float, n_plus_one_threshold: int) -> None:
+    """Attach the listeners to every engine and add the middleware to the app."""
+    for engine in engines:
+        attach_engine(engine)
+    app.add_middleware(
+        SQLProfilingMiddleware,
+        mode=mode,
+        sample_rate=sample_rate,
+        n_plus_one_threshold=n_plus_one_threshold,
+    )
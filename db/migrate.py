@@ -0,0 +1,98 @@
+# db/migrate.py
+"""
+Schema management, run as a deployment step instead of at import time:
+
+    python -m db.migrate
+"""
+import logging
+import time
+
+from sqlalchemy import inspect
+from sqlalchemy.engine import Engine
+from sqlalchemy.schema import CreateColumn
+
+from db import partitions, tables
+from db.session import engine
+from db.models import appointment_models
+
+logger = logging.getLogger(__name__)
+
+
+def run_migrations(bind: Engine = engine) -> None:
+    """Create missing tables and indexes. Safe to run repeatedly."""
+    metadata = appointment_models.Base.metadata
+    metadata.create_all(bind=bind)
+    # create_all skips tables that already exist, so add columns and indexes declared since then.
+    _add_columns(bind, metadata)
+    for table in metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=bind, checkfirst=True)
+    # Tables owned by the prescription service only get our read indexes.
+    existing = set(inspect(bind).get_table_names())
+    for table in tables.metadata.sorted_tables:
+        if table.name in existing:
+            for index in table.indexes:
+                index.create(bind=bind, checkfirst=True)
+    if bind.dialect.name == "postgresql":
+        _add_enum_values(bind)
+        _update_foreign_key_actions(bind, metadata)
+        partitions.maintain(bind)
+
+
+def _add_columns(bind: Engine, metadata) -> None:
+    """New columns must be nullable or carry a server default to be added to populated tables."""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            present = {column["name"] for column in inspector.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present:
+                    logger.info("Adding column %s.%s", table.name, column.name)
+                    conn.exec_driver_sql(
+                        f"ALTER TABLE {table.name} ADD COLUMN {CreateColumn(column).compile(dialect=bind.dialect)}"
+                    )
+
+
+def _update_foreign_key_actions(bind: Engine, metadata) -> None:
+    """create_all does not alter existing constraints; recreate foreign keys whose declared ON DELETE differs."""
+    inspector = inspect(bind)
+    with bind.begin() as conn:
+        for table in metadata.sorted_tables:
+            existing = {
+                tuple(fk["constrained_columns"]): fk for fk in inspector.get_foreign_keys(table.name) if fk["name"]
+            }
+            for constraint in table.foreign_key_constraints:
+                if constraint.ondelete is None:
+                    continue
+                fk = existing.get(tuple(constraint.column_keys))
+                wanted = constraint.ondelete.upper()
+                if fk is None or (fk["options"].get("ondelete") or "NO ACTION").upper() == wanted:
+                    continue
+                logger.info("Setting ON DELETE %s on %s.%s", wanted, table.name, fk["name"])
+                columns = ", ".join(constraint.column_keys)
+                conn.exec_driver_sql(f"ALTER TABLE {table.name} DROP CONSTRAINT {fk['name']}")
+                conn.exec_driver_sql(
+                    f"ALTER TABLE {table.name} ADD CONSTRAINT {fk['name']} FOREIGN KEY ({columns}) "
+                    f"REFERENCES {constraint.referred_table.name} ({', '.join(fk['referred_columns'])}) "
+                    f"ON DELETE {wanted}"
+                )
+
+
+def _add_enum_values(bind: Engine) -> None:
+    """create_all does not alter existing enum types; add members declared since they were created."""
+    with bind.connect().execution_options(isolation_level="AUTOCOMMIT") as conn:
+        for member in appointment_models.NotificationType:
+            conn.exec_driver_sql(
+                f"ALTER TYPE notification_type_enum ADD VALUE IF NOT EXISTS '{member.name}'"
+            )
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    started_at = time.perf_counter()
+    run_migrations()
+    logger.info("Schema up to date (%.0f ms)", (time.perf_counter() - started_at) * 1000)
+
+
+if __name__ == "__main__":
+    main()
@@ -2,13 +2,18 @@
 from sqlalchemy import Column, Integer, String, ForeignKey, Enum as SQLAlchemyEnum, Date, Time, Text, DECIMAL
 from sqlalchemy.orm import relationship
 from ..session import Base # Assuming db/session.py
-from sqlalchemy import (Column, Integer, String, Text, Boolean, TIMESTAMP, ForeignKey,
-                        Enum, DECIMAL, TIME, DATE, and_)
+from sqlalchemy import (Column, Integer, BigInteger, String, Text, Boolean, TIMESTAMP, ForeignKey,
+                        Enum, DECIMAL, TIME, DATE, JSON, Index, PrimaryKeyConstraint, and_, func)
 from sqlalchemy.orm import relationship,  foreign
 from sqlalchemy.dialects.postgresql import JSONB
+from sqlalchemy.ext.compiler import compiles
 from sqlalchemy.ext.declarative import declarative_base
 import enum
 
+# Postgres column types with fallbacks, so the schema also builds on sqlite (benchmarks, local runs)
+JSONDocument = JSON().with_variant(JSONB(), "postgresql")
+BigId = BigInteger().with_variant(Integer(), "sqlite")  # sqlite only autoincrements INTEGER PRIMARY KEY
+
 class AppointmentStatus(enum.Enum):
     pending = "pending"
     confirmed = "confirmed"
@@ -26,6 +31,7 @@ class NotificationType(enum.Enum):
     DECLINED = "DECLINED"
     UPCOMING = "UPCOMING"
     PRESCRIPTION = "PRESCRIPTION"  
+    WAITLIST = "WAITLIST"
 class HealthInstitution(Base): # New Model
     __tablename__ = "health_institutions"
     id = Column(Integer, primary_key=True, index=True)
@@ -38,6 +44,11 @@ class HealthInstitution(Base): # New Model
     # Relationship: An institution can have multiple doctors
     doctors = relationship("Doctor", back_populates="health_institution")
 
+    __table_args__ = (
+        # Bounding-box prefilter of the nearby slot search
+        Index("ix_health_institutions_lat_lon", "latitude", "longitude"),
+    )
+
 
 class Specialty(Base):
     __tablename__ = "specialties"
@@ -61,7 +72,7 @@ class Doctor(Base):
     last_name = Column(String(100), nullable=False)
     photo_url = Column(Text, nullable=True)
     email = Column(String(100), unique=True, nullable=False)
-    specialty_id = Column(Integer, ForeignKey("specialties.id"), nullable=True)
+    specialty_id = Column(Integer, ForeignKey("specialties.id"), nullable=True, index=True)
     health_institution_id = Column(Integer, ForeignKey("health_institutions.id"), nullable=True) # New FK
 
     specialty = relationship("Specialty", back_populates="doctors")
@@ -78,6 +89,17 @@ class TimeSlot(Base):
     status = Column(String(20), default='available')
     appointments = relationship("Appointment", back_populates="time_slot")
 
+    __table_args__ = (
+        # Range scans by slot start time (reminder window loading)
+        Index("ix_time_slots_date_start_time", "date", "start_time"),
+        # Per-doctor slot listings and dashboard aggregates over a date range
+        Index("ix_time_slots_doctor_date", "doctor_id", "date"),
+        # Each doctor's free slots in start order: the earliest-slot search reads
+        # only the first few entries per matching doctor
+        Index("ix_time_slots_available_doctor_start", "doctor_id", "date", "start_time",
+              postgresql_where=(status == "available")),
+    )
+
 class WorkingHours(Base):
     __tablename__ = "working_hours"
     id = Column(Integer, primary_key=True, index=True)
@@ -91,32 +113,138 @@ class WorkingHours(Base):
 
 class Notification(Base):
     __tablename__ = "notifications"
-    id = Column(Integer, primary_key=True, index=True)
+    id = Column(Integer, primary_key=True, autoincrement=True, index=True)
     user_id = Column(Integer, nullable=False)
     user_type = Column(String(10), nullable=False)
     title = Column(String, nullable=False)
     message = Column(Text, nullable=False)
     is_read = Column(Boolean, default=False)
-    sent_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP")
+    # Partition key on Postgres, where it is also added to the primary key (see below)
+    sent_at = Column(TIMESTAMP, nullable=False, server_default=func.now())
     type = Column(Enum(NotificationType, name="notification_type_enum"))
 
+    __table_args__ = (
+        Index("ix_notifications_inbox", "user_id", "user_type", "sent_at"),
+        Index("ix_notifications_unread", "user_id", "user_type", postgresql_where=(is_read == False)),
+        # Monthly partitions are managed by db/partitions.py
+        {"postgresql_partition_by": "RANGE (sent_at)", "info": {"partition_key": "sent_at"}},
+    )
+
+
+@compiles(PrimaryKeyConstraint, "postgresql")
+def _primary_key_with_partition_key(constraint, compiler, **kw):
+    """
+    Postgres requires the partition key in a partitioned table's primary key.
+    Other dialects keep the plain (autoincrementing) id key, and so does the
+    mapper: ids come from one sequence, so they stay unique on their own.
+    """
+    partition_key = constraint.table.info.get("partition_key")
+    if partition_key is None:
+        return compiler.visit_primary_key_constraint(constraint, **kw)
+    columns = [column.name for column in constraint.columns] + [partition_key]
+    return "PRIMARY KEY (%s)" % ", ".join(compiler.preparer.quote(name) for name in columns)
+
 class DeviceToken(Base):
     __tablename__ = "device_tokens"
 
     id = Column(Integer, primary_key=True, index=True)
     user_id = Column(Integer, nullable=False)
-    token = Column(Text, nullable=False)
-    created_at = Column(TIMESTAMP, server_default="CURRENT_TIMESTAMP")
+    token = Column(Text, nullable=False, index=True)  # pruned by token when FCM reports UNREGISTERED
+    created_at = Column(TIMESTAMP, server_default=func.now())
 
 class Appointment(Base):
     __tablename__ = "appointments"
     id = Column(Integer, primary_key=True, index=True)
-    patient_id = Column(Integer, ForeignKey("patients.id"))
+    patient_id = Column(Integer, ForeignKey("patients.id"), index=True)
     doctor_id = Column(Integer, ForeignKey("doctors.id"))
-    time_slot_id = Column(Integer, ForeignKey("time_slots.id"), nullable=True)
+    time_slot_id = Column(Integer, ForeignKey("time_slots.id"), nullable=True, index=True)
     status = Column(SQLAlchemyEnum('pending', 'confirmed', 'completed', 'declined', name='appointment_status_enum_v2'), default='pending') # Ensure enum name is unique if you had an old one
     qr_code_url = Column(Text, nullable=True) # Already present, ensure it's used
 
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
-    time_slot = relationship("TimeSlot", back_populates="appointments")
\ No newline at end of file
+    time_slot = relationship("TimeSlot", back_populates="appointments")
+
+
+class OutboxEvent(Base):
+    """Domain event written in the same transaction as the change it describes; drained by services/outbox_relay.py."""
+    __tablename__ = "outbox_events"
+    id = Column(BigId, primary_key=True)
+    event_type = Column(String(50), nullable=False)
+    aggregate_id = Column(Integer, nullable=False)
+    payload = Column(JSONDocument, nullable=False)
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+    processed_at = Column(TIMESTAMP, nullable=True)
+    attempts = Column(Integer, nullable=False, default=0)
+    last_error = Column(Text, nullable=True)
+    # Set while the event's pushes are undelivered: when the relay may (re)try them
+    next_push_at = Column(TIMESTAMP, nullable=True)
+    push_attempts = Column(Integer, nullable=False, default=0, server_default="0")
+
+    __table_args__ = (
+        # The relay only ever scans unprocessed events in id order
+        Index("ix_outbox_events_pending", "id", postgresql_where=processed_at.is_(None)),
+        Index("ix_outbox_events_push_due", "next_push_at", postgresql_where=next_push_at.isnot(None)),
+        # "Was this already announced?" checks (prescription expiry notices)
+        Index("ix_outbox_events_type_aggregate", "event_type", "aggregate_id"),
+    )
+
+
+class MedicationDose(Base):
+    """One precomputed dose time of a medication; compiled by services/dose_schedule.py."""
+    __tablename__ = "medication_doses"
+    # medications belong to the prescription service's tables, hence no foreign key
+    medication_id = Column(Integer, primary_key=True)
+    due_at = Column(TIMESTAMP, primary_key=True)
+    patient_id = Column(Integer, nullable=False)
+
+    __table_args__ = (
+        # Reminder fan-out: every patient's doses in a time window is one range scan
+        Index("ix_medication_doses_due_at", "due_at"),
+        # A patient's upcoming doses
+        Index("ix_medication_doses_patient_due", "patient_id", "due_at"),
+    )
+
+
+class WaitlistEntry(Base):
+    """A patient waiting for a slot with a doctor on a day; see services/waitlist_service.py."""
+    __tablename__ = "waitlist_entries"
+    id = Column(Integer, primary_key=True)
+    patient_id = Column(Integer, ForeignKey("patients.id"), nullable=False, index=True)
+    doctor_id = Column(Integer, ForeignKey("doctors.id"), nullable=False)
+    date = Column(DATE, nullable=False)
+    # Slots starting in [window_start, window_end); null bounds are open
+    window_start = Column(TIME, nullable=True)
+    window_end = Column(TIME, nullable=True)
+    status = Column(String(20), nullable=False, default="waiting")  # waiting, offered, booked, declined, missed, cancelled
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False)
+    offered_slot_id = Column(Integer, ForeignKey("time_slots.id"), nullable=True)
+    offer_expires_at = Column(TIMESTAMP, nullable=True)
+    # Cleared when the booked appointment is deleted
+    appointment_id = Column(Integer, ForeignKey("appointments.id", ondelete="SET NULL"), nullable=True)
+
+    __table_args__ = (
+        # The queues: waiting entries per doctor and day in join order. Matching a freed
+        # slot reads from the head of one (doctor_id, date) range.
+        Index("ix_waitlist_queue", "doctor_id", "date", "created_at", "id",
+              postgresql_where=(status == "waiting")),
+        # Held offers by expiry, for the offer sweeper
+        Index("ix_waitlist_offers_expiry", "offer_expires_at", postgresql_where=(status == "offered")),
+        # ON DELETE SET NULL lookups when an appointment is deleted
+        Index("ix_waitlist_appointment", "appointment_id", postgresql_where=appointment_id.isnot(None)),
+        # One active entry per patient, doctor and day
+        Index("ux_waitlist_active", "patient_id", "doctor_id", "date", unique=True,
+              postgresql_where=status.in_(("waiting", "offered")),
+              sqlite_where=status.in_(("waiting", "offered"))),
+    )
+
+
+class IdempotencyKey(Base):
+    """Stored response of a write made with an Idempotency-Key header; see services/idempotency_service.py."""
+    __tablename__ = "idempotency_keys"
+    scope = Column(String(100), primary_key=True)  # "POST /waitlist patient:7", ...
+    key = Column(String(255), primary_key=True)
+    fingerprint = Column(String(64), nullable=False)  # sha256 of the request body
+    status_code = Column(Integer, nullable=False)
+    response = Column(JSONDocument, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now(), nullable=False, index=True)
@@ -0,0 +1,165 @@
+# db/partitions.py
+"""
+Monthly partitions of the notifications table (Postgres declarative partitioning).
+
+Partitions are named notifications_yYYYYmMM and cover one calendar month of
+sent_at; notifications_default catches anything outside the created range.
+Retention detaches whole partitions and drops them (or moves them to the
+notifications_archive schema), which takes constant time however many rows
+they hold.
+
+    python -m db.partitions                 # create upcoming partitions + apply retention
+    python -m db.partitions --convert       # one-off: convert an existing plain table
+"""
+import argparse
+import logging
+import re
+from datetime import date
+from typing import List, Tuple
+
+from sqlalchemy import text
+from sqlalchemy.engine import Connection, Engine
+
+from core import config
+from db.models.appointment_models import Notification
+from db.session import engine
+
+logger = logging.getLogger(__name__)
+
+PARENT = "notifications"
+DEFAULT_PARTITION = "notifications_default"
+ARCHIVE_SCHEMA = "notifications_archive"
+_PARTITION_RE = re.compile(r"^notifications_y(\d{4})m(\d{2})$")
+
+
+def _add_months(month: date, count: int) -> date:
+    index = month.year * 12 + month.month - 1 + count
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def partition_name(month: date) -> str:
+    return f"{PARENT}_y{month.year:04d}m{month.month:02d}"
+
+
+def is_partitioned(conn: Connection) -> bool:
+    relkind = conn.execute(
+        text("SELECT relkind FROM pg_class WHERE oid = to_regclass(:name)"), {"name": PARENT}
+    ).scalar()
+    return relkind == "p"
+
+
+def list_partitions(conn: Connection) -> List[Tuple[str, date]]:
+    rows = conn.execute(text(
+        "SELECT c.relname FROM pg_inherits i "
+        "JOIN pg_class c ON c.oid = i.inhrelid "
+        "WHERE i.inhparent = to_regclass(:name)"
+    ), {"name": PARENT}).scalars()
+    partitions = []
+    for name in rows:
+        match = _PARTITION_RE.match(name)
+        if match:
+            partitions.append((name, date(int(match.group(1)), int(match.group(2)), 1)))
+    return sorted(partitions, key=lambda p: p[1])
+
+
+def ensure_partitions(conn: Connection, start: date, months_ahead: int) -> List[str]:
+    """Create the monthly partitions from `start`'s month through `months_ahead` months after today."""
+    created = []
+    month = start.replace(day=1)
+    last = _add_months(date.today().replace(day=1), months_ahead)
+    while month <= last:
+        name = partition_name(month)
+        result = conn.execute(text("SELECT to_regclass(:name)"), {"name": name}).scalar()
+        if result is None:
+            conn.execute(text(
+                f'CREATE TABLE "{name}" PARTITION OF "{PARENT}" '
+                f"FOR VALUES FROM ('{month.isoformat()}') TO ('{_add_months(month, 1).isoformat()}')"
+            ))
+            created.append(name)
+        month = _add_months(month, 1)
+    conn.execute(text(f'CREATE TABLE IF NOT EXISTS "{DEFAULT_PARTITION}" PARTITION OF "{PARENT}" DEFAULT'))
+    return created
+
+
+def apply_retention(conn: Connection, retention_months: int, mode: str = "drop") -> List[str]:
+    """Detach and drop (or archive) monthly partitions entirely older than the retention window."""
+    cutoff = _add_months(date.today().replace(day=1), -retention_months)
+    removed = []
+    if mode == "archive":
+        conn.execute(text(f'CREATE SCHEMA IF NOT EXISTS "{ARCHIVE_SCHEMA}"'))
+    for name, month in list_partitions(conn):
+        if _add_months(month, 1) > cutoff:
+            break
+        conn.execute(text(f'ALTER TABLE "{PARENT}" DETACH PARTITION "{name}"'))
+        if mode == "archive":
+            conn.execute(text(f'ALTER TABLE "{name}" SET SCHEMA "{ARCHIVE_SCHEMA}"'))
+        else:
+            conn.execute(text(f'DROP TABLE "{name}"'))
+        removed.append(name)
+    return removed
+
+
+def convert_to_partitioned(conn: Connection) -> None:
+    """
+    One-off conversion of a plain notifications table: the old table and its
+    index/constraint/sequence names are moved aside, a partitioned table is
+    created from the model, rows are copied and the id sequence is advanced.
+    The old table is left as notifications_legacy; drop it once verified.
+    """
+    legacy = f"{PARENT}_legacy"
+    conn.execute(text(f'ALTER TABLE "{PARENT}" RENAME TO "{legacy}"'))
+    for (index_name,) in conn.execute(text(
+        "SELECT indexname FROM pg_indexes WHERE tablename = :table"
+    ), {"table": legacy}).all():
+        conn.execute(text(f'ALTER INDEX "{index_name}" RENAME TO "{index_name}_legacy"'))
+    conn.execute(text(f'ALTER SEQUENCE IF EXISTS "{PARENT}_id_seq" RENAME TO "{legacy}_id_seq"'))
+
+    Notification.__table__.create(bind=conn)
+    first = conn.execute(text(f'SELECT min(sent_at) FROM "{legacy}"')).scalar()
+    ensure_partitions(conn, (first.date() if first else date.today()), config.NOTIFICATION_PARTITION_MONTHS_AHEAD)
+
+    names = [c.name for c in Notification.__table__.columns]
+    columns = ", ".join(f'"{name}"' for name in names)
+    # sent_at is now part of the primary key, so old rows without one get the copy time
+    select_list = ", ".join("COALESCE(sent_at, now())" if name == "sent_at" else f'"{name}"' for name in names)
+    conn.execute(text(f'INSERT INTO "{PARENT}" ({columns}) SELECT {select_list} FROM "{legacy}"'))
+    conn.execute(text(
+        f"SELECT setval(pg_get_serial_sequence('{PARENT}', 'id'), "
+        f'COALESCE((SELECT max(id) FROM "{PARENT}"), 0) + 1, false)'
+    ))
+
+
+def maintain(bind: Engine = engine) -> None:
+    """Create upcoming partitions and apply retention; run daily (cron) or from db.migrate."""
+    with bind.begin() as conn:
+        if not is_partitioned(conn):
+            logger.warning(
+                "%s is not partitioned; run `python -m db.partitions --convert` to convert it", PARENT
+            )
+            return
+        created = ensure_partitions(conn, date.today(), config.NOTIFICATION_PARTITION_MONTHS_AHEAD)
+        removed = apply_retention(conn, config.NOTIFICATION_RETENTION_MONTHS, config.NOTIFICATION_RETENTION_MODE)
+    if created:
+        logger.info("Created notification partitions: %s", ", ".join(created))
+    if removed:
+        logger.info("%s notification partitions: %s",
+                    "Archived" if config.NOTIFICATION_RETENTION_MODE == "archive" else "Dropped", ", ".join(removed))
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Maintain monthly partitions of the notifications table.")
+    parser.add_argument("--convert", action="store_true", help="convert an existing unpartitioned table first")
+    args = parser.parse_args()
+    logging.basicConfig(level=logging.INFO)
+    if args.convert:
+        with engine.begin() as conn:
+            if is_partitioned(conn):
+                logger.info("%s is already partitioned", PARENT)
+            else:
+                convert_to_partitioned(conn)
+                logger.info("Converted %s; the old rows remain in %s_legacy", PARENT, PARENT)
+    maintain()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+# db/statements.py
+"""
+Prebuilt, parameterized statements for the hot read paths.
+
+Building a Query per request costs Python-side construction plus a cache
+key walk on every call. These select() constructs are built once with
+bindparam() placeholders: their cache key is memoized on the object and the
+compiled form is reused from the engine's statement cache, so a call costs
+little more than binding parameters. Run warm_up() at startup so the first
+requests do not pay for compilation.
+
+    db.execute(statements.APPOINTMENTS_FOR_PATIENT, {"patient_id": 3}).scalars().all()
+"""
+import logging
+import time
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Tuple
+
+from sqlalchemy import bindparam, func, select
+from sqlalchemy.engine import Engine
+from sqlalchemy.orm import Session, selectinload
+
+from db.models.appointment_models import (
+    Appointment,
+    Doctor,
+    Notification,
+    Patient,
+    TimeSlot,
+)
+
+logger = logging.getLogger(__name__)
+
+# --- appointments ---
+
+DOCTOR_EXISTS = select(Doctor.id).where(Doctor.id == bindparam("doctor_id"))
+PATIENT_EXISTS = select(Patient.id).where(Patient.id == bindparam("patient_id"))
+
+APPOINTMENTS_FOR_PATIENT = (
+    select(Appointment)
+    .where(Appointment.patient_id == bindparam("patient_id"))
+    .options(
+        selectinload(Appointment.time_slot),
+        selectinload(Appointment.doctor).selectinload(Doctor.specialty),
+        selectinload(Appointment.doctor).selectinload(Doctor.health_institution),
+    )
+)
+
+APPOINTMENTS_FOR_DOCTOR = (
+    select(Appointment)
+    .where(Appointment.doctor_id == bindparam("doctor_id"))
+    .options(
+        selectinload(Appointment.time_slot),
+        selectinload(Appointment.patient),
+        selectinload(Appointment.doctor).selectinload(Doctor.health_institution),
+    )
+)
+
+# --- notifications (sent_at bound so partitions outside the inbox window are pruned) ---
+
+_user_notifications = (
+    (Notification.user_id == bindparam("user_id")),
+    (Notification.user_type == bindparam("user_type")),
+    (Notification.sent_at >= bindparam("since")),
+)
+
+NOTIFICATIONS_FOR_USER = (
+    select(Notification)
+    .where(*_user_notifications)
+    .order_by(Notification.sent_at.desc())
+    .offset(bindparam("skip"))
+    .limit(bindparam("limit"))
+)
+
+NOTIFICATION_COUNT_FOR_USER = select(func.count(Notification.id)).where(*_user_notifications)
+
+UNREAD_NOTIFICATION_COUNT_FOR_USER = (
+    select(func.count(Notification.id))
+    .where(*_user_notifications, Notification.is_read == False)
+)
+
+# --- time slots ---
+
+AVAILABLE_SLOTS_FOR_DOCTOR = select(TimeSlot).where(
+    TimeSlot.doctor_id == bindparam("doctor_id"),
+    TimeSlot.status == "available",
+)
+
+AVAILABLE_SLOTS_FOR_DOCTOR_ON_DATE = select(TimeSlot).where(
+    TimeSlot.doctor_id == bindparam("doctor_id"),
+    TimeSlot.date == bindparam("date"),
+    TimeSlot.status == "available",
+)
+
+# Parameters matching no rows, used to compile each statement at startup
+WARM_UP: List[Tuple[object, Dict[str, object]]] = [
+    (DOCTOR_EXISTS, {"doctor_id": -1}),
+    (PATIENT_EXISTS, {"patient_id": -1}),
+    (APPOINTMENTS_FOR_PATIENT, {"patient_id": -1}),
+    (APPOINTMENTS_FOR_DOCTOR, {"doctor_id": -1}),
+    (NOTIFICATIONS_FOR_USER, {"user_id": -1, "user_type": "", "since": datetime.now(), "skip": 0, "limit": 1}),
+    (NOTIFICATION_COUNT_FOR_USER, {"user_id": -1, "user_type": "", "since": datetime.now()}),
+    (UNREAD_NOTIFICATION_COUNT_FOR_USER, {"user_id": -1, "user_type": "", "since": datetime.now()}),
+    (AVAILABLE_SLOTS_FOR_DOCTOR, {"doctor_id": -1}),
+    (AVAILABLE_SLOTS_FOR_DOCTOR_ON_DATE, {"doctor_id": -1, "date": date.today()}),
+]
+
+
+def warm_up(engines: Iterable[Engine]) -> None:
+    """Execute every statement once per engine so its compiled form is cached before traffic arrives."""
+    started_at = time.perf_counter()
+    for bind in engines:
+        with Session(bind=bind) as db:
+            for statement, params in WARM_UP:
+                db.execute(statement, params).all()
+    logger.info("Warmed up %d statements in %.0f ms", len(WARM_UP), (time.perf_counter() - started_at) * 1000)
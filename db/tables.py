@@ -0,0 +1,44 @@
+# db/tables.py
+"""
+Core table definitions for tables owned by the prescription service
+(db/models/prescription.py, its own declarative base). They live in the same
+database; this API only reads them, so they are declared here as plain
+Tables on a separate MetaData that create_all never touches.
+
+db.migrate adds the indexes below when the tables exist.
+"""
+from sqlalchemy import Column, ForeignKey, Index, Integer, MetaData, String, Table, Text, TIMESTAMP
+
+metadata = MetaData()
+
+prescriptions = Table(
+    "prescriptions", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("patient_id", Integer, nullable=False),
+    Column("doctor_id", Integer, nullable=False),
+    Column("instructions", Text, nullable=False),
+    Column("created_at", TIMESTAMP),
+    Column("expires_at", TIMESTAMP, nullable=False),
+    Column("sync_status", String(20)),
+    Column("status", String(50)),
+    # A patient's prescriptions, newest first (timeline pages)
+    Index("ix_prescriptions_patient_created", "patient_id", "created_at", "id"),
+)
+
+# Only active prescriptions, by expiry: the expiry sweeper reads the head of this index
+Index(
+    "ix_prescriptions_active_expires", prescriptions.c.expires_at,
+    postgresql_where=prescriptions.c.status == "active",
+)
+
+medications = Table(
+    "medications", metadata,
+    Column("id", Integer, primary_key=True),
+    Column("prescription_id", Integer, ForeignKey("prescriptions.id"), nullable=False),
+    Column("name", String(255), nullable=False),
+    Column("dosage", String(255)),
+    Column("frequency", String(255)),
+    Column("duration", String(255)),
+    Column("sync_status", String(20)),
+    Index("ix_medications_prescription_id", "prescription_id"),
+)
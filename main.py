@@ -1,20 +1,109 @@
 # main.py
+import asyncio
+import logging
+import os
+import time
+from contextlib import asynccontextmanager
+
 from fastapi import FastAPI
-from api.routes import appointment_routes, notification_routes
-from db.session import Base, engine
-from db.models import appointment_models
+from api.routes import (
+    appointment_routes, availability_routes, directory_routes, dose_routes, import_routes, notification_routes,
+    ops_routes, prescription_routes, timeline_routes, waitlist_routes
+)
+from core import admission, config, invalidation, metrics, replica_routing, sql_profiler
+from db.session import Base, engine, replica_engines
+from db import migrate, statements
+
+logger = logging.getLogger(__name__)
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    started_at = time.perf_counter()
+    if config.DB_CREATE_SCHEMA_ON_STARTUP:
+        migrate.run_migrations(engine)
+    if config.STATEMENT_WARMUP_ENABLED:
+        try:
+            statements.warm_up([engine, *replica_engines])
+        except Exception:
+            logger.warning("Statement warm-up failed; statements will compile on first use", exc_info=True)
+    invalidation.bus.start()
+    background_workers = []
+    if config.REMINDER_SCHEDULER_ENABLED:
+        from services.reminder_scheduler import ReminderScheduler
+        background_workers.append(ReminderScheduler())
+    if config.OUTBOX_RELAY_ENABLED:
+        from services.outbox_relay import OutboxRelay
+        background_workers.append(OutboxRelay())
+    if config.PRESCRIPTION_EXPIRY_ENABLED:
+        from services.prescription_expiry import PrescriptionExpirySweeper
+        background_workers.append(PrescriptionExpirySweeper())
+    if config.WAITLIST_SWEEPER_ENABLED:
+        from services.waitlist_service import WaitlistOfferSweeper
+        background_workers.append(WaitlistOfferSweeper())
+    background_tasks = [asyncio.create_task(worker.run()) for worker in background_workers]
+    logger.info("Worker %s ready in %.0f ms", os.getpid(), (time.perf_counter() - started_at) * 1000)
+    yield
+    for worker in background_workers:
+        worker.stop()
+    await asyncio.gather(*background_tasks)
+    invalidation.bus.stop()
 
-appointment_models.Base.metadata.create_all(bind=engine)
 
 app = FastAPI(
     title="Doctor Appointment API",
     description="API for managing doctor appointments.",
-    version="0.1.0"
+    version="0.1.0",
+    lifespan=lifespan
 )
 
 # To match Android's current request of "/appointments/patient/{patient_id}/details"
 app.include_router(appointment_routes.router)
 app.include_router(notification_routes.router) # Router's own "/appointments" prefix will be used.
+app.include_router(availability_routes.router)
+# After availability_routes: its fixed /doctors/... paths must match before /doctors/{doctor_id}
+app.include_router(directory_routes.router)
+app.include_router(import_routes.router)
+app.include_router(timeline_routes.router)
+app.include_router(dose_routes.router)
+app.include_router(prescription_routes.router)
+app.include_router(waitlist_routes.router)
+app.include_router(ops_routes.router)
+
+if replica_engines:
+    replica_routing.install(app, read_your_writes_seconds=config.REPLICA_READ_YOUR_WRITES_SECONDS)
+
+if config.ADMISSION_ENABLED:
+    admission.install(app, limits={
+        admission.BOOKING: admission.RouteClassLimits(
+            config.ADMISSION_BOOKING_RATE, config.ADMISSION_BOOKING_BURST, config.ADMISSION_BOOKING_CONCURRENCY,
+            config.ADMISSION_MAX_QUEUE, config.ADMISSION_MAX_WAIT_SECONDS, config.ADMISSION_BOOKING_STATEMENT_TIMEOUT_MS,
+        ),
+        admission.WRITE: admission.RouteClassLimits(
+            config.ADMISSION_WRITE_RATE, config.ADMISSION_WRITE_BURST, config.ADMISSION_WRITE_CONCURRENCY,
+            config.ADMISSION_MAX_QUEUE, config.ADMISSION_MAX_WAIT_SECONDS, config.ADMISSION_WRITE_STATEMENT_TIMEOUT_MS,
+        ),
+        admission.READ: admission.RouteClassLimits(
+            config.ADMISSION_READ_RATE, config.ADMISSION_READ_BURST, config.ADMISSION_READ_CONCURRENCY,
+            config.ADMISSION_MAX_QUEUE, config.ADMISSION_MAX_WAIT_SECONDS, config.ADMISSION_READ_STATEMENT_TIMEOUT_MS,
+        ),
+    })
+
+if config.METRICS_ENABLED:
+    metrics.install(app, engines={
+        "primary": engine,
+        **{f"replica_{i}": replica for i, replica in enumerate(replica_engines)},
+    })
+
+# Optional per-request SQL profiling (SQL_PROFILING=dev|prod)
+if config.SQL_PROFILING in ("dev", "prod"):
+    sql_profiler.install(
+        app,
+        engines=[engine, *replica_engines],
+        mode=config.SQL_PROFILING,
+        sample_rate=config.SQL_PROFILING_SAMPLE_RATE,
+        n_plus_one_threshold=config.SQL_N_PLUS_ONE_THRESHOLD,
+    )
 
 @app.get("/")
 async def root():
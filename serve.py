@@ -0,0 +1,49 @@
+# serve.py
+"""
+Multi-process serving mode.
+
+    python serve.py --workers 4 --port 8000
+
+Prepares the shared state the workers need before uvicorn forks them:
+- a cross-worker invalidation backend (unix sockets unless INVALIDATION_BACKEND
+  is already set, e.g. to "postgres" when workers run on several hosts),
+- an empty PROMETHEUS_MULTIPROC_DIR so /metrics aggregates every worker.
+"""
+import argparse
+import os
+import shutil
+import tempfile
+
+import uvicorn
+
+
+def _reset_dir(path: str) -> None:
+    shutil.rmtree(path, ignore_errors=True)
+    os.makedirs(path, exist_ok=True)
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Run the API with several worker processes.")
+    parser.add_argument("--host", default="0.0.0.0")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    if args.workers > 1:
+        os.environ.setdefault("INVALIDATION_BACKEND", "socket")
+
+    from core import config
+
+    if config.INVALIDATION_BACKEND == "socket":
+        _reset_dir(config.INVALIDATION_SOCKET_DIR)
+
+    metrics_dir = os.environ.setdefault(
+        "PROMETHEUS_MULTIPROC_DIR", os.path.join(tempfile.gettempdir(), "doctor-appointment-metrics")
+    )
+    _reset_dir(metrics_dir)
+
+    uvicorn.run("main:app", host=args.host, port=args.port, workers=args.workers)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,6 +4,10 @@ from typing import List, Optional, Dict, Any
 from fastapi import HTTPException
 from decimal import Decimal
 
+from core import config, invalidation, singleflight
+from db import statements
+from services import outbox_service, waitlist_service
+
 from db.models.appointment_models import (
     Appointment as AppointmentModel,
     Doctor as DoctorModel,
@@ -129,29 +133,22 @@ def get_all_detailed_appointments(db: Session) -> List[Dict[str, Any]]:
     return [_format_appointment_details(appt) for appt in appointments_from_db]
 
 def get_detailed_appointments_for_patient(db: Session, patient_id: int) -> List[Dict[str, Any]]:
-    appointments_from_db = db.query(AppointmentModel)\
-        .filter(AppointmentModel.patient_id == patient_id)\
-        .options(
-            selectinload(AppointmentModel.time_slot),
-            selectinload(AppointmentModel.doctor).selectinload(DoctorModel.specialty),
-            selectinload(AppointmentModel.doctor).selectinload(DoctorModel.health_institution)
-        ).all()
+    appointments_from_db = db.execute(
+        statements.APPOINTMENTS_FOR_PATIENT, {"patient_id": patient_id}
+    ).scalars().all()
     if not appointments_from_db:
         return []
     return [_format_appointment_details(appt) for appt in appointments_from_db]
 
+@singleflight.coalesce("appointments_for_doctor", key=lambda db, doctor_id: doctor_id)
 def get_detailed_appointments_for_doctor(db: Session, doctor_id: int) -> List[Dict[str, Any]]:
-    doctor = db.query(DoctorModel).filter(DoctorModel.id == doctor_id).first()
+    doctor = db.execute(statements.DOCTOR_EXISTS, {"doctor_id": doctor_id}).first()
     if not doctor:
         raise HTTPException(status_code=404, detail=f"Doctor with id {doctor_id} not found")
 
-    appointments_from_db = db.query(AppointmentModel)\
-        .filter(AppointmentModel.doctor_id == doctor_id)\
-        .options(
-            selectinload(AppointmentModel.time_slot),
-            selectinload(AppointmentModel.patient), # Eager load patient
-            selectinload(AppointmentModel.doctor).selectinload(DoctorModel.health_institution)
-        ).all()
+    appointments_from_db = db.execute(
+        statements.APPOINTMENTS_FOR_DOCTOR, {"doctor_id": doctor_id}
+    ).scalars().all()
 
     if not appointments_from_db:
         return []
@@ -159,6 +156,30 @@ def get_detailed_appointments_for_doctor(db: Session, doctor_id: int) -> List[Di
     # then appt.patient will be None. If PatientDetailsSchema requires patient_id, this will fail.
     return [_format_appointment_for_doctor_view(appt) for appt in appointments_from_db]
 
+def unique_batch_ids(ids: List[int]) -> List[int]:
+    """De-duplicate batch ids (keeping order) and enforce BATCH_MAX_IDS."""
+    unique_ids = list(dict.fromkeys(ids))
+    if len(unique_ids) > config.BATCH_MAX_IDS:
+        raise HTTPException(status_code=400, detail=f"At most {config.BATCH_MAX_IDS} ids per request")
+    return unique_ids
+
+def get_detailed_appointments_by_ids(db: Session, appointment_ids: List[int]) -> Dict[str, Any]:
+    """Batch version of the single-appointment details route: one IN query, results keyed by id."""
+    ids = unique_batch_ids(appointment_ids)
+    appointments_from_db = db.query(AppointmentModel)\
+        .filter(AppointmentModel.id.in_(ids))\
+        .options(
+            selectinload(AppointmentModel.time_slot),
+            selectinload(AppointmentModel.doctor).selectinload(DoctorModel.specialty),
+            selectinload(AppointmentModel.doctor).selectinload(DoctorModel.health_institution),
+            selectinload(AppointmentModel.patient)
+        ).all() if ids else []
+    found = {appt.id: _format_appointment_details(appt) for appt in appointments_from_db}
+    return {
+        "results": {appointment_id: found.get(appointment_id) for appointment_id in ids},
+        "not_found": [appointment_id for appointment_id in ids if appointment_id not in found],
+    }
+
 # ... (rest of your service functions: get_all_appointments, delete_appointment, _update_appointment_status, etc.) ...
 def get_all_appointments(db: Session): # Basic list
     return db.query(AppointmentModel).all()
@@ -169,7 +190,13 @@ def delete_appointment(db: Session, appointment_id: int) -> bool:
     if not appointment_to_delete:
         raise HTTPException(status_code=404, detail=f"Appointment with id {appointment_id} not found")
     try:
+        # The freed slot goes to the head of its waitlist, if anyone is waiting
+        time_slot = appointment_to_delete.time_slot
+        if time_slot is not None and time_slot.status == "booked":
+            waitlist_service.release_slot(db, time_slot)
         db.delete(appointment_to_delete)
+        invalidation.publish_after_commit(db, invalidation.APPOINTMENT, appointment_id)
+        invalidation.publish_after_commit(db, invalidation.DOCTOR_APPOINTMENTS, appointment_to_delete.doctor_id)
         db.commit()
         return True
     except Exception as e:
@@ -184,6 +211,21 @@ def _update_appointment_status(db: Session, appointment_id: int, new_status: str
     if appointment.status != 'pending':
         raise HTTPException(status_code=400, detail=f"Appointment status can only be changed from 'pending'. Current status: {appointment.status}")
     appointment.status = new_status
+    # Notify the patient through the outbox: the event commits with the status change
+    # and the relay sends the notification, so this request only pays for the commit.
+    time_slot = appointment.time_slot
+    outbox_service.add_event(db, f"appointment.{new_status}", appointment.id, {
+        "appointment_id": appointment.id,
+        "patient_id": appointment.patient_id,
+        "doctor_id": appointment.doctor_id,
+        "status": new_status,
+        "date": time_slot.date.isoformat() if time_slot and time_slot.date else None,
+        "start_time": time_slot.start_time.isoformat() if time_slot and time_slot.start_time else None,
+    })
+    if new_status == "declined" and time_slot is not None and time_slot.status == "booked":
+        waitlist_service.release_slot(db, time_slot)
+    invalidation.publish_after_commit(db, invalidation.APPOINTMENT, appointment_id)
+    invalidation.publish_after_commit(db, invalidation.DOCTOR_APPOINTMENTS, appointment.doctor_id)
     try:
         db.commit()
         db.refresh(appointment)
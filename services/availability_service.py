@@ -0,0 +1,203 @@
+# services/availability_service.py
+"""
+Doctor availability summaries for the booking UI.
+
+The month calendar is one GROUP BY over the doctor's time slots (per day:
+slot count, available count, first free time). Each result is cached per
+doctor together with its encoded JSON body and an ETag, and dropped on SLOT
+invalidations (booking, cancellation).
+
+The earliest-slot search is one query: for every matching doctor a LATERAL
+subquery reads the first `limit` free slots from the partial index
+ix_time_slots_available_doctor_start, and the per-doctor lists are merged by
+ORDER BY ... LIMIT. Its cost grows with the number of matching doctors, not
+with the number of slots.
+"""
+import hashlib
+import json
+import math
+from datetime import date, datetime, time, timedelta
+from typing import Any, Dict, List, NamedTuple, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy import Float, case, cast, func, literal, select, true, tuple_
+from sqlalchemy.orm import Session
+
+from core import config, invalidation
+from core.cache import LocalCache
+from db import statements
+from db.models.appointment_models import (
+    Doctor as DoctorModel,
+    HealthInstitution as HealthInstitutionModel,
+    TimeSlot as TimeSlotModel
+)
+
+EARTH_RADIUS_KM = 6371.0
+_KM_PER_DEGREE_LATITUDE = 111.045
+
+
+class EncodedResponse(NamedTuple):
+    body: bytes
+    etag: str
+
+
+_calendar_cache = LocalCache(
+    "doctor_calendar",
+    maxsize=4096,
+    ttl=config.CALENDAR_CACHE_TTL_SECONDS,
+    topics=(invalidation.SLOT,),
+)
+
+
+def _encode(payload: dict) -> EncodedResponse:
+    body = json.dumps(jsonable_encoder(payload), separators=(",", ":")).encode("utf-8")
+    return EncodedResponse(body, '"' + hashlib.sha1(body).hexdigest() + '"')
+
+
+def _load_calendar(db: Session, doctor_id: int, date_from: date, date_to: date) -> EncodedResponse:
+    if db.execute(statements.DOCTOR_EXISTS, {"doctor_id": doctor_id}).first() is None:
+        raise HTTPException(status_code=404, detail=f"Doctor with id {doctor_id} not found")
+
+    is_available = TimeSlotModel.status == "available"
+    rows = (
+        db.query(
+            TimeSlotModel.date,
+            func.count(TimeSlotModel.id),
+            func.coalesce(func.sum(case((is_available, 1), else_=0)), 0),
+            func.min(case((is_available, TimeSlotModel.start_time))),
+        )
+        .filter(TimeSlotModel.doctor_id == doctor_id, TimeSlotModel.date.between(date_from, date_to))
+        .group_by(TimeSlotModel.date)
+        .order_by(TimeSlotModel.date)
+        .all()
+    )
+    return _encode({
+        "doctor_id": doctor_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "days": [
+            {"date": slot_date, "total": total, "available": available, "first_available": first_available}
+            for slot_date, total, available, first_available in rows
+        ],
+    })
+
+
+def get_doctor_calendar(
+    db: Session, doctor_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> EncodedResponse:
+    """Per-day slot availability; days without any slot are omitted."""
+    date_from = date_from or date.today()
+    date_to = date_to or date_from + timedelta(days=config.CALENDAR_DEFAULT_DAYS - 1)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days >= config.CALENDAR_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {config.CALENDAR_MAX_DAYS} days")
+
+    return _calendar_cache.get_or_load(
+        (doctor_id, date_from, date_to),
+        lambda: _load_calendar(db, doctor_id, date_from, date_to),
+        tag=doctor_id,
+    )
+
+
+def _distance_km(latitude: float, longitude: float):
+    """Haversine distance from (latitude, longitude) to the institution, as a SQL expression."""
+    lat = func.radians(cast(HealthInstitutionModel.latitude, Float))
+    lon = func.radians(cast(HealthInstitutionModel.longitude, Float))
+    origin_lat, origin_lon = math.radians(latitude), math.radians(longitude)
+    a = (
+        func.power(func.sin((lat - origin_lat) * 0.5), 2)
+        + math.cos(origin_lat) * func.cos(lat) * func.power(func.sin((lon - origin_lon) * 0.5), 2)
+    )
+    return 2 * EARTH_RADIUS_KM * func.asin(func.least(1.0, func.sqrt(a)))
+
+
+def search_earliest_slots(
+    db: Session,
+    specialty_id: int,
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    latitude: Optional[float] = None,
+    longitude: Optional[float] = None,
+    radius_km: Optional[float] = None,
+    limit: int = 10,
+) -> List[Dict[str, Any]]:
+    """The `limit` earliest free slots across all doctors of a specialty, optionally within radius_km."""
+    location = (latitude, longitude, radius_km)
+    if any(v is not None for v in location) and not all(v is not None for v in location):
+        raise HTTPException(status_code=400, detail="latitude, longitude and radius_km must be given together")
+    now = datetime.now()
+    date_from = max(date_from or now.date(), now.date())
+    date_to = date_to or date_from + timedelta(days=config.SLOT_SEARCH_DEFAULT_DAYS)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days > config.SLOT_SEARCH_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date window cannot exceed {config.SLOT_SEARCH_MAX_DAYS} days")
+    limit = min(limit, config.SLOT_SEARCH_MAX_RESULTS)
+    # Slots starting before this instant are gone (today's earlier slots included)
+    start_date, start_time = (now.date(), now.time()) if date_from == now.date() else (date_from, time.min)
+
+    free_slots = (
+        select(TimeSlotModel.id, TimeSlotModel.date, TimeSlotModel.start_time, TimeSlotModel.end_time)
+        .where(
+            TimeSlotModel.doctor_id == DoctorModel.id,
+            TimeSlotModel.status == "available",
+            tuple_(TimeSlotModel.date, TimeSlotModel.start_time) >= tuple_(literal(start_date), literal(start_time)),
+            TimeSlotModel.date <= date_to,
+        )
+        .order_by(TimeSlotModel.date, TimeSlotModel.start_time)
+        .limit(limit)
+        .lateral("free_slots")
+    )
+
+    distance = _distance_km(latitude, longitude) if radius_km is not None else literal(None, Float)
+    query = (
+        select(
+            free_slots.c.id, free_slots.c.date, free_slots.c.start_time, free_slots.c.end_time,
+            DoctorModel.id, DoctorModel.first_name, DoctorModel.last_name, DoctorModel.photo_url,
+            HealthInstitutionModel.id, HealthInstitutionModel.name, HealthInstitutionModel.address,
+            HealthInstitutionModel.latitude, HealthInstitutionModel.longitude,
+            distance,
+        )
+        .select_from(DoctorModel)
+        .outerjoin(HealthInstitutionModel, DoctorModel.health_institution_id == HealthInstitutionModel.id)
+        .join(free_slots, true())
+        .where(DoctorModel.specialty_id == specialty_id)
+        .order_by(free_slots.c.date, free_slots.c.start_time, DoctorModel.id)
+        .limit(limit)
+    )
+    if radius_km is not None:
+        # Index-friendly bounding box first, exact great-circle distance second
+        lat_delta = radius_km / _KM_PER_DEGREE_LATITUDE
+        lon_delta = radius_km / (_KM_PER_DEGREE_LATITUDE * max(math.cos(math.radians(latitude)), 0.01))
+        query = query.where(
+            HealthInstitutionModel.latitude.between(latitude - lat_delta, latitude + lat_delta),
+            HealthInstitutionModel.longitude.between(longitude - lon_delta, longitude + lon_delta),
+            distance <= radius_km,
+        )
+
+    return [
+        {
+            "time_slot_id": slot_id,
+            "date": slot_date,
+            "start_time": slot_start,
+            "end_time": slot_end,
+            "doctor": {
+                "doctor_id": doctor_id,
+                "first_name": first_name,
+                "last_name": last_name,
+                "photo_url": photo_url,
+            },
+            "health_institution": {
+                "id": institution_id,
+                "name": institution_name,
+                "address": address,
+                "latitude": lat,
+                "longitude": lon,
+            } if institution_id is not None else None,
+            "distance_km": round(distance_km, 2) if distance_km is not None else None,
+        }
+        for (slot_id, slot_date, slot_start, slot_end, doctor_id, first_name, last_name, photo_url,
+             institution_id, institution_name, address, lat, lon, distance_km) in db.execute(query)
+    ]
@@ -0,0 +1,137 @@
+# services/dashboard_service.py
+"""
+Doctor dashboard aggregates: appointment counts by status and day, the next
+upcoming appointment and time slot utilization, computed with GROUP BY
+queries instead of loading the doctor's appointment history.
+
+Results are cached per doctor and dropped when the doctor's appointments or
+slots change (DOCTOR_APPOINTMENTS / SLOT invalidations).
+"""
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import case, func
+from sqlalchemy.orm import Session
+
+from core import config, invalidation
+from core.cache import LocalCache
+from db.models.appointment_models import (
+    Appointment as AppointmentModel,
+    Doctor as DoctorModel,
+    TimeSlot as TimeSlotModel
+)
+
+STATUSES = ("pending", "confirmed", "completed", "declined")
+
+_dashboard_cache = LocalCache(
+    "doctor_dashboard",
+    maxsize=2048,
+    ttl=config.DASHBOARD_CACHE_TTL_SECONDS,
+    topics=(invalidation.DOCTOR_APPOINTMENTS, invalidation.SLOT),
+)
+
+
+def _status_counts_by_day(db: Session, doctor_id: int, date_from: date, date_to: date) -> Dict[date, Dict[str, int]]:
+    rows = (
+        db.query(TimeSlotModel.date, AppointmentModel.status, func.count(AppointmentModel.id))
+        .join(TimeSlotModel, AppointmentModel.time_slot_id == TimeSlotModel.id)
+        .filter(
+            AppointmentModel.doctor_id == doctor_id,
+            TimeSlotModel.doctor_id == doctor_id,
+            TimeSlotModel.date.between(date_from, date_to),
+        )
+        .group_by(TimeSlotModel.date, AppointmentModel.status)
+        .all()
+    )
+    by_day: Dict[date, Dict[str, int]] = {}
+    for slot_date, status, count in rows:
+        by_day.setdefault(slot_date, dict.fromkeys(STATUSES, 0))[status] = count
+    return by_day
+
+
+def _next_appointment(db: Session, doctor_id: int, now: datetime) -> Optional[Dict[str, Any]]:
+    row = (
+        db.query(AppointmentModel.id, AppointmentModel.status, TimeSlotModel.date,
+                 TimeSlotModel.start_time, TimeSlotModel.end_time)
+        .join(TimeSlotModel, AppointmentModel.time_slot_id == TimeSlotModel.id)
+        .filter(
+            AppointmentModel.doctor_id == doctor_id,
+            AppointmentModel.status.in_(("pending", "confirmed")),
+            TimeSlotModel.doctor_id == doctor_id,
+            TimeSlotModel.date >= now.date(),
+            (TimeSlotModel.date > now.date()) | (TimeSlotModel.start_time > now.time()),
+        )
+        .order_by(TimeSlotModel.date, TimeSlotModel.start_time)
+        .limit(1)
+        .first()
+    )
+    if row is None:
+        return None
+    appointment_id, status, slot_date, start_time, end_time = row
+    return {
+        "appointment_id": appointment_id,
+        "appointment_status": status,
+        "date": slot_date,
+        "start_time": start_time,
+        "end_time": end_time,
+    }
+
+
+def _slot_utilization(db: Session, doctor_id: int, date_from: date, date_to: date) -> Dict[str, Any]:
+    total, booked = (
+        db.query(
+            func.count(TimeSlotModel.id),
+            func.coalesce(func.sum(case((TimeSlotModel.status == "booked", 1), else_=0)), 0),
+        )
+        .filter(TimeSlotModel.doctor_id == doctor_id, TimeSlotModel.date.between(date_from, date_to))
+        .one()
+    )
+    return {
+        "total": total,
+        "booked": booked,
+        "available": total - booked,
+        "utilization": round(booked / total, 4) if total else 0.0,
+    }
+
+
+def _load_dashboard(db: Session, doctor_id: int, date_from: date, date_to: date) -> Dict[str, Any]:
+    if db.query(DoctorModel.id).filter(DoctorModel.id == doctor_id).first() is None:
+        raise HTTPException(status_code=404, detail=f"Doctor with id {doctor_id} not found")
+
+    by_day = _status_counts_by_day(db, doctor_id, date_from, date_to)
+    totals = dict.fromkeys(STATUSES, 0)
+    days = []
+    for slot_date in sorted(by_day):
+        counts = by_day[slot_date]
+        for status in STATUSES:
+            totals[status] += counts[status]
+        days.append({"date": slot_date, **counts, "total": sum(counts.values())})
+
+    return {
+        "doctor_id": doctor_id,
+        "date_from": date_from,
+        "date_to": date_to,
+        "totals": {**totals, "total": sum(totals.values())},
+        "by_day": days,
+        "next_appointment": _next_appointment(db, doctor_id, datetime.now()),
+        "slots": _slot_utilization(db, doctor_id, date_from, date_to),
+    }
+
+
+def get_doctor_dashboard(
+    db: Session, doctor_id: int, date_from: Optional[date] = None, date_to: Optional[date] = None
+) -> Dict[str, Any]:
+    today = date.today()
+    date_from = date_from or today - timedelta(days=config.DASHBOARD_DEFAULT_DAYS)
+    date_to = date_to or today + timedelta(days=config.DASHBOARD_DEFAULT_DAYS)
+    if date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+    if (date_to - date_from).days > config.DASHBOARD_MAX_DAYS:
+        raise HTTPException(status_code=400, detail=f"Date range cannot exceed {config.DASHBOARD_MAX_DAYS} days")
+
+    return _dashboard_cache.get_or_load(
+        (doctor_id, date_from, date_to),
+        lambda: _load_dashboard(db, doctor_id, date_from, date_to),
+        tag=doctor_id,
+    )
@@ -0,0 +1,106 @@
+# services/directory_service.py
+"""
+Doctor, patient and health institution reads for the app's list screens.
+
+List endpoints take `?fields=` (core.fieldsets): only the requested columns
+are SELECTed and returned. Batch lookups resolve up to BATCH_MAX_IDS ids with
+one IN query and key the results by id.
+
+A shared doctor profile or slot list gets bursts of identical requests, so
+concurrent reads of one doctor share a single query (core.singleflight);
+their results are encoded to plain data before being shared.
+"""
+from datetime import date
+from typing import Any, Dict, List, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from sqlalchemy.orm import Session
+
+from core import singleflight
+from core.fieldsets import FieldSet
+from db import statements
+from db.models.appointment_models import (
+    Doctor as DoctorModel,
+    HealthInstitution as HealthInstitutionModel,
+    Patient as PatientModel
+)
+from services.appointment_service import unique_batch_ids
+
+# Fields selectable with ?fields=; credentials are never mapped
+DOCTOR_FIELDS = FieldSet({
+    "id": DoctorModel.id,
+    "first_name": DoctorModel.first_name,
+    "last_name": DoctorModel.last_name,
+    "photo_url": DoctorModel.photo_url,
+    "email": DoctorModel.email,
+    "specialty_id": DoctorModel.specialty_id,
+    "health_institution_id": DoctorModel.health_institution_id,
+})
+
+PATIENT_FIELDS = FieldSet({
+    "id": PatientModel.id,
+    "first_name": PatientModel.first_name,
+    "last_name": PatientModel.last_name,
+    "photo_url": PatientModel.photo_url,
+})
+
+
+def _list(db: Session, field_set: FieldSet, fields: Optional[str], order_by) -> List[Dict[str, Any]]:
+    names = field_set.parse(fields)
+    serialize = field_set.serializer(names)
+    return [serialize(row) for row in db.query(*field_set.select(names)).order_by(order_by)]
+
+
+def list_doctors(db: Session, fields: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _list(db, DOCTOR_FIELDS, fields, DoctorModel.id)
+
+
+def list_patients(db: Session, fields: Optional[str] = None) -> List[Dict[str, Any]]:
+    return _list(db, PATIENT_FIELDS, fields, PatientModel.id)
+
+
+@singleflight.coalesce("doctor_profile", key=lambda db, doctor_id: doctor_id)
+def get_doctor(db: Session, doctor_id: int) -> Dict[str, Any]:
+    doctor = db.query(DoctorModel).filter(DoctorModel.id == doctor_id).first()
+    if not doctor:
+        raise HTTPException(status_code=404, detail="Doctor not found")
+    return jsonable_encoder(doctor)
+
+
+@singleflight.coalesce("doctor_slots", key=lambda db, doctor_id, day: (doctor_id, day))
+def get_available_slots(db: Session, doctor_id: int, day: Optional[date] = None) -> List[Dict[str, Any]]:
+    if day:
+        slots = db.execute(statements.AVAILABLE_SLOTS_FOR_DOCTOR_ON_DATE, {"doctor_id": doctor_id, "date": day})
+    else:
+        slots = db.execute(statements.AVAILABLE_SLOTS_FOR_DOCTOR, {"doctor_id": doctor_id})
+    return jsonable_encoder(slots.scalars().all())
+
+
+def _keyed_by_id(ids: List[int], rows: list) -> Dict[str, Any]:
+    found = {row.id: row for row in rows}
+    return {
+        "results": {item_id: found.get(item_id) for item_id in ids},
+        "not_found": [item_id for item_id in ids if item_id not in found],
+    }
+
+
+def get_doctors_by_ids(db: Session, doctor_ids: List[int]) -> Dict[str, Any]:
+    ids = unique_batch_ids(doctor_ids)
+    doctors = db.query(DoctorModel).filter(DoctorModel.id.in_(ids)).all() if ids else []
+    return _keyed_by_id(ids, doctors)
+
+
+def get_health_institution(db: Session, institution_id: int) -> HealthInstitutionModel:
+    institution = db.query(HealthInstitutionModel).filter(HealthInstitutionModel.id == institution_id).first()
+    if not institution:
+        raise HTTPException(status_code=404, detail="Health institution not found")
+    return institution
+
+
+def get_health_institutions_by_ids(db: Session, institution_ids: List[int]) -> Dict[str, Any]:
+    ids = unique_batch_ids(institution_ids)
+    institutions = (
+        db.query(HealthInstitutionModel).filter(HealthInstitutionModel.id.in_(ids)).all() if ids else []
+    )
+    return _keyed_by_id(ids, institutions)
@@ -0,0 +1,259 @@
+# services/dose_schedule.py
+"""
+Medication dose schedules.
+
+Medications store free-text frequency and duration ("twice daily", "q8h",
+"every other day", "08:00, 20:00", "for 10 days", "2 weeks", ...). This
+module parses the common forms into a DoseSchedule, expands each medication
+into its dose times (from the prescription's created_at until the end of the
+course, never past expires_at) and stores them in medication_doses.
+
+Medications are written by the prescription service, not through this API,
+so nothing here recompiles them on write: run the backfill after syncs
+(e.g. from cron) to compile new and changed medications:
+
+    python -m services.dose_schedule
+
+compile_medications() can also be called from any write path that shares
+the caller's transaction.
+
+Unrecognised frequencies and "as needed" medications get no doses.
+"""
+import logging
+import re
+from datetime import datetime, time, timedelta
+from typing import Any, Dict, Iterator, List, NamedTuple, Optional, Sequence, Tuple
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+
+from core import config
+from db import tables
+from db.models.appointment_models import MedicationDose
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+BACKFILL_BATCH_SIZE = 500
+
+# Default clock times for "n times a day"
+_TIMES_PER_DAY = {
+    1: (time(8),),
+    2: (time(8), time(20)),
+    3: (time(8), time(14), time(20)),
+    4: (time(8), time(12), time(16), time(20)),
+    5: (time(8), time(11), time(14), time(17), time(20)),
+    6: (time(6), time(9), time(12), time(15), time(18), time(21)),
+}
+_TIMES_OF_DAY = {
+    "morning": time(8), "breakfast": time(8),
+    "noon": time(12), "lunch": time(12), "midday": time(12),
+    "afternoon": time(16),
+    "evening": time(20), "dinner": time(20), "supper": time(20),
+    "bedtime": time(22), "night": time(22), "nightly": time(22),
+}
+_NUMBERS = {
+    "a": 1, "an": 1, "one": 1, "once": 1, "two": 2, "twice": 2, "three": 3, "thrice": 3,
+    "four": 4, "five": 5, "six": 6, "seven": 7, "eight": 8, "nine": 9, "ten": 10,
+    "twelve": 12, "fourteen": 14, "thirty": 30,
+}
+_ABBREVIATIONS = {"qd": 1, "od": 1, "bid": 2, "bd": 2, "tid": 3, "tds": 3, "qid": 4, "qds": 4}
+_UNIT_DAYS = {"d": 1, "day": 1, "w": 7, "wk": 7, "week": 7, "m": 30, "mo": 30, "month": 30}
+
+# Digits, or a number word followed by a space ("an d" must not read as "and")
+_NUMBER = r"(\d+|(?:" + "|".join(_NUMBERS) + r")(?=\s))"
+_PRN = re.compile(r"\b(prn|as needed|when needed|if needed|sos)\b")
+_CLOCK = re.compile(r"\b([01]?\d|2[0-3])[:h]([0-5]\d)\b")
+_EVERY_HOURS = re.compile(r"\b(?:every|q)\s*" + _NUMBER + r"\s*(?:h|hr|hrs|hour|hours)\b")
+_EVERY_OTHER_DAY = re.compile(r"\b(every other day|alternate days|qod)\b")
+_WEEKLY = re.compile(r"\b(weekly|once a week|once per week|every week)\b")
+_PER_DAY = re.compile(
+    r"\b" + _NUMBER + r"\s*(?:x|times?)?\s*(?:a|per|/|each|every)?\s*(?:day|daily|d)\b"
+)
+_DAILY = re.compile(r"\b(daily|every day|a day|per day)\b")
+_DURATION = re.compile(r"\b" + _NUMBER + r"\s*(d|days?|w|wks?|weeks?|m|mo|months?)\b")
+
+
+class DoseSchedule(NamedTuple):
+    times: Tuple[time, ...] = ()          # clock times, on every `every_days`-th day
+    every_days: int = 1
+    interval: Optional[timedelta] = None  # fixed interval from the start instead of clock times
+
+
+def _number(token: str) -> int:
+    return int(token) if token.isdigit() else _NUMBERS[token]
+
+
+def _normalize(text: str) -> str:
+    return " ".join((text or "").lower().replace(".", "").split())
+
+
+def parse_frequency(text: Optional[str]) -> Optional[DoseSchedule]:
+    """DoseSchedule for a frequency text, or None for "as needed" / unrecognised text."""
+    text = _normalize(text)
+    if not text or _PRN.search(text):
+        return None
+
+    every_days = 2 if _EVERY_OTHER_DAY.search(text) else 7 if _WEEKLY.search(text) else 1
+
+    clock = sorted({time(int(hour), int(minute)) for hour, minute in _CLOCK.findall(text)})
+    if clock:
+        return DoseSchedule(tuple(clock), every_days)
+
+    match = _EVERY_HOURS.search(text)
+    if match:
+        hours = _number(match.group(1))
+        if hours <= 0:
+            return None
+        if 24 % hours == 0:
+            return DoseSchedule(tuple(sorted(time((8 + hours * i) % 24) for i in range(24 // hours))))
+        return DoseSchedule(interval=timedelta(hours=hours))
+
+    words = set(re.findall(r"[a-z]+", text))
+    for abbreviation, count in _ABBREVIATIONS.items():
+        if abbreviation in words:
+            return DoseSchedule(_TIMES_PER_DAY[count], every_days)
+    if words & {"qhs", "hs"}:
+        return DoseSchedule((_TIMES_OF_DAY["bedtime"],), every_days)
+
+    match = _PER_DAY.search(text)
+    if match:
+        count = _number(match.group(1))
+        return DoseSchedule(_TIMES_PER_DAY[count], every_days) if count in _TIMES_PER_DAY else None
+
+    named = sorted({_TIMES_OF_DAY[word] for word in words if word in _TIMES_OF_DAY})
+    if named:
+        return DoseSchedule(tuple(named), every_days)
+
+    if every_days > 1 or _DAILY.search(text):
+        return DoseSchedule(_TIMES_PER_DAY[1], every_days)
+    return None
+
+
+def parse_duration(text: Optional[str]) -> Optional[timedelta]:
+    """Course length, or None when open-ended / unrecognised (the course then runs until expiry)."""
+    match = _DURATION.search(_normalize(text))
+    if not match:
+        return None
+    unit = match.group(2).rstrip("s")
+    return timedelta(days=_number(match.group(1)) * _UNIT_DAYS[unit])
+
+
+def dose_times(schedule: DoseSchedule, start: datetime, end: datetime) -> Iterator[datetime]:
+    """Dose times in [start, end)."""
+    if schedule.interval is not None:
+        due_at = start
+        while due_at < end:
+            yield due_at
+            due_at += schedule.interval
+        return
+    day = start.date()
+    while True:
+        for clock_time in schedule.times:
+            due_at = datetime.combine(day, clock_time)
+            if due_at >= end:
+                return
+            if due_at >= start:
+                yield due_at
+        day += timedelta(days=schedule.every_days)
+
+
+def _course_end(start: datetime, expires_at: Optional[datetime], duration: Optional[timedelta]) -> datetime:
+    end = start + timedelta(days=config.MEDICATION_DOSE_MAX_DAYS)
+    if duration is not None:
+        end = min(end, start + duration)
+    if expires_at is not None:
+        end = min(end, expires_at)
+    return end
+
+
+def compile_medications(db: Session, medication_ids: Sequence[int]) -> Dict[str, Any]:
+    """
+    Replace the stored doses of these medications; runs in the caller's
+    transaction, so doses commit together with the medications.
+    """
+    medications, prescriptions = tables.medications, tables.prescriptions
+    rows = db.execute(
+        select(
+            medications.c.id, medications.c.frequency, medications.c.duration,
+            prescriptions.c.patient_id, prescriptions.c.created_at, prescriptions.c.expires_at,
+        )
+        .join(prescriptions, prescriptions.c.id == medications.c.prescription_id)
+        .where(medications.c.id.in_(list(medication_ids)))
+    ).all()
+
+    doses: List[Dict[str, Any]] = []
+    unscheduled: List[int] = []
+    for medication_id, frequency, duration, patient_id, created_at, expires_at in rows:
+        schedule = parse_frequency(frequency)
+        if schedule is None:
+            unscheduled.append(medication_id)
+            continue
+        start = created_at or datetime.now()
+        end = _course_end(start, expires_at, parse_duration(duration))
+        doses.extend(
+            {"medication_id": medication_id, "patient_id": patient_id, "due_at": due_at}
+            for due_at in dose_times(schedule, start, end)
+        )
+
+    db.execute(delete(MedicationDose).where(MedicationDose.medication_id.in_(list(medication_ids))))
+    if doses:
+        db.execute(insert(MedicationDose), doses)
+    return {"medications": len(rows), "doses": len(doses), "unscheduled": unscheduled}
+
+
+def _due(db: Session, start: datetime, end: datetime, patient_id: Optional[int] = None):
+    medications = tables.medications
+    query = (
+        select(
+            MedicationDose.due_at, MedicationDose.patient_id, MedicationDose.medication_id,
+            medications.c.name, medications.c.dosage,
+        )
+        .outerjoin(medications, medications.c.id == MedicationDose.medication_id)
+        .where(MedicationDose.due_at > start, MedicationDose.due_at <= end)
+        .order_by(MedicationDose.due_at, MedicationDose.medication_id)
+    )
+    if patient_id is not None:
+        query = query.where(MedicationDose.patient_id == patient_id)
+    return [
+        {"due_at": due_at, "patient_id": patient, "medication_id": medication_id, "name": name, "dosage": dosage}
+        for due_at, patient, medication_id, name, dosage in db.execute(query)
+    ]
+
+
+def doses_due_between(db: Session, start: datetime, end: datetime) -> List[Dict[str, Any]]:
+    """Every patient's doses due in (start, end]: one range scan on ix_medication_doses_due_at per reminder tick."""
+    return _due(db, start, end)
+
+
+def get_doses_due(db: Session, patient_id: int, hours: int) -> List[Dict[str, Any]]:
+    now = datetime.now()
+    return _due(db, now, now + timedelta(hours=hours), patient_id=patient_id)
+
+
+def backfill(db: Session, batch_size: int = BACKFILL_BATCH_SIZE) -> int:
+    """Compile every medication, in id order, one transaction per batch."""
+    medications = tables.medications
+    last_id, compiled = 0, 0
+    while True:
+        ids = db.execute(
+            select(medications.c.id).where(medications.c.id > last_id).order_by(medications.c.id).limit(batch_size)
+        ).scalars().all()
+        if not ids:
+            return compiled
+        compiled += compile_medications(db, ids)["medications"]
+        db.commit()
+        last_id = ids[-1]
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info("Compiled dose schedules for %d medications", backfill(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+# services/export_service.py
+"""
+Bulk appointment and prescription export for analytics.
+
+Rows are read with a server-side cursor (yield_per -> stream_results) in
+id order and handed to the encoders in utils/export.py as they
+arrive, so neither the database driver nor the API holds the whole result.
+Each export is resumable: pass after_id = the last id received to continue
+an interrupted download.
+
+The stream opens its own session: request-scoped sessions from get_db are
+closed before a StreamingResponse body is sent.
+"""
+from datetime import date, datetime, time, timedelta
+from typing import Dict, Iterator, List, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import select
+
+from db import tables
+from db.models.appointment_models import (
+    Appointment as AppointmentModel,
+    Doctor as DoctorModel,
+    HealthInstitution as HealthInstitutionModel,
+    TimeSlot as TimeSlotModel
+)
+from db.session import SessionLocal
+
+YIELD_PER = 1000
+
+APPOINTMENT_COLUMNS: List[str] = [
+    "appointment_id", "status", "patient_id", "doctor_id", "specialty_id",
+    "health_institution_id", "health_institution_name",
+    "time_slot_id", "date", "start_time", "end_time",
+]
+
+APPOINTMENT_COLUMN_TYPES: Dict[str, str] = {
+    "appointment_id": "int", "status": "str", "patient_id": "int", "doctor_id": "int", "specialty_id": "int",
+    "health_institution_id": "int", "health_institution_name": "str",
+    "time_slot_id": "int", "date": "date", "start_time": "time", "end_time": "time",
+}
+
+
+PRESCRIPTION_COLUMNS: List[str] = [
+    "prescription_id", "patient_id", "doctor_id", "health_institution_id", "instructions",
+    "created_at", "expires_at", "status", "sync_status",
+]
+
+PRESCRIPTION_COLUMN_TYPES: Dict[str, str] = {
+    "prescription_id": "int", "patient_id": "int", "doctor_id": "int", "health_institution_id": "int",
+    "instructions": "str", "created_at": "datetime", "expires_at": "datetime", "status": "str", "sync_status": "str",
+}
+
+
+def _check_range(date_from: Optional[date], date_to: Optional[date]) -> None:
+    if date_from and date_to and date_to < date_from:
+        raise HTTPException(status_code=400, detail="date_to must not be before date_from")
+
+
+def _stream(query) -> Iterator[tuple]:
+    db = SessionLocal()
+    try:
+        for row in db.execute(query):
+            yield tuple(row)
+    finally:
+        db.close()
+
+
+def _appointments_query(
+    date_from: Optional[date],
+    date_to: Optional[date],
+    doctor_id: Optional[int],
+    institution_id: Optional[int],
+    after_id: Optional[int],
+):
+    query = (
+        select(
+            AppointmentModel.id, AppointmentModel.status, AppointmentModel.patient_id, AppointmentModel.doctor_id,
+            DoctorModel.specialty_id, HealthInstitutionModel.id, HealthInstitutionModel.name,
+            TimeSlotModel.id, TimeSlotModel.date, TimeSlotModel.start_time, TimeSlotModel.end_time,
+        )
+        .select_from(AppointmentModel)
+        .outerjoin(DoctorModel, AppointmentModel.doctor_id == DoctorModel.id)
+        .outerjoin(HealthInstitutionModel, DoctorModel.health_institution_id == HealthInstitutionModel.id)
+        .outerjoin(TimeSlotModel, AppointmentModel.time_slot_id == TimeSlotModel.id)
+        .order_by(AppointmentModel.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    if date_from is not None:
+        query = query.where(TimeSlotModel.date >= date_from)
+    if date_to is not None:
+        query = query.where(TimeSlotModel.date <= date_to)
+    if doctor_id is not None:
+        query = query.where(AppointmentModel.doctor_id == doctor_id)
+    if institution_id is not None:
+        query = query.where(DoctorModel.health_institution_id == institution_id)
+    if after_id is not None:
+        query = query.where(AppointmentModel.id > after_id)
+    return query
+
+
+def iter_appointments(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+    institution_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> Iterator[tuple]:
+    """Appointment rows (APPOINTMENT_COLUMNS order) streamed from the database."""
+    _check_range(date_from, date_to)
+    return _stream(_appointments_query(date_from, date_to, doctor_id, institution_id, after_id))
+
+
+def _prescriptions_query(
+    date_from: Optional[date],
+    date_to: Optional[date],
+    doctor_id: Optional[int],
+    institution_id: Optional[int],
+    after_id: Optional[int],
+):
+    prescriptions = tables.prescriptions
+    query = (
+        select(
+            prescriptions.c.id, prescriptions.c.patient_id, prescriptions.c.doctor_id,
+            DoctorModel.health_institution_id, prescriptions.c.instructions, prescriptions.c.created_at,
+            prescriptions.c.expires_at, prescriptions.c.status, prescriptions.c.sync_status,
+        )
+        .select_from(prescriptions)
+        .outerjoin(DoctorModel, prescriptions.c.doctor_id == DoctorModel.id)
+        .order_by(prescriptions.c.id)
+        .execution_options(yield_per=YIELD_PER)
+    )
+    # Dates are inclusive, like the appointment export's; created_at is a timestamp
+    if date_from is not None:
+        query = query.where(prescriptions.c.created_at >= datetime.combine(date_from, time.min))
+    if date_to is not None:
+        query = query.where(prescriptions.c.created_at < datetime.combine(date_to + timedelta(days=1), time.min))
+    if doctor_id is not None:
+        query = query.where(prescriptions.c.doctor_id == doctor_id)
+    if institution_id is not None:
+        query = query.where(DoctorModel.health_institution_id == institution_id)
+    if after_id is not None:
+        query = query.where(prescriptions.c.id > after_id)
+    return query
+
+
+def iter_prescriptions(
+    date_from: Optional[date] = None,
+    date_to: Optional[date] = None,
+    doctor_id: Optional[int] = None,
+    institution_id: Optional[int] = None,
+    after_id: Optional[int] = None,
+) -> Iterator[tuple]:
+    """Prescription rows (PRESCRIPTION_COLUMNS order) streamed from the database; dates filter created_at."""
+    _check_range(date_from, date_to)
+    return _stream(_prescriptions_query(date_from, date_to, doctor_id, institution_id, after_id))
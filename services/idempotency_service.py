@@ -0,0 +1,133 @@
+# services/idempotency_service.py
+"""
+Idempotency-Key support for retried writes.
+
+    idem = IdempotentRequest(db, f"POST /waitlist patient:{patient_id}", idempotency_key, payload)
+    if idem.replay is not None:
+        return idem.replay                # stored response, nothing re-executed
+    ... perform the write ...
+    idem.save(body)                       # added to the same transaction
+    return idem.commit() or body
+
+Scopes name the route and the caller, so keys never collide across users.
+Both waitlist POSTs (join, accept) take the header. The key row is inserted
+through the request's own session, in the same transaction as the effect. Of
+two concurrent requests with the same key, the second commit fails on the
+primary key and rolls back its effect, then replays the first response.
+Writes that can fail on their own constraints first (a unique index) call
+replay_after_conflict() after rolling back for the same reason. A key
+reused with a different body is rejected with 422. Keys expire after
+IDEMPOTENCY_TTL_HOURS; run `python -m services.idempotency_service` from cron
+to delete them.
+"""
+import hashlib
+import json
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Optional
+
+from fastapi import HTTPException
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import JSONResponse
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from core import config
+from db.models.appointment_models import IdempotencyKey
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+
+
+def fingerprint(payload: Any) -> str:
+    canonical = json.dumps(jsonable_encoder(payload), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode("utf-8")).hexdigest()
+
+
+def _ttl() -> timedelta:
+    return timedelta(hours=config.IDEMPOTENCY_TTL_HOURS)
+
+
+class IdempotentRequest:
+    def __init__(self, db: Session, scope: str, key: Optional[str], payload: Any):
+        self.db = db
+        self.scope = scope
+        self.key = key
+        self.fingerprint = fingerprint(payload) if key else None
+        self.replay: Optional[JSONResponse] = self._lookup() if key else None
+
+    def _lookup(self) -> Optional[JSONResponse]:
+        if len(self.key) > 255:
+            raise HTTPException(status_code=400, detail=f"{HEADER} must be at most 255 characters")
+        stored = self.db.get(IdempotencyKey, (self.scope, self.key))
+        if stored is None:
+            return None
+        if stored.created_at < datetime.now() - _ttl():
+            # Expired but not purged yet: forget it and run the request normally
+            self.db.delete(stored)
+            self.db.flush()
+            return None
+        if stored.fingerprint != self.fingerprint:
+            raise HTTPException(
+                status_code=422, detail=f"{HEADER} was already used with a different request body"
+            )
+        return JSONResponse(
+            content=stored.response, status_code=stored.status_code, headers={REPLAYED_HEADER: "true"}
+        )
+
+    def save(self, body: Any, status_code: int = 200) -> None:
+        """Record the response in the current transaction (no-op without a key)."""
+        if self.key:
+            self.db.add(IdempotencyKey(
+                scope=self.scope, key=self.key, fingerprint=self.fingerprint,
+                status_code=status_code, response=jsonable_encoder(body),
+            ))
+
+    def replay_after_conflict(self) -> Optional[JSONResponse]:
+        """
+        Look the key up again after the effect hit a conflict (e.g. a unique
+        index, after rollback): a concurrent request with the same key may have
+        committed meanwhile. Returns its stored response, or None.
+        """
+        return self._lookup() if self.key else None
+
+    def commit(self) -> Optional[JSONResponse]:
+        """
+        Commit the effect together with the key. Returns the stored response
+        if a concurrent request with the same key committed first.
+        """
+        try:
+            self.db.commit()
+            return None
+        except IntegrityError:
+            self.db.rollback()
+            replay = self.replay_after_conflict()
+            if replay is None:
+                raise
+            return replay
+
+
+def purge_expired(db: Session) -> int:
+    deleted = (
+        db.query(IdempotencyKey)
+        .filter(IdempotencyKey.created_at < datetime.now() - _ttl())
+        .delete(synchronize_session=False)
+    )
+    db.commit()
+    return deleted
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    db = SessionLocal()
+    try:
+        logger.info("Purged %d expired idempotency keys", purge_expired(db))
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
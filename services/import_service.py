@@ -0,0 +1,512 @@
+# services/import_service.py
+"""
+Bulk import of doctors, working hours and time slots (institution onboarding).
+
+Input is CSV (with a header row) or NDJSON, read as a stream. Rows are
+validated in Python in chunks of IMPORT_CHUNK_ROWS; valid rows go into a
+temporary staging table (COPY on Postgres, multi-row INSERT elsewhere) and
+are merged into the real table with a few set-based statements, one
+transaction per chunk. Invalid rows and rows the merge rejects (unknown
+doctor, specialty or institution) are reported with their line number; they
+never abort the import.
+
+Merge rules:
+- doctors are matched on email: existing doctors are updated, new ones
+  inserted; within one chunk the last row for an email wins;
+- working hours and time slots may reference the doctor by doctor_id or
+  doctor_email; rows that already exist (same doctor and day/period, or same
+  doctor, date and start time) are skipped.
+
+    python -m services.import_service time_slots slots.csv
+"""
+import argparse
+import csv
+import io
+import json
+import logging
+import time
+from datetime import date, time as time_of_day
+from typing import Any, BinaryIO, Callable, Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import (
+    Column, Date, Index, Integer, MetaData, String, Table, Text, Time, cast, exists, func, select
+)
+from sqlalchemy.dialects import postgresql, sqlite
+from sqlalchemy.orm import Session
+
+from core import config, invalidation
+from db.models.appointment_models import (
+    Doctor as DoctorModel,
+    HealthInstitution as HealthInstitutionModel,
+    PeriodType,
+    Specialty as SpecialtyModel,
+    TimeSlot as TimeSlotModel,
+    WorkingHours as WorkingHoursModel
+)
+from db.session import engine
+
+logger = logging.getLogger(__name__)
+
+FORMATS = ("csv", "ndjson")
+SLOT_STATUSES = ("available", "booked")
+
+# Staging tables live in their own metadata so create_all never sees them.
+_staging_metadata = MetaData()
+
+_doctors_staging = Table(
+    "import_doctors", _staging_metadata,
+    Column("row_no", Integer, nullable=False),
+    Column("first_name", String(100)),
+    Column("last_name", String(100)),
+    Column("email", String(100)),
+    Column("photo_url", Text),
+    Column("specialty_id", Integer),
+    Column("health_institution_id", Integer),
+    Index("ix_import_doctors_email", "email", "row_no"),
+    prefixes=["TEMPORARY"],
+)
+
+_working_hours_staging = Table(
+    "import_working_hours", _staging_metadata,
+    Column("row_no", Integer, nullable=False),
+    Column("doctor_id", Integer),
+    Column("doctor_email", String(100)),
+    Column("day_of_week", Integer),
+    Column("period", String(10)),
+    Column("start_time", Time),
+    Column("end_time", Time),
+    Index("ix_import_working_hours_key", "doctor_id", "day_of_week", "period", "row_no"),
+    prefixes=["TEMPORARY"],
+)
+
+_time_slots_staging = Table(
+    "import_time_slots", _staging_metadata,
+    Column("row_no", Integer, nullable=False),
+    Column("doctor_id", Integer),
+    Column("doctor_email", String(100)),
+    Column("date", Date),
+    Column("start_time", Time),
+    Column("end_time", Time),
+    Column("status", String(20)),
+    Index("ix_import_time_slots_key", "doctor_id", "date", "start_time", "row_no"),
+    prefixes=["TEMPORARY"],
+)
+
+
+class ImportReport:
+    def __init__(self, entity: str):
+        self.entity = entity
+        self.rows = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.errors: List[Dict[str, Any]] = []
+        self.started_at = time.perf_counter()
+
+    def add_error(self, row_no: int, message: str) -> None:
+        self.failed += 1
+        if len(self.errors) < config.IMPORT_MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row_no, "error": message})
+
+    def as_dict(self) -> Dict[str, Any]:
+        elapsed = time.perf_counter() - self.started_at
+        return {
+            "entity": self.entity,
+            "rows": self.rows,
+            "inserted": self.inserted,
+            "updated": self.updated,
+            "skipped": self.skipped,
+            "failed": self.failed,
+            "elapsed_seconds": round(elapsed, 3),
+            "rows_per_second": round(self.rows / elapsed) if elapsed > 0 else None,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
+
+
+# --- Row validation ---
+
+def _int(value: Any) -> int:
+    if isinstance(value, bool) or (isinstance(value, float) and not value.is_integer()):
+        raise ValueError(f"{value!r} is not an integer")
+    return int(value)
+
+
+def _text(max_length: Optional[int] = None) -> Callable[[Any], str]:
+    def convert(value: Any) -> str:
+        value = str(value).strip()
+        if max_length is not None and len(value) > max_length:
+            raise ValueError(f"longer than {max_length} characters")
+        return value
+    return convert
+
+
+def _email(value: Any) -> str:
+    value = _text(100)(value)
+    if "@" not in value:
+        raise ValueError(f"{value!r} is not an email address")
+    return value
+
+
+def _date(value: Any) -> date:
+    return date.fromisoformat(str(value).strip())
+
+
+def _time(value: Any) -> time_of_day:
+    return time_of_day.fromisoformat(str(value).strip())
+
+
+def _one_of(choices: Tuple[str, ...]) -> Callable[[Any], str]:
+    def convert(value: Any) -> str:
+        value = str(value).strip()
+        if value not in choices:
+            raise ValueError(f"must be one of {', '.join(choices)}")
+        return value
+    return convert
+
+
+def _day_of_week(value: Any) -> int:
+    value = _int(value)
+    if not 0 <= value <= 6:
+        raise ValueError("must be between 0 (Sunday) and 6")
+    return value
+
+
+def _check_doctor_ref(row: Dict[str, Any]) -> Optional[str]:
+    if row["doctor_id"] is None and row["doctor_email"] is None:
+        return "doctor_id or doctor_email is required"
+    if row["end_time"] <= row["start_time"]:
+        return "end_time must be after start_time"
+    return None
+
+
+# --- Merge steps, one transaction per chunk ---
+
+def _reject(db: Session, staging: Table, rows, report: ImportReport) -> None:
+    """Report the (row_no, message) rows and drop them from the staging table."""
+    rejected = [(row_no, message) for row_no, message in rows]
+    for row_no, message in rejected:
+        report.add_error(row_no, message)
+    if rejected:
+        db.execute(staging.delete().where(staging.c.row_no.in_([row_no for row_no, _ in rejected])))
+
+
+def _resolve_doctors(db: Session, staging: Table, report: ImportReport) -> None:
+    doctors = DoctorModel.__table__
+    db.execute(
+        staging.update()
+        .where(staging.c.doctor_id.is_(None))
+        .values(doctor_id=select(doctors.c.id).where(doctors.c.email == staging.c.doctor_email).scalar_subquery())
+    )
+    unknown = (
+        select(staging.c.row_no, func.coalesce(staging.c.doctor_email, cast(staging.c.doctor_id, String)))
+        .where(~exists().where(doctors.c.id == staging.c.doctor_id))
+    )
+    _reject(db, staging, ((row_no, f"unknown doctor {ref}") for row_no, ref in db.execute(unknown)), report)
+
+
+def _staged_doctor_ids(db: Session, staging: Table) -> List[int]:
+    return list(db.execute(select(staging.c.doctor_id).distinct()).scalars())
+
+
+def _upsert(db: Session):
+    return (postgresql if db.bind.dialect.name == "postgresql" else sqlite).insert
+
+
+def _merge_doctors(db: Session, report: ImportReport) -> None:
+    staging, doctors = _doctors_staging, DoctorModel.__table__
+    specialties, institutions = SpecialtyModel.__table__, HealthInstitutionModel.__table__
+    bad_references = (
+        select(staging.c.row_no, staging.c.specialty_id, staging.c.health_institution_id, specialties.c.id)
+        .outerjoin(specialties, specialties.c.id == staging.c.specialty_id)
+        .outerjoin(institutions, institutions.c.id == staging.c.health_institution_id)
+        .where(
+            (staging.c.specialty_id.isnot(None) & specialties.c.id.is_(None))
+            | (staging.c.health_institution_id.isnot(None) & institutions.c.id.is_(None))
+        )
+    )
+    _reject(db, staging, (
+        (row_no, f"unknown specialty {specialty_id}" if found_specialty is None and specialty_id is not None
+         else f"unknown health institution {institution_id}")
+        for row_no, specialty_id, institution_id, found_specialty in db.execute(bad_references)
+    ), report)
+
+    # Within the chunk, the last row for an email wins
+    later = staging.alias("later")
+    superseded = exists().where(later.c.email == staging.c.email, later.c.row_no > staging.c.row_no)
+    report.skipped += db.execute(select(func.count()).select_from(staging).where(superseded)).scalar()
+    existing = db.execute(
+        select(func.count()).select_from(staging)
+        .where(~superseded, exists().where(doctors.c.email == staging.c.email))
+    ).scalar()
+
+    columns = ["first_name", "last_name", "email", "photo_url", "specialty_id", "health_institution_id"]
+    insert = _upsert(db)(doctors).from_select(
+        columns, select(*(staging.c[name] for name in columns)).where(~superseded)
+    )
+    insert = insert.on_conflict_do_update(
+        index_elements=[doctors.c.email],
+        set_={name: insert.excluded[name] for name in columns if name != "email"},
+    ).returning(doctors.c.id)
+    doctor_ids = db.execute(insert).scalars().all()
+    report.updated += existing
+    report.inserted += len(doctor_ids) - existing
+    for doctor_id in doctor_ids:
+        invalidation.publish_after_commit(db, invalidation.DOCTOR, doctor_id)
+
+
+def _merge_working_hours(db: Session, report: ImportReport) -> None:
+    staging, working_hours = _working_hours_staging, WorkingHoursModel.__table__
+    _resolve_doctors(db, staging, report)
+    earlier = staging.alias("earlier")
+    duplicate = (
+        exists().where(
+            working_hours.c.doctor_id == staging.c.doctor_id,
+            working_hours.c.day_of_week == staging.c.day_of_week,
+            cast(working_hours.c.period, String) == staging.c.period,
+        )
+        | exists().where(
+            earlier.c.doctor_id == staging.c.doctor_id,
+            earlier.c.day_of_week == staging.c.day_of_week,
+            earlier.c.period == staging.c.period,
+            earlier.c.row_no < staging.c.row_no,
+        )
+    )
+    inserted = db.execute(
+        working_hours.insert().from_select(
+            ["doctor_id", "day_of_week", "period", "start_time", "end_time"],
+            select(
+                staging.c.doctor_id, staging.c.day_of_week, cast(staging.c.period, working_hours.c.period.type),
+                staging.c.start_time, staging.c.end_time,
+            ).where(~duplicate),
+        )
+    ).rowcount
+    report.inserted += inserted
+    report.skipped += db.execute(select(func.count()).select_from(staging)).scalar() - inserted
+
+
+def _merge_time_slots(db: Session, report: ImportReport) -> None:
+    staging, time_slots = _time_slots_staging, TimeSlotModel.__table__
+    _resolve_doctors(db, staging, report)
+    earlier = staging.alias("earlier")
+    duplicate = (
+        exists().where(
+            time_slots.c.doctor_id == staging.c.doctor_id,
+            time_slots.c.date == staging.c.date,
+            time_slots.c.start_time == staging.c.start_time,
+        )
+        | exists().where(
+            earlier.c.doctor_id == staging.c.doctor_id,
+            earlier.c.date == staging.c.date,
+            earlier.c.start_time == staging.c.start_time,
+            earlier.c.row_no < staging.c.row_no,
+        )
+    )
+    inserted = db.execute(
+        time_slots.insert().from_select(
+            ["doctor_id", "date", "start_time", "end_time", "status"],
+            select(
+                staging.c.doctor_id, staging.c.date, staging.c.start_time, staging.c.end_time,
+                func.coalesce(staging.c.status, "available"),
+            ).where(~duplicate),
+        )
+    ).rowcount
+    report.inserted += inserted
+    report.skipped += db.execute(select(func.count()).select_from(staging)).scalar() - inserted
+    if inserted:
+        for doctor_id in _staged_doctor_ids(db, staging):
+            invalidation.publish_after_commit(db, invalidation.SLOT, doctor_id)
+
+
+class Entity(NamedTuple):
+    staging: Table
+    fields: Dict[str, Tuple[Callable[[Any], Any], bool]]  # column -> (converter, required)
+    check: Optional[Callable[[Dict[str, Any]], Optional[str]]]
+    merge: Callable[[Session, ImportReport], None]
+
+
+ENTITIES: Dict[str, Entity] = {
+    "doctors": Entity(
+        staging=_doctors_staging,
+        fields={
+            "first_name": (_text(100), True),
+            "last_name": (_text(100), True),
+            "email": (_email, True),
+            "photo_url": (_text(), False),
+            "specialty_id": (_int, False),
+            "health_institution_id": (_int, False),
+        },
+        check=None,
+        merge=_merge_doctors,
+    ),
+    "working_hours": Entity(
+        staging=_working_hours_staging,
+        fields={
+            "doctor_id": (_int, False),
+            "doctor_email": (_email, False),
+            "day_of_week": (_day_of_week, True),
+            "period": (_one_of(tuple(p.value for p in PeriodType)), True),
+            "start_time": (_time, True),
+            "end_time": (_time, True),
+        },
+        check=_check_doctor_ref,
+        merge=_merge_working_hours,
+    ),
+    "time_slots": Entity(
+        staging=_time_slots_staging,
+        fields={
+            "doctor_id": (_int, False),
+            "doctor_email": (_email, False),
+            "date": (_date, True),
+            "start_time": (_time, True),
+            "end_time": (_time, True),
+            "status": (_one_of(SLOT_STATUSES), False),
+        },
+        check=_check_doctor_ref,
+        merge=_merge_time_slots,
+    ),
+}
+
+
+def _validate(entity: Entity, record: Any) -> Dict[str, Any]:
+    if isinstance(record, Exception):
+        raise record
+    if not isinstance(record, dict):
+        raise ValueError("expected an object")
+    row = {}
+    for name, (convert, required) in entity.fields.items():
+        value = record.get(name)
+        if value is None or (isinstance(value, str) and not value.strip()):
+            if required:
+                raise ValueError(f"{name} is required")
+            row[name] = None
+            continue
+        try:
+            row[name] = convert(value)
+        except (TypeError, ValueError) as e:
+            raise ValueError(f"{name}: {e}")
+    message = entity.check(row) if entity.check else None
+    if message:
+        raise ValueError(message)
+    return row
+
+
+# --- Input parsing and staging ---
+
+def _records(stream: BinaryIO, fmt: str, entity: Entity) -> Iterator[Tuple[int, Any]]:
+    """(line number, record) pairs; unparsable NDJSON lines come through as the exception."""
+    text = io.TextIOWrapper(stream, encoding="utf-8-sig", newline="")
+    if fmt == "csv":
+        reader = csv.DictReader(text)
+        required = {name for name, (_, is_required) in entity.fields.items() if is_required}
+        missing = required - set(reader.fieldnames or ())
+        if missing:
+            raise HTTPException(status_code=400, detail=f"CSV header is missing: {', '.join(sorted(missing))}")
+        for record in reader:
+            yield reader.line_num, record
+    else:
+        for line_no, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                yield line_no, json.loads(line)
+            except ValueError as e:
+                yield line_no, ValueError(f"invalid JSON: {e}")
+
+
+def _copy(db: Session, staging: Table, rows: List[Dict[str, Any]]) -> None:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    names = [column.name for column in staging.columns]
+    writer.writerows([[row[name] for name in names] for row in rows])
+    buffer.seek(0)
+    cursor = db.connection().connection.cursor()
+    try:
+        cursor.copy_expert(f"COPY {staging.name} ({', '.join(names)}) FROM STDIN WITH (FORMAT csv)", buffer)
+    finally:
+        cursor.close()
+
+
+def _stage(db: Session, staging: Table, rows: List[Dict[str, Any]]) -> None:
+    db.execute(staging.delete())
+    if db.bind.dialect.name == "postgresql" and db.bind.dialect.driver == "psycopg2":
+        _copy(db, staging, rows)
+    else:
+        db.execute(staging.insert(), rows)
+
+
+def _load_chunk(db: Session, entity: Entity, rows: List[Dict[str, Any]], report: ImportReport) -> None:
+    try:
+        _stage(db, entity.staging, rows)
+        entity.merge(db, report)
+        db.commit()
+    except Exception as e:
+        db.rollback()
+        logger.exception("Import chunk of %s failed", report.entity)
+        for row in rows:
+            report.add_error(row["row_no"], f"chunk failed: {e.__class__.__name__}")
+
+
+def import_rows(stream: BinaryIO, entity_name: str, fmt: str = "csv") -> Dict[str, Any]:
+    """Validate, stage and merge every row of `stream`; returns the import report."""
+    if entity_name not in ENTITIES:
+        raise HTTPException(status_code=404, detail=f"Unknown import {entity_name!r}; use one of {', '.join(ENTITIES)}")
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {fmt!r}; use one of {', '.join(FORMATS)}")
+    entity = ENTITIES[entity_name]
+    report = ImportReport(entity_name)
+    records = _records(stream, fmt, entity)
+
+    # One connection for the whole import: the staging table is session-local on Postgres
+    with engine.connect() as conn:
+        entity.staging.create(conn, checkfirst=True)
+        conn.commit()
+        db = Session(bind=conn)
+        try:
+            chunk: List[Dict[str, Any]] = []
+            for line_no, record in records:
+                report.rows += 1
+                try:
+                    row = _validate(entity, record)
+                except ValueError as e:
+                    report.add_error(line_no, str(e))
+                    continue
+                row["row_no"] = line_no
+                chunk.append(row)
+                if len(chunk) >= config.IMPORT_CHUNK_ROWS:
+                    _load_chunk(db, entity, chunk, report)
+                    chunk = []
+            if chunk:
+                _load_chunk(db, entity, chunk, report)
+        finally:
+            db.close()
+            entity.staging.drop(conn, checkfirst=True)
+            conn.commit()
+    return report.as_dict()
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Bulk import doctors, working hours or time slots.")
+    parser.add_argument("entity", choices=list(ENTITIES))
+    parser.add_argument("path", help="CSV or NDJSON file")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file extension")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO)
+    fmt = args.format or ("ndjson" if args.path.endswith((".ndjson", ".jsonl")) else "csv")
+    invalidation.bus.start()
+    try:
+        with open(args.path, "rb") as stream:
+            report = import_rows(stream, args.entity, fmt)
+    finally:
+        invalidation.bus.stop()
+    errors = report.pop("errors")
+    logger.info("Import finished: %s", json.dumps(report))
+    for error in errors:
+        logger.warning("Row %d: %s", error["row"], error["error"])
+
+
+if __name__ == "__main__":
+    main()
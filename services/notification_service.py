@@ -1,15 +1,107 @@
 import os
 from sqlalchemy.orm import Session
-from sqlalchemy import func
 from db.models.appointment_models import Notification, DeviceToken 
 from api.schemas.appointment_schemas import NotificationCreate
-from typing import List, Tuple, Optional
-import httpx
-import requests
-from google.oauth2 import service_account
-import google.auth.transport.requests
-import requests
+from typing import Dict, List, Tuple, Optional
+import asyncio
 import json
+from datetime import datetime, timedelta
+import logging
+import random
+import threading
+import time
+
+from core import config, invalidation, metrics
+from db import statements
+from db.session import SessionLocal
+
+logger = logging.getLogger(__name__)
+
+FCM_SCOPES = ['https://www.googleapis.com/auth/firebase.messaging']
+SERVICE_ACCOUNT_FILE = config.FCM_SERVICE_ACCOUNT_FILE or os.path.join(
+    os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "admin.json"
+)
+FCM_SEND_URL = config.FCM_SEND_URL
+FCM_MAX_CONCURRENCY = config.FCM_MAX_CONCURRENCY
+_FCM_RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+# google-auth and httpx are only needed to send pushes, so they are imported
+# on first use; the credentials are kept and refreshed only when the token expires.
+_fcm_credentials = None
+_fcm_credentials_lock = threading.Lock()
+_fcm_client = None
+_fcm_slots = None
+
+
+def _inbox_cutoff() -> datetime:
+    # Bounding sent_at lets Postgres prune the monthly partitions outside the inbox window.
+    return datetime.now() - timedelta(days=config.NOTIFICATION_INBOX_DAYS)
+
+
+def _get_fcm_slots() -> asyncio.Semaphore:
+    """
+    One limit for every send in the process. Requests queued inside httpx's own
+    pool are rescanned on every state change, which pins the event loop once
+    thousands of sends wait there; waiting on a semaphore costs nothing.
+    """
+    global _fcm_slots
+    if _fcm_slots is None:
+        _fcm_slots = asyncio.Semaphore(FCM_MAX_CONCURRENCY)
+    return _fcm_slots
+
+
+def _get_fcm_client():
+    global _fcm_client
+    import httpx
+
+    if _fcm_client is None:
+        _fcm_client = httpx.AsyncClient(
+            timeout=10.0, limits=httpx.Limits(max_connections=FCM_MAX_CONCURRENCY)
+        )
+    return _fcm_client
+
+
+def _get_fcm_access_token() -> str:
+    global _fcm_credentials
+    from google.oauth2 import service_account
+    import google.auth.transport.requests
+
+    with _fcm_credentials_lock:
+        if _fcm_credentials is None:
+            with open(SERVICE_ACCOUNT_FILE) as f:
+                info = json.load(f)
+            if config.FCM_TOKEN_URI:
+                info["token_uri"] = config.FCM_TOKEN_URI
+            _fcm_credentials = service_account.Credentials.from_service_account_info(info, scopes=FCM_SCOPES)
+        if not _fcm_credentials.valid:
+            _fcm_credentials.refresh(google.auth.transport.requests.Request())
+        return _fcm_credentials.token
+
+
+async def _fcm_access_token() -> str:
+    if _fcm_credentials is not None and _fcm_credentials.valid:
+        return _fcm_credentials.token
+    # Token refresh is a blocking HTTP call in google-auth; keep it off the event loop.
+    return await asyncio.to_thread(_get_fcm_access_token)
+
+
+def _is_unregistered(response) -> bool:
+    """FCM answers errorCode UNREGISTERED (usually with a 404) for app instances that are gone."""
+    if response.status_code not in (400, 404):
+        return False
+    try:
+        details = response.json().get("error", {}).get("details", [])
+    except ValueError:
+        return False
+    return any(detail.get("errorCode") == "UNREGISTERED" for detail in details)
+
+
+def _retry_delay(attempt: int, response) -> float:
+    retry_after = response.headers.get("Retry-After") if response is not None else None
+    if retry_after and retry_after.isdigit():
+        # Capped at the longest backoff: a huge Retry-After must not park the relay's batch
+        return min(float(retry_after), config.FCM_RETRY_BASE_SECONDS * 2 ** config.FCM_MAX_RETRIES)
+    return config.FCM_RETRY_BASE_SECONDS * (2 ** attempt) * random.uniform(0.5, 1.5)
 
 class NotificationService:
     @staticmethod
@@ -17,23 +109,53 @@ class NotificationService:
         return db.query(Notification).filter(Notification.id == notification_id).first()
     
     @staticmethod
-    async def send_push_notification(token: str, title: str, body: str):
-        SCOPES = ['https://www.googleapis.com/auth/firebase.messaging']
-        BASE_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
-        SERVICE_ACCOUNT_FILE = os.path.join(BASE_DIR, "admin.json")
+    async def _send_push(token: str, title: str, body: str) -> str:
+        started_at = time.perf_counter()
+        try:
+            outcome = await NotificationService._send_fcm_message(token, title, body)
+        except Exception:
+            metrics.observe_push_send(started_at, "exception")
+            logger.exception("FCM push send failed")
+            raise
+        metrics.observe_push_send(started_at, outcome)
+        return outcome
 
-        credentials = service_account.Credentials.from_service_account_file(
-            SERVICE_ACCOUNT_FILE, scopes=SCOPES
-        )
-        auth_req = google.auth.transport.requests.Request()
-        credentials.refresh(auth_req)
-        access_token = credentials.token
-
-        # Construire l'appel FCM avec ce token
-        headers = {
-            'Authorization': f'Bearer {access_token}',
-            'Content-Type': 'application/json; UTF-8',
-        }
+    @staticmethod
+    async def send_push_notification(token: str, title: str, body: str) -> str:
+        outcome = await NotificationService._send_push(token, title, body)
+        if outcome == "unregistered":
+            await asyncio.to_thread(NotificationService.prune_device_tokens, [token])
+        return outcome
+
+    @staticmethod
+    async def send_push_notifications(messages: List[Tuple[str, str, str]]) -> int:
+        """Send (token, title, body) pushes concurrently; returns how many were accepted by FCM."""
+        outcomes = await NotificationService.push_outcomes(messages)
+        return sum(outcome == "success" for outcome in outcomes)
+
+    @staticmethod
+    async def push_outcomes(messages: List[Tuple[str, str, str]]) -> List[str]:
+        """Send (token, title, body) pushes concurrently; returns each message's outcome, in order."""
+        async def send_one(token: str, title: str, body: str) -> str:
+            try:
+                return await NotificationService._send_push(token, title, body)
+            except Exception:
+                return "exception"
+
+        outcomes = await asyncio.gather(*(send_one(*message) for message in messages))
+        unregistered = {message[0] for message, outcome in zip(messages, outcomes) if outcome == "unregistered"}
+        if unregistered:
+            await asyncio.to_thread(NotificationService.prune_device_tokens, list(unregistered))
+        return outcomes
+
+    @staticmethod
+    async def _send_fcm_message(token: str, title: str, body: str) -> str:
+        """
+        Send one push; returns "success", "unregistered" or "error". Throttling,
+        5xx and transport errors are retried up to FCM_MAX_RETRIES times
+        (Retry-After is honoured); a 401 refreshes the OAuth token once.
+        """
+        import httpx
 
         message = {
             "message": {
@@ -45,14 +167,35 @@ class NotificationService:
             }
         }
 
-        response = requests.post(
-            'https://fcm.googleapis.com/v1/projects/doctorappointmentapp-b2b59/messages:send',
-            headers=headers,
-            json=message
-        )
-
-        print("Status:", response.status_code)
-        print("Response:", response.json())
+        for attempt in range(config.FCM_MAX_RETRIES + 1):
+            headers = {
+                'Authorization': f'Bearer {await _fcm_access_token()}',
+                'Content-Type': 'application/json; UTF-8',
+            }
+            response = None
+            try:
+                async with _get_fcm_slots():
+                    response = await _get_fcm_client().post(FCM_SEND_URL, headers=headers, json=message)
+            except httpx.TransportError:
+                if attempt == config.FCM_MAX_RETRIES:
+                    raise
+                reason = "transport"
+            else:
+                if response.status_code < 400:
+                    return "success"
+                if _is_unregistered(response):
+                    return "unregistered"
+                if response.status_code == 401 and attempt == 0 and _fcm_credentials is not None:
+                    _fcm_credentials.token = None  # forces a refresh on the next attempt
+                    reason = "unauthorized"
+                elif response.status_code not in _FCM_RETRYABLE_STATUS or attempt == config.FCM_MAX_RETRIES:
+                    logger.warning("FCM send returned %s: %s", response.status_code, response.text)
+                    return "error"
+                else:
+                    reason = str(response.status_code)
+            metrics.PUSH_RETRIES.labels(reason).inc()
+            await asyncio.sleep(0 if reason == "unauthorized" else _retry_delay(attempt, response))
+        return "error"
 
     @staticmethod
     def get_user_fcm_token(db: Session, user_id: int) -> str | None:
@@ -64,6 +207,65 @@ class NotificationService:
             .first()
         )
         return token_entry.token if token_entry else None
+
+    @staticmethod
+    def get_users_fcm_tokens(db: Session, user_ids: List[int]) -> Dict[int, str]:
+        """Latest FCM token for each of the given users, in one query"""
+        if not user_ids:
+            return {}
+        rows = (
+            db.query(DeviceToken.user_id, DeviceToken.token)
+            .filter(DeviceToken.user_id.in_(set(user_ids)))
+            .order_by(DeviceToken.user_id, DeviceToken.created_at.desc())
+            .distinct(DeviceToken.user_id)
+            .all()
+        )
+        return {user_id: token for user_id, token in rows}
+
+    @staticmethod
+    def prune_device_tokens(tokens: List[str]) -> int:
+        """Delete device tokens FCM reported as UNREGISTERED."""
+        db = SessionLocal()
+        try:
+            deleted = (
+                db.query(DeviceToken)
+                .filter(DeviceToken.token.in_(tokens))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+        finally:
+            db.close()
+        logger.info("Pruned %d unregistered device tokens", deleted)
+        return deleted
+
+    @staticmethod
+    async def create_notifications_bulk(db: Session, notifications: List[NotificationCreate]) -> int:
+        """
+        Insert many notifications in one flush, then push them with one token lookup
+        and concurrent sends. Returns the number of notifications created.
+        """
+        if not notifications:
+            return 0
+        db.add_all([
+            Notification(
+                user_id=n.user_id,
+                user_type=n.user_type,
+                title=n.title,
+                message=n.message,
+                type=n.type
+            )
+            for n in notifications
+        ])
+        for user_key in {f"{n.user_type}:{n.user_id}" for n in notifications}:
+            invalidation.publish_after_commit(db, invalidation.NOTIFICATION, user_key)
+        tokens = NotificationService.get_users_fcm_tokens(db, [n.user_id for n in notifications])
+        # Committing returns the connection to the pool before the (possibly retried) pushes
+        db.commit()
+
+        await NotificationService.send_push_notifications([
+            (tokens[n.user_id], n.title, n.message) for n in notifications if n.user_id in tokens
+        ])
+        return len(notifications)
     
     @staticmethod
     async def create_notification(db: Session, notification: NotificationCreate) -> Notification:
@@ -76,10 +278,17 @@ class NotificationService:
             type=notification.type  # must match the Enum
         )
         db.add(db_notification)
+        invalidation.publish_after_commit(
+            db, invalidation.NOTIFICATION, f"{notification.user_type}:{notification.user_id}"
+        )
+        # Retrieve the user’s FCM token from DB
+        token = NotificationService.get_user_fcm_token(db, notification.user_id)
         db.commit()
         db.refresh(db_notification)
-        # Retrieve the user’s FCM token from DB
-        token = NotificationService.get_user_fcm_token(db, notification.user_id)  # you must implement this
+        # Don't hold a pooled connection while waiting on FCM: with more sends in flight
+        # than the pool size, the next checkout would block the event loop for good.
+        db.expunge(db_notification)
+        db.commit()
 
         if token:
             await NotificationService.send_push_notification(token, notification.title, notification.message)
@@ -88,36 +297,20 @@ class NotificationService:
     @staticmethod
     def get_user_notifications(
         db: Session, user_id: int, user_type: str, 
-        skip: int = 0, limit: int = 20
+        skip: int = 0, limit: int = 20, since: Optional[datetime] = None
     ) -> Tuple[List[Notification], int, int]:
-        """Get notifications for a specific user with pagination"""
+        """Get notifications for a specific user with pagination (recent partitions only by default)"""
+        params = {"user_id": user_id, "user_type": user_type, "since": since or _inbox_cutoff()}
         # Query for notifications
-        notifications = (
-            db.query(Notification)
-            .filter(Notification.user_id == user_id)
-            .filter(Notification.user_type == user_type)
-            .order_by(Notification.sent_at.desc())
-            .offset(skip)
-            .limit(limit)
-            .all()
-        )
+        notifications = db.execute(
+            statements.NOTIFICATIONS_FOR_USER, {**params, "skip": skip, "limit": limit}
+        ).scalars().all()
         
         # Get total count
-        total_count = (
-            db.query(func.count(Notification.id))
-            .filter(Notification.user_id == user_id)
-            .filter(Notification.user_type == user_type)
-            .scalar()
-        )
+        total_count = db.execute(statements.NOTIFICATION_COUNT_FOR_USER, params).scalar()
         
         # Get unread count
-        unread_count = (
-            db.query(func.count(Notification.id))
-            .filter(Notification.user_id == user_id)
-            .filter(Notification.user_type == user_type)
-            .filter(Notification.is_read == False)
-            .scalar()
-        )
+        unread_count = db.execute(statements.UNREAD_NOTIFICATION_COUNT_FOR_USER, params).scalar()
 
 
         
@@ -130,32 +323,43 @@ class NotificationService:
         notification = db.query(Notification).filter(Notification.id == notification_id).first()
         if notification:
             notification.is_read = True
+            invalidation.publish_after_commit(
+                db, invalidation.NOTIFICATION, f"{notification.user_type}:{notification.user_id}"
+            )
             db.commit()
             db.refresh(notification)
         
         return notification
     
     @staticmethod
-    def mark_all_notifications_as_read(db: Session, user_id: int, user_type: str) -> int:
-        """Mark all notifications for a user as read and return count of updated records"""
-        result = (
+    def mark_all_notifications_as_read(
+        db: Session, user_id: int, user_type: str, since: Optional[datetime] = None
+    ) -> int:
+        """Mark all notifications for a user (or those sent since `since`) as read and return count of updated records"""
+        query = (
             db.query(Notification)
             .filter(Notification.user_id == user_id)
             .filter(Notification.user_type == user_type)
             .filter(Notification.is_read == False)
-            .update({"is_read": True})
         )
+        # Unbounded by default: ix_notifications_unread only holds unread rows in every partition
+        if since is not None:
+            query = query.filter(Notification.sent_at >= since)
+        result = query.update({"is_read": True}, synchronize_session=False)
+        invalidation.publish_after_commit(db, invalidation.NOTIFICATION, f"{user_type}:{user_id}")
         db.commit()
         return result
     
     @staticmethod
     async def delete_notification(db: Session, notification_id: int):
         notification = db.query(Notification).filter(Notification.id == notification_id).first()
+        token = NotificationService.get_user_fcm_token(db, notification.user_id) if notification else None
         if notification:
             db.delete(notification)
-            db.commit()
-        
-        token = NotificationService.get_user_fcm_token(db, notification.user_id)  # you must implement this
+            invalidation.publish_after_commit(
+                db, invalidation.NOTIFICATION, f"{notification.user_type}:{notification.user_id}"
+            )
+        db.commit()
 
         if token:
             await NotificationService.send_push_notification(token, "Notification deleted", "You just deleted a notification")
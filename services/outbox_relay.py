@@ -0,0 +1,248 @@
+# services/outbox_relay.py
+"""
+Outbox relay: drains committed OutboxEvents into notifications and pushes.
+
+Each batch is claimed with SELECT ... FOR UPDATE SKIP LOCKED, so several
+relays (one per worker) can run side by side. The claim runs in a worker
+thread and, in one transaction, inserts the notifications, marks the events
+processed and leases their pushes (next_push_at). Pushes are sent only after
+that commit, so no row lock or pooled connection is held while FCM answers.
+
+An event's pushes are settled (next_push_at cleared) once each one was
+accepted or its device token turned out to be gone. Otherwise the event is
+leased again after a backoff, and so is one whose relay died mid-send, once
+OUTBOX_PUSH_LEASE_SECONDS have passed: delivery is at-least-once, and a push
+can be repeated but not lost until it failed OUTBOX_MAX_ATTEMPTS times. An
+event whose handler keeps failing is given up after OUTBOX_MAX_ATTEMPTS
+attempts.
+
+Runs inside the API when OUTBOX_RELAY_ENABLED=1 (the default), or standalone:
+
+    python -m services.outbox_relay
+"""
+import asyncio
+import logging
+import time
+from datetime import datetime, timedelta
+from typing import Dict, List, Optional, Tuple
+
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import NotificationCreate
+from core import config, invalidation
+from db.models.appointment_models import Notification, OutboxEvent
+from db.session import SessionLocal
+from services.notification_service import NotificationService
+from services.outbox_service import NOTIFICATION_HANDLERS
+
+logger = logging.getLogger(__name__)
+
+_PURGE_INTERVAL_SECONDS = 3600
+# Push outcomes that need no retry: delivered, or the device token was pruned
+_SETTLED = ("success", "unregistered")
+
+# (event id, [(token, title, body), ...]) for each event whose pushes were leased
+PushBatch = List[Tuple[int, List[Tuple[str, str, str]]]]
+
+
+class OutboxRelay:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = config.OUTBOX_BATCH_SIZE,
+        poll_interval: float = config.OUTBOX_POLL_SECONDS,
+        max_attempts: int = config.OUTBOX_MAX_ATTEMPTS,
+        retention: timedelta = timedelta(days=config.OUTBOX_RETENTION_DAYS),
+        push_lease: float = config.OUTBOX_PUSH_LEASE_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.max_attempts = max_attempts
+        self.retention = retention
+        self.push_lease = push_lease
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+        # Status changes publish APPOINTMENT invalidations after commit; use them to wake up early.
+        invalidation.subscribe(invalidation.APPOINTMENT, self._on_change)
+
+    def _on_change(self, topic: str, key: invalidation.Key) -> None:
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _build_notifications(self, events: List[OutboxEvent]) -> List[Tuple[OutboxEvent, List[NotificationCreate]]]:
+        built = []
+        for event in events:
+            handler = NOTIFICATION_HANDLERS.get(event.event_type)
+            try:
+                notifications = handler(event.payload) if handler else []
+            except Exception as exc:
+                event.attempts += 1
+                event.last_error = repr(exc)[:1000]
+                if event.attempts >= self.max_attempts:
+                    logger.error("Giving up on outbox event %s after %d attempts", event.id, event.attempts)
+                    event.processed_at = datetime.now()
+                continue
+            built.append((event, notifications))
+        return built
+
+    def claim_batch(self) -> Tuple[int, PushBatch]:
+        """
+        Turn one batch of new events into notifications and lease the pushes of
+        those and of events due for a push retry; returns (events claimed, pushes).
+        """
+        db: Session = self.session_factory()
+        try:
+            now = datetime.now()
+            events = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.processed_at.is_(None))
+                .order_by(OutboxEvent.id)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            built = self._build_notifications(events)
+            notifications = [n for _, ns in built for n in ns]
+            db.add_all([
+                Notification(user_id=n.user_id, user_type=n.user_type, title=n.title, message=n.message, type=n.type)
+                for n in notifications
+            ])
+            for user_key in {f"{n.user_type}:{n.user_id}" for n in notifications}:
+                invalidation.publish_after_commit(db, invalidation.NOTIFICATION, user_key)
+            for event, _ in built:
+                event.processed_at = now
+
+            retries = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.next_push_at <= now)
+                .order_by(OutboxEvent.next_push_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+                .all()
+            )
+            # Handlers are pure functions of the payload, so a retry rebuilds the same pushes
+            pending = built + [(event, NOTIFICATION_HANDLERS[event.event_type](event.payload)) for event in retries]
+            tokens = NotificationService.get_users_fcm_tokens(db, [n.user_id for _, ns in pending for n in ns])
+
+            pushes = []
+            lease_until = now + timedelta(seconds=self.push_lease)
+            for event, ns in pending:
+                messages = [(tokens[n.user_id], n.title, n.message) for n in ns if n.user_id in tokens]
+                if messages:
+                    event.push_attempts += 1
+                    event.next_push_at = lease_until
+                    pushes.append((event.id, messages))
+                else:
+                    event.next_push_at = None
+            db.commit()
+            return len(events) + len(retries), pushes
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def settle_pushes(self, results: Dict[int, Optional[str]]) -> None:
+        """Record push results by event id: None when settled, else the error to retry after a backoff."""
+        db: Session = self.session_factory()
+        try:
+            now = datetime.now()
+            for event in db.query(OutboxEvent).filter(OutboxEvent.id.in_(list(results))).all():
+                error = results[event.id]
+                if error is None:
+                    event.next_push_at = None
+                    continue
+                event.last_error = error
+                if event.push_attempts >= self.max_attempts:
+                    logger.error("Giving up on pushes of outbox event %s after %d attempts", event.id, event.push_attempts)
+                    event.next_push_at = None
+                else:
+                    backoff = min(self.poll_interval * 2 ** event.push_attempts, self.push_lease)
+                    event.next_push_at = now + timedelta(seconds=backoff)
+            db.commit()
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    async def drain_once(self) -> int:
+        """Process one batch; returns the number of events claimed."""
+        claimed, pushes = await asyncio.to_thread(self.claim_batch)
+        if not pushes:
+            return claimed
+
+        outcomes = await NotificationService.push_outcomes([m for _, messages in pushes for m in messages])
+        results: Dict[int, Optional[str]] = {}
+        position = 0
+        for event_id, messages in pushes:
+            failed = [o for o in outcomes[position:position + len(messages)] if o not in _SETTLED]
+            position += len(messages)
+            results[event_id] = (
+                f"{len(failed)} of {len(messages)} pushes failed ({', '.join(sorted(set(failed)))})" if failed else None
+            )
+        await asyncio.to_thread(self.settle_pushes, results)
+        return claimed
+
+    def purge_processed(self) -> int:
+        db: Session = self.session_factory()
+        try:
+            deleted = (
+                db.query(OutboxEvent)
+                .filter(OutboxEvent.processed_at < datetime.now() - self.retention)
+                .filter(OutboxEvent.next_push_at.is_(None))
+                .delete(synchronize_session=False)
+            )
+            db.commit()
+            return deleted
+        finally:
+            db.close()
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        next_purge = time.monotonic() + _PURGE_INTERVAL_SECONDS
+        backoff = self.poll_interval
+
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                claimed = await self.drain_once()
+                backoff = self.poll_interval
+                if time.monotonic() >= next_purge:
+                    await asyncio.to_thread(self.purge_processed)
+                    next_purge = time.monotonic() + _PURGE_INTERVAL_SECONDS
+            except Exception:
+                logger.exception("Outbox relay batch failed")
+                claimed = 0
+                backoff = min(backoff * 2, 30.0)
+            if claimed >= self.batch_size:
+                continue  # there is probably more waiting
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    relay = OutboxRelay()
+    invalidation.bus.start()
+    try:
+        asyncio.run(relay.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        invalidation.bus.stop()
+
+
+if __name__ == "__main__":
+    main()
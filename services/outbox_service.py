@@ -0,0 +1,78 @@
+# services/outbox_service.py
+"""
+Transactional outbox.
+
+add_event() stages an OutboxEvent on the caller's session so it commits (or
+rolls back) together with the change it describes. services/outbox_relay.py
+turns committed events into notifications using the handlers registered in
+NOTIFICATION_HANDLERS.
+"""
+from typing import Any, Callable, Dict, List
+
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import NotificationCreate
+from db.models.appointment_models import NotificationType, OutboxEvent
+
+APPOINTMENT_CONFIRMED = "appointment.confirmed"
+APPOINTMENT_DECLINED = "appointment.declined"
+PRESCRIPTION_EXPIRING = "prescription.expiring"
+PRESCRIPTION_EXPIRED = "prescription.expired"
+WAITLIST_OFFERED = "waitlist.offered"
+
+
+def add_event(db: Session, event_type: str, aggregate_id: int, payload: Dict[str, Any]) -> OutboxEvent:
+    event = OutboxEvent(event_type=event_type, aggregate_id=aggregate_id, payload=payload)
+    db.add(event)
+    return event
+
+
+def _appointment_status_notification(payload: Dict[str, Any]) -> List[NotificationCreate]:
+    if payload.get("patient_id") is None:
+        return []
+    accepted = payload["status"] == "confirmed"
+    when = f" on {payload['date']} at {payload['start_time'][:5]}" if payload.get("date") else ""
+    return [NotificationCreate(
+        user_id=payload["patient_id"],
+        user_type="patient",
+        title="Appointment accepted" if accepted else "Appointment declined",
+        message=f"Your appointment{when} has been {'accepted' if accepted else 'declined'} by the doctor.",
+        type=(NotificationType.ACCEPTED if accepted else NotificationType.DECLINED).value,
+    )]
+
+
+def _prescription_expiry_notification(payload: Dict[str, Any]) -> List[NotificationCreate]:
+    expired = payload["expired"]
+    expires_on = payload["expires_at"][:10]
+    return [NotificationCreate(
+        user_id=payload["patient_id"],
+        user_type="patient",
+        title="Prescription expired" if expired else "Prescription expiring soon",
+        message=(
+            f"Your prescription expired on {expires_on}." if expired
+            else f"Your prescription expires on {expires_on}. Contact your doctor if you need a renewal."
+        ),
+        type=NotificationType.PRESCRIPTION.value,
+    )]
+
+
+def _waitlist_offer_notification(payload: Dict[str, Any]) -> List[NotificationCreate]:
+    return [NotificationCreate(
+        user_id=payload["patient_id"],
+        user_type="patient",
+        title="A slot opened up",
+        message=(
+            f"A slot on {payload['date']} at {payload['start_time'][:5]} is held for you "
+            f"until {payload['expires_at'][11:16]}. Accept it in the app to book it."
+        ),
+        type=NotificationType.WAITLIST.value,
+    )]
+
+
+NOTIFICATION_HANDLERS: Dict[str, Callable[[Dict[str, Any]], List[NotificationCreate]]] = {
+    APPOINTMENT_CONFIRMED: _appointment_status_notification,
+    APPOINTMENT_DECLINED: _appointment_status_notification,
+    PRESCRIPTION_EXPIRING: _prescription_expiry_notification,
+    PRESCRIPTION_EXPIRED: _prescription_expiry_notification,
+    WAITLIST_OFFERED: _waitlist_offer_notification,
+}
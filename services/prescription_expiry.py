@@ -0,0 +1,183 @@
+# services/prescription_expiry.py
+"""
+Prescription expiry sweeper.
+
+Every PRESCRIPTION_EXPIRY_INTERVAL_SECONDS it:
+
+- flips active prescriptions whose expires_at has passed to "expired", in
+  batches of PRESCRIPTION_EXPIRY_BATCH_SIZE (one UPDATE ... RETURNING per
+  batch, reading the head of the partial index ix_prescriptions_active_expires);
+- announces prescriptions expiring within PRESCRIPTION_EXPIRY_NOTICE_DAYS.
+
+Both steps write outbox events in the same transaction (one multi-row
+INSERT per batch); the outbox relay turns them into PRESCRIPTION
+notifications and pushes. A notice is sent once: prescriptions that already
+have a prescription.expiring event are skipped. That event outlives the
+notice window because config refuses to load unless
+PRESCRIPTION_EXPIRY_NOTICE_DAYS < OUTBOX_RETENTION_DAYS (the relay purges
+processed events after that, and never while their pushes are pending).
+Rows are claimed with FOR UPDATE SKIP LOCKED, so several sweepers can run
+side by side.
+
+Runs inside the API when PRESCRIPTION_EXPIRY_ENABLED=1, or standalone:
+
+    python -m services.prescription_expiry
+"""
+import asyncio
+import logging
+from datetime import datetime, timedelta
+from typing import Any, Dict, List
+
+from sqlalchemy import exists, insert, select, update
+from sqlalchemy.orm import Session
+
+from core import config
+from db import tables
+from db.models.appointment_models import OutboxEvent
+from db.session import SessionLocal
+from services.outbox_service import PRESCRIPTION_EXPIRED, PRESCRIPTION_EXPIRING
+
+logger = logging.getLogger(__name__)
+
+
+def _events(event_type: str, rows, expired: bool) -> List[Dict[str, Any]]:
+    return [
+        {
+            "event_type": event_type,
+            "aggregate_id": prescription_id,
+            "payload": {
+                "prescription_id": prescription_id,
+                "patient_id": patient_id,
+                "expires_at": expires_at.isoformat(),
+                "expired": expired,
+            },
+        }
+        for prescription_id, patient_id, expires_at in rows
+    ]
+
+
+class PrescriptionExpirySweeper:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = config.PRESCRIPTION_EXPIRY_BATCH_SIZE,
+        interval: float = config.PRESCRIPTION_EXPIRY_INTERVAL_SECONDS,
+        notice: timedelta = timedelta(days=config.PRESCRIPTION_EXPIRY_NOTICE_DAYS),
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self.notice = notice
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+
+    def expire_batch(self) -> int:
+        """Expire one batch of overdue prescriptions; returns the number expired."""
+        prescriptions = tables.prescriptions
+        db: Session = self.session_factory()
+        try:
+            overdue = (
+                select(prescriptions.c.id)
+                .where(prescriptions.c.status == "active", prescriptions.c.expires_at <= datetime.now())
+                .order_by(prescriptions.c.expires_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            )
+            rows = db.execute(
+                update(prescriptions)
+                .where(prescriptions.c.id.in_(overdue))
+                .values(status="expired")
+                .returning(prescriptions.c.id, prescriptions.c.patient_id, prescriptions.c.expires_at)
+            ).all()
+            if rows:
+                db.execute(insert(OutboxEvent), _events(PRESCRIPTION_EXPIRED, rows, expired=True))
+            db.commit()
+            return len(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def notify_batch(self) -> int:
+        """Announce one batch of soon-to-expire prescriptions; returns the number announced."""
+        prescriptions = tables.prescriptions
+        now = datetime.now()
+        db: Session = self.session_factory()
+        try:
+            announced = exists().where(
+                OutboxEvent.event_type == PRESCRIPTION_EXPIRING,
+                OutboxEvent.aggregate_id == prescriptions.c.id,
+            )
+            rows = db.execute(
+                select(prescriptions.c.id, prescriptions.c.patient_id, prescriptions.c.expires_at)
+                .where(
+                    prescriptions.c.status == "active",
+                    prescriptions.c.expires_at > now,
+                    prescriptions.c.expires_at <= now + self.notice,
+                    ~announced,
+                )
+                .order_by(prescriptions.c.expires_at)
+                .limit(self.batch_size)
+                .with_for_update(of=prescriptions, skip_locked=True)
+            ).all()
+            if rows:
+                db.execute(insert(OutboxEvent), _events(PRESCRIPTION_EXPIRING, rows, expired=False))
+            db.commit()
+            return len(rows)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def sweep_once(self) -> int:
+        """Run both steps until they run out of work; returns the number of prescriptions handled."""
+        handled = 0
+        for step in (self.expire_batch, self.notify_batch):
+            while not self._stopping:
+                count = step()
+                handled += count
+                if count < self.batch_size:
+                    break
+        return handled
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        backoff = self.interval
+
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                handled = await asyncio.to_thread(self.sweep_once)
+                if handled:
+                    logger.info("Prescription expiry sweep handled %d prescriptions", handled)
+                backoff = self.interval
+            except Exception:
+                logger.exception("Prescription expiry sweep failed")
+                backoff = min(backoff * 2, 30 * 60.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    sweeper = PrescriptionExpirySweeper()
+    try:
+        asyncio.run(sweeper.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
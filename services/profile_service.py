@@ -3,6 +3,7 @@ from sqlalchemy.orm import Session
 from fastapi import HTTPException, status
 from db.models.models import Doctor, Patient, WorkingHours
 from api.schemas.schemas import PatientUpdate, DoctorUpdate
+from core import invalidation
 
 def update_doctor_profile(db: Session, doctor_id: int, doctor_update_data: DoctorUpdate) -> Doctor:
     doctor = db.query(Doctor).filter(Doctor.id == doctor_id).first()
@@ -44,6 +45,7 @@ def update_doctor_profile(db: Session, doctor_id: int, doctor_update_data: Docto
                     end_time=wh["end_time"]
                 ))
 
+    invalidation.publish_after_commit(db, invalidation.DOCTOR, doctor_id)
     db.commit()
     db.refresh(doctor)
     return doctor
@@ -0,0 +1,250 @@
+# services/reminder_scheduler.py
+"""
+UPCOMING appointment reminders.
+
+Confirmed appointments starting within the next REMINDER_HORIZON_HOURS are kept
+in a min-heap keyed by reminder time (slot start - REMINDER_LEAD_MINUTES). The
+window is extended incrementally: each refill only loads appointments starting
+after the previous high-water mark, so the appointments table is never
+rescanned. Confirm/decline/delete arrive through the invalidation bus
+(APPOINTMENT topic); the changed ids are re-read by primary key on the next
+tick and their reminders added, moved or dropped. Dropped entries stay in the
+heap and are skipped when popped.
+
+Run it in exactly one process, either in the API (REMINDER_SCHEDULER_ENABLED=1)
+or on its own:
+
+    python -m services.reminder_scheduler
+"""
+import asyncio
+import heapq
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import NotificationCreate
+from core import config, invalidation
+from db.models.appointment_models import (
+    Appointment as AppointmentModel,
+    NotificationType,
+    TimeSlot as TimeSlotModel
+)
+from db.session import SessionLocal
+from services.notification_service import NotificationService
+
+logger = logging.getLogger(__name__)
+
+_slot_start = TimeSlotModel.date + TimeSlotModel.start_time
+
+
+class _Reminder(NamedTuple):
+    remind_at: datetime
+    patient_id: int
+    starts_at: datetime
+
+
+class ReminderScheduler:
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        lead: timedelta = timedelta(minutes=config.REMINDER_LEAD_MINUTES),
+        horizon: timedelta = timedelta(hours=config.REMINDER_HORIZON_HOURS),
+        batch_size: int = config.REMINDER_BATCH_SIZE,
+        refill_interval: float = config.REMINDER_REFILL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.lead = lead
+        self.horizon = horizon
+        self.batch_size = batch_size
+        self.refill_interval = refill_interval
+
+        self._heap: List[Tuple[datetime, int]] = []
+        self._scheduled: Dict[int, _Reminder] = {}
+        # Appointments starting before this instant have been loaded
+        self._loaded_until: Optional[datetime] = None
+
+        self._changed: Set[int] = set()
+        self._reload = False
+        self._changed_lock = threading.Lock()
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._wakeup: Optional[asyncio.Event] = None
+        self._stopping = False
+
+        invalidation.subscribe(invalidation.APPOINTMENT, self._on_appointment_changed)
+
+    # --- change feed (called from the bus, any thread) ---
+
+    def _on_appointment_changed(self, topic: str, key: invalidation.Key) -> None:
+        with self._changed_lock:
+            if key == invalidation.ALL_KEYS:
+                self._reload = True
+            else:
+                self._changed.add(int(key))
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+    def _take_changes(self) -> Tuple[bool, Set[int]]:
+        with self._changed_lock:
+            reload, changed = self._reload, self._changed
+            self._reload, self._changed = False, set()
+        return reload, changed
+
+    # --- heap maintenance ---
+
+    def _schedule(self, appointment_id: int, patient_id: int, starts_at: datetime) -> None:
+        reminder = _Reminder(starts_at - self.lead, patient_id, starts_at)
+        if self._scheduled.get(appointment_id) == reminder:
+            return
+        self._scheduled[appointment_id] = reminder
+        heapq.heappush(self._heap, (reminder.remind_at, appointment_id))
+
+    def _load_window(self, start: datetime, end: datetime) -> int:
+        """Load confirmed appointments whose slot starts in (start, end]."""
+        db: Session = self.session_factory()
+        try:
+            rows = (
+                db.query(AppointmentModel.id, AppointmentModel.patient_id, TimeSlotModel.date, TimeSlotModel.start_time)
+                .join(TimeSlotModel, AppointmentModel.time_slot_id == TimeSlotModel.id)
+                .filter(
+                    AppointmentModel.status == "confirmed",
+                    TimeSlotModel.date.between(start.date(), end.date()),
+                    _slot_start > start,
+                    _slot_start <= end,
+                )
+                .all()
+            )
+        finally:
+            db.close()
+        for appointment_id, patient_id, slot_date, start_time in rows:
+            self._schedule(appointment_id, patient_id, datetime.combine(slot_date, start_time))
+        return len(rows)
+
+    def _refill(self, now: datetime) -> None:
+        start = self._loaded_until or now + self.lead
+        end = now + self.lead + self.horizon
+        if end > start:
+            loaded = self._load_window(start, end)
+            self._loaded_until = end
+            if loaded:
+                logger.info("Loaded %d reminders for appointments up to %s", loaded, end)
+
+    def _reset(self, now: datetime) -> None:
+        self._heap.clear()
+        self._scheduled.clear()
+        self._loaded_until = None
+        self._refill(now)
+
+    def _apply_changes(self, appointment_ids: Iterable[int], now: datetime) -> None:
+        ids = list(appointment_ids)
+        db: Session = self.session_factory()
+        try:
+            rows = (
+                db.query(
+                    AppointmentModel.id, AppointmentModel.patient_id, AppointmentModel.status,
+                    TimeSlotModel.date, TimeSlotModel.start_time
+                )
+                .join(TimeSlotModel, AppointmentModel.time_slot_id == TimeSlotModel.id)
+                .filter(AppointmentModel.id.in_(ids))
+                .all()
+            )
+        finally:
+            db.close()
+        for appointment_id in ids:
+            self._scheduled.pop(appointment_id, None)
+        for appointment_id, patient_id, status, slot_date, start_time in rows:
+            starts_at = datetime.combine(slot_date, start_time)
+            if status == "confirmed" and self._loaded_until and now < starts_at <= self._loaded_until:
+                self._schedule(appointment_id, patient_id, starts_at)
+
+    def _pop_due(self, now: datetime) -> List[Tuple[int, _Reminder]]:
+        due = []
+        while self._heap and self._heap[0][0] <= now and len(due) < self.batch_size:
+            remind_at, appointment_id = heapq.heappop(self._heap)
+            reminder = self._scheduled.get(appointment_id)
+            if reminder is None or reminder.remind_at != remind_at:
+                continue  # cancelled or rescheduled since it was pushed
+            del self._scheduled[appointment_id]
+            due.append((appointment_id, reminder))
+        return due
+
+    # --- sending ---
+
+    async def _send(self, due: List[Tuple[int, _Reminder]]) -> None:
+        notifications = [
+            NotificationCreate(
+                user_id=reminder.patient_id,
+                user_type="patient",
+                title="Upcoming appointment",
+                message=f"Reminder: you have an appointment on {reminder.starts_at:%Y-%m-%d} at {reminder.starts_at:%H:%M}.",
+                type=NotificationType.UPCOMING.value,
+            )
+            for _, reminder in due
+        ]
+        db: Session = self.session_factory()
+        try:
+            await NotificationService.create_notifications_bulk(db, notifications)
+        except Exception:
+            db.rollback()
+            logger.exception("Failed to send %d appointment reminders", len(notifications))
+        finally:
+            db.close()
+
+    # --- main loop ---
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        next_refill = 0.0
+
+        while not self._stopping:
+            self._wakeup.clear()
+            now = datetime.now()
+            reload, changed = self._take_changes()
+            if reload:
+                await asyncio.to_thread(self._reset, now)
+                next_refill = time.monotonic() + self.refill_interval
+            elif time.monotonic() >= next_refill:
+                await asyncio.to_thread(self._refill, now)
+                next_refill = time.monotonic() + self.refill_interval
+            if changed:
+                await asyncio.to_thread(self._apply_changes, changed, now)
+
+            due = self._pop_due(now)
+            if due:
+                await self._send(due)
+                if len(due) == self.batch_size:
+                    continue  # more may be due already
+
+            timeout = next_refill - time.monotonic()
+            if self._heap:
+                timeout = min(timeout, (self._heap[0][0] - datetime.now()).total_seconds())
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=max(timeout, 0.0))
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    scheduler = ReminderScheduler()
+    invalidation.bus.start()
+    try:
+        asyncio.run(scheduler.run())
+    except KeyboardInterrupt:
+        pass
+    finally:
+        invalidation.bus.stop()
+
+
+if __name__ == "__main__":
+    main()
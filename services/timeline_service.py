@@ -0,0 +1,180 @@
+# services/timeline_service.py
+"""
+A patient's medical history (appointments and prescriptions with their
+medications) in one list, newest first.
+
+Each page is one UNION ALL query returning only (kind, id, occurred_at),
+and each branch reads its own per-patient index range. The prescription
+branch walks ix_prescriptions_patient_created in order and stops after
+`limit + 1` rows. The appointment branch cannot: its sort key is the slot's
+date + start_time, which no index covers, so it reads all of the patient's
+appointments (ix_appointments_patient_id), joins their slots and sorts them
+before taking `limit + 1`. That is bounded by one patient's appointment
+count, not by the table. The page's appointments, prescriptions and
+medications are then loaded with one IN query each.
+
+Pages are keyset-paginated on (occurred_at, kind, id); the cursor is opaque
+to clients and stays stable while new entries are added.
+"""
+import base64
+import json
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import literal, select, tuple_, union_all
+from sqlalchemy.orm import Session
+
+from db import tables
+from db.models.appointment_models import (
+    Appointment as AppointmentModel,
+    Doctor as DoctorModel,
+    Patient as PatientModel,
+    TimeSlot as TimeSlotModel
+)
+from services import appointment_service
+
+APPOINTMENT = "appointment"
+PRESCRIPTION = "prescription"
+
+Cursor = Tuple[datetime, str, int]
+
+
+def _encode_cursor(occurred_at: datetime, kind: str, item_id: int) -> str:
+    raw = json.dumps([occurred_at.isoformat(), kind, item_id], separators=(",", ":"))
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+
+def _decode_cursor(cursor: str) -> Cursor:
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        occurred_at, kind, item_id = json.loads(raw)
+        return datetime.fromisoformat(occurred_at), str(kind), int(item_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def _before(kind: str, occurred_at, item_id, cursor: Optional[Cursor]):
+    """Keyset condition (occurred_at, kind, id) < cursor, written per branch so each can use its index."""
+    if cursor is None:
+        return None
+    cursor_at, cursor_kind, cursor_id = cursor
+    if kind < cursor_kind:
+        return occurred_at <= cursor_at
+    if kind > cursor_kind:
+        return occurred_at < cursor_at
+    return tuple_(occurred_at, item_id) < tuple_(literal(cursor_at), literal(cursor_id))
+
+
+def _branch(kind: str, item_id, occurred_at, where, cursor: Optional[Cursor], limit: int):
+    query = (
+        select(literal(kind).label("kind"), item_id.label("id"), occurred_at.label("occurred_at"))
+        .where(*where)
+        .order_by(occurred_at.desc(), item_id.desc())
+        .limit(limit)
+    )
+    keyset = _before(kind, occurred_at, item_id, cursor)
+    if keyset is not None:
+        query = query.where(keyset)
+    return select(query.subquery())
+
+
+def _page_keys(db: Session, patient_id: int, cursor: Optional[Cursor], limit: int) -> List[Tuple[str, int, datetime]]:
+    prescriptions = tables.prescriptions
+    # Computed from the joined slot: this branch sorts all of the patient's appointments (see module docstring)
+    appointment_at = TimeSlotModel.date + TimeSlotModel.start_time
+    appointment_ids = _branch(
+        APPOINTMENT, AppointmentModel.id, appointment_at,
+        [AppointmentModel.patient_id == patient_id, AppointmentModel.time_slot_id == TimeSlotModel.id],
+        cursor, limit,
+    )
+    prescription_ids = _branch(
+        PRESCRIPTION, prescriptions.c.id, prescriptions.c.created_at,
+        [prescriptions.c.patient_id == patient_id, prescriptions.c.created_at.isnot(None)],
+        cursor, limit,
+    )
+    timeline = union_all(appointment_ids, prescription_ids).subquery()
+    query = (
+        select(timeline.c.kind, timeline.c.id, timeline.c.occurred_at)
+        .order_by(timeline.c.occurred_at.desc(), timeline.c.kind.desc(), timeline.c.id.desc())
+        .limit(limit)
+    )
+    return [tuple(row) for row in db.execute(query)]
+
+
+def _load_prescriptions(db: Session, prescription_ids: List[int]) -> Dict[int, Dict[str, Any]]:
+    if not prescription_ids:
+        return {}
+    prescriptions, medications = tables.prescriptions, tables.medications
+    rows = db.execute(
+        select(
+            prescriptions.c.id, prescriptions.c.doctor_id, DoctorModel.first_name, DoctorModel.last_name,
+            prescriptions.c.instructions, prescriptions.c.created_at, prescriptions.c.expires_at,
+            prescriptions.c.status,
+        )
+        .outerjoin(DoctorModel, DoctorModel.id == prescriptions.c.doctor_id)
+        .where(prescriptions.c.id.in_(prescription_ids))
+    )
+    found = {
+        prescription_id: {
+            "prescription_id": prescription_id,
+            "doctor_id": doctor_id,
+            "doctor_first_name": first_name,
+            "doctor_last_name": last_name,
+            "instructions": instructions,
+            "created_at": created_at,
+            "expires_at": expires_at,
+            "status": status,
+            "medications": [],
+        }
+        for prescription_id, doctor_id, first_name, last_name, instructions, created_at, expires_at, status in rows
+    }
+    medication_rows = db.execute(
+        select(
+            medications.c.id, medications.c.prescription_id, medications.c.name,
+            medications.c.dosage, medications.c.frequency, medications.c.duration,
+        )
+        .where(medications.c.prescription_id.in_(prescription_ids))
+        .order_by(medications.c.prescription_id, medications.c.id)
+    )
+    for medication_id, prescription_id, name, dosage, frequency, duration in medication_rows:
+        found[prescription_id]["medications"].append({
+            "medication_id": medication_id,
+            "name": name,
+            "dosage": dosage,
+            "frequency": frequency,
+            "duration": duration,
+        })
+    return found
+
+
+def get_patient_timeline(db: Session, patient_id: int, limit: int = 20, cursor: Optional[str] = None) -> Dict[str, Any]:
+    if db.execute(select(PatientModel.id).where(PatientModel.id == patient_id)).first() is None:
+        raise HTTPException(status_code=404, detail=f"Patient with id {patient_id} not found")
+    after = _decode_cursor(cursor) if cursor else None
+
+    keys = _page_keys(db, patient_id, after, limit + 1)
+    has_more = len(keys) > limit
+    keys = keys[:limit]
+
+    appointment_ids = [item_id for kind, item_id, _ in keys if kind == APPOINTMENT]
+    appointments = (
+        appointment_service.get_detailed_appointments_by_ids(db, appointment_ids)["results"]
+        if appointment_ids else {}
+    )
+    prescriptions = _load_prescriptions(db, [item_id for kind, item_id, _ in keys if kind == PRESCRIPTION])
+
+    items = []
+    for kind, item_id, occurred_at in keys:
+        item = {"type": kind, "occurred_at": occurred_at}
+        if kind == APPOINTMENT:
+            item["appointment"] = appointments.get(item_id)
+        else:
+            item["prescription"] = prescriptions.get(item_id)
+        items.append(item)
+
+    next_cursor = None
+    if has_more:
+        kind, item_id, occurred_at = keys[-1]
+        next_cursor = _encode_cursor(occurred_at, kind, item_id)
+    return {"patient_id": patient_id, "items": items, "next_cursor": next_cursor}
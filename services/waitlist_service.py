@@ -0,0 +1,334 @@
+# services/waitlist_service.py
+"""
+Slot waitlist.
+
+Patients join a queue for a doctor on a day, optionally restricted to a time
+window. When a booked slot is freed (appointment deleted or declined),
+release_slot() offers it to the first waiting patient whose window contains
+the slot's start time instead of putting it back on the market: the slot is
+held ("held") and the patient has WAITLIST_HOLD_MINUTES to accept it. The
+offer is announced through the outbox, in the same transaction.
+
+The queues are the partial index ix_waitlist_queue on
+(doctor_id, date, created_at) over waiting entries: matching a slot is one
+O(log n) index descent to its (doctor, day) range, read in join order until
+the first window that fits, rather than a scan of the waitlist.
+Candidates are locked with FOR UPDATE SKIP LOCKED, so concurrent releases
+never offer two slots to the same entry.
+
+Declined or unanswered offers pass the slot on to the next patient; when
+nobody is waiting it becomes "available" again. Unanswered offers are swept
+by WaitlistOfferSweeper, inside the API unless WAITLIST_SWEEPER_ENABLED=0
+(on by default), or standalone:
+
+    python -m services.waitlist_service
+"""
+import asyncio
+import logging
+from datetime import date, datetime, time, timedelta
+from typing import List, Optional, Union
+
+from fastapi import HTTPException
+from fastapi.responses import JSONResponse
+from sqlalchemy import or_, select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from api.schemas.appointment_schemas import WaitlistEntrySchema
+from core import config, invalidation
+from db import statements
+from db.models.appointment_models import (
+    Appointment as AppointmentModel,
+    TimeSlot as TimeSlotModel,
+    WaitlistEntry
+)
+from db.session import SessionLocal
+from services import outbox_service
+from services.idempotency_service import IdempotentRequest
+
+logger = logging.getLogger(__name__)
+
+WAITING = "waiting"
+OFFERED = "offered"
+BOOKED = "booked"
+DECLINED = "declined"
+MISSED = "missed"
+CANCELLED = "cancelled"
+ACTIVE = (WAITING, OFFERED)
+
+Response = Union[WaitlistEntry, WaitlistEntrySchema, JSONResponse]
+
+
+def _next_in_queue(db: Session, slot: TimeSlotModel) -> Optional[WaitlistEntry]:
+    return db.execute(
+        select(WaitlistEntry)
+        .where(
+            WaitlistEntry.doctor_id == slot.doctor_id,
+            WaitlistEntry.date == slot.date,
+            WaitlistEntry.status == WAITING,
+            or_(WaitlistEntry.window_start.is_(None), WaitlistEntry.window_start <= slot.start_time),
+            or_(WaitlistEntry.window_end.is_(None), WaitlistEntry.window_end > slot.start_time),
+        )
+        .order_by(WaitlistEntry.created_at, WaitlistEntry.id)
+        .limit(1)
+        .with_for_update(skip_locked=True)
+    ).scalar_one_or_none()
+
+
+def release_slot(db: Session, slot: TimeSlotModel) -> Optional[WaitlistEntry]:
+    """
+    Offer a freed slot to the head of its waitlist, or make it available when
+    nobody is waiting. Runs in the caller's transaction; returns the entry offered.
+    """
+    invalidation.publish_after_commit(db, invalidation.SLOT, slot.doctor_id)
+    # A slot that has already started is not worth offering
+    starts_at = datetime.combine(slot.date, slot.start_time)
+    entry = _next_in_queue(db, slot) if starts_at > datetime.now() else None
+    if entry is None:
+        slot.status = "available"
+        return None
+
+    expires_at = datetime.now() + timedelta(minutes=config.WAITLIST_HOLD_MINUTES)
+    slot.status = "held"
+    entry.status = OFFERED
+    entry.offered_slot_id = slot.id
+    entry.offer_expires_at = expires_at
+    outbox_service.add_event(db, outbox_service.WAITLIST_OFFERED, entry.id, {
+        "entry_id": entry.id,
+        "patient_id": entry.patient_id,
+        "doctor_id": slot.doctor_id,
+        "time_slot_id": slot.id,
+        "date": slot.date.isoformat(),
+        "start_time": slot.start_time.isoformat(),
+        "expires_at": expires_at.isoformat(),
+    })
+    # Sessions don't autoflush: flush so the next match in this transaction skips this entry
+    db.flush()
+    return entry
+
+
+def _commit(db: Session, entry: WaitlistEntry, idem: Optional[IdempotentRequest], status_code: int = 200) -> Response:
+    """
+    Commit the entry's changes; with an IdempotentRequest the response is
+    stored in the same transaction, and a concurrent duplicate's is replayed.
+    """
+    if idem is None:
+        db.commit()
+        db.refresh(entry)
+        return entry
+    db.flush()
+    db.refresh(entry)
+    body = WaitlistEntrySchema.model_validate(entry)
+    idem.save(body, status_code=status_code)
+    return idem.commit() or body
+
+
+def join_waitlist(
+    db: Session,
+    patient_id: int,
+    doctor_id: int,
+    day: date,
+    window_start: Optional[time] = None,
+    window_end: Optional[time] = None,
+    idem: Optional[IdempotentRequest] = None,
+) -> Response:
+    if day < date.today():
+        raise HTTPException(status_code=400, detail="Cannot join the waitlist for a past day")
+    if window_start is not None and window_end is not None and window_start >= window_end:
+        raise HTTPException(status_code=400, detail="window_start must be before window_end")
+    if db.execute(statements.DOCTOR_EXISTS, {"doctor_id": doctor_id}).first() is None:
+        raise HTTPException(status_code=404, detail=f"Doctor with id {doctor_id} not found")
+
+    available = select(TimeSlotModel.id).where(
+        TimeSlotModel.doctor_id == doctor_id,
+        TimeSlotModel.date == day,
+        TimeSlotModel.status == "available",
+    )
+    if window_start is not None:
+        available = available.where(TimeSlotModel.start_time >= window_start)
+    if window_end is not None:
+        available = available.where(TimeSlotModel.start_time < window_end)
+    if db.execute(available.limit(1)).first() is not None:
+        raise HTTPException(status_code=409, detail="A matching slot is available; book it directly")
+
+    entry = WaitlistEntry(
+        patient_id=patient_id,
+        doctor_id=doctor_id,
+        date=day,
+        window_start=window_start,
+        window_end=window_end,
+        status=WAITING,
+    )
+    db.add(entry)
+    try:
+        db.flush()
+    except IntegrityError:
+        db.rollback()
+        # A concurrent retry with the same Idempotency-Key may have inserted the entry
+        replay = idem.replay_after_conflict() if idem is not None else None
+        if replay is not None:
+            return replay
+        raise HTTPException(status_code=409, detail="Already on the waitlist for this doctor and day")
+    return _commit(db, entry, idem, status_code=201)
+
+
+def get_patient_entries(db: Session, patient_id: int) -> List[WaitlistEntry]:
+    return db.execute(
+        select(WaitlistEntry)
+        .where(WaitlistEntry.patient_id == patient_id, WaitlistEntry.status.in_(ACTIVE))
+        .order_by(WaitlistEntry.date, WaitlistEntry.created_at)
+    ).scalars().all()
+
+
+def _locked_entry(db: Session, entry_id: int, patient_id: int) -> WaitlistEntry:
+    entry = db.execute(
+        select(WaitlistEntry).where(WaitlistEntry.id == entry_id).with_for_update()
+    ).scalar_one_or_none()
+    if entry is None or entry.patient_id != patient_id:
+        raise HTTPException(status_code=404, detail=f"Waitlist entry with id {entry_id} not found")
+    return entry
+
+
+def _offered_slot(db: Session, entry: WaitlistEntry) -> TimeSlotModel:
+    return db.execute(
+        select(TimeSlotModel).where(TimeSlotModel.id == entry.offered_slot_id).with_for_update()
+    ).scalar_one()
+
+
+def accept_offer(db: Session, entry_id: int, patient_id: int, idem: Optional[IdempotentRequest] = None) -> Response:
+    """Book the held slot for the patient it was offered to."""
+    entry = _locked_entry(db, entry_id, patient_id)
+    if entry.status != OFFERED or entry.offer_expires_at <= datetime.now():
+        # A concurrent retry with the same Idempotency-Key may have booked it while we waited for the lock
+        replay = idem.replay_after_conflict() if idem is not None else None
+        if replay is not None:
+            return replay
+        raise HTTPException(status_code=409, detail="No pending offer for this waitlist entry")
+    slot = _offered_slot(db, entry)
+
+    appointment = AppointmentModel(
+        patient_id=entry.patient_id, doctor_id=slot.doctor_id, time_slot_id=slot.id, status="pending"
+    )
+    db.add(appointment)
+    slot.status = "booked"
+    db.flush()
+    entry.status = BOOKED
+    entry.appointment_id = appointment.id
+    invalidation.publish_after_commit(db, invalidation.SLOT, slot.doctor_id)
+    invalidation.publish_after_commit(db, invalidation.DOCTOR_APPOINTMENTS, slot.doctor_id)
+    return _commit(db, entry, idem)
+
+
+def _pass_on(db: Session, entry: WaitlistEntry, status: str) -> None:
+    slot = _offered_slot(db, entry)
+    entry.status = status
+    entry.offer_expires_at = None
+    if slot.status == "held":
+        release_slot(db, slot)
+
+
+def decline_offer(db: Session, entry_id: int, patient_id: int) -> WaitlistEntry:
+    entry = _locked_entry(db, entry_id, patient_id)
+    if entry.status != OFFERED:
+        raise HTTPException(status_code=409, detail="No pending offer for this waitlist entry")
+    _pass_on(db, entry, DECLINED)
+    db.commit()
+    db.refresh(entry)
+    return entry
+
+
+def leave_waitlist(db: Session, entry_id: int, patient_id: int) -> None:
+    entry = _locked_entry(db, entry_id, patient_id)
+    if entry.status == OFFERED:
+        _pass_on(db, entry, CANCELLED)
+    elif entry.status == WAITING:
+        entry.status = CANCELLED
+    else:
+        raise HTTPException(status_code=409, detail=f"Waitlist entry is already {entry.status}")
+    db.commit()
+
+
+class WaitlistOfferSweeper:
+    """Passes offers nobody answered within the hold on to the next patient in the queue."""
+
+    def __init__(
+        self,
+        session_factory=SessionLocal,
+        batch_size: int = config.WAITLIST_SWEEP_BATCH_SIZE,
+        interval: float = config.WAITLIST_SWEEP_INTERVAL_SECONDS,
+    ):
+        self.session_factory = session_factory
+        self.batch_size = batch_size
+        self.interval = interval
+        self._loop = None
+        self._wakeup = None
+        self._stopping = False
+
+    def sweep_batch(self) -> int:
+        """Expire one batch of offers; returns the number expired."""
+        db: Session = self.session_factory()
+        try:
+            entries = db.execute(
+                select(WaitlistEntry)
+                .where(WaitlistEntry.status == OFFERED, WaitlistEntry.offer_expires_at <= datetime.now())
+                .order_by(WaitlistEntry.offer_expires_at)
+                .limit(self.batch_size)
+                .with_for_update(skip_locked=True)
+            ).scalars().all()
+            for entry in entries:
+                _pass_on(db, entry, MISSED)
+            db.commit()
+            return len(entries)
+        except Exception:
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+    def sweep_once(self) -> int:
+        expired = 0
+        while not self._stopping:
+            count = self.sweep_batch()
+            expired += count
+            if count < self.batch_size:
+                break
+        return expired
+
+    async def run(self) -> None:
+        self._loop = asyncio.get_running_loop()
+        self._wakeup = asyncio.Event()
+        self._stopping = False
+        backoff = self.interval
+
+        while not self._stopping:
+            self._wakeup.clear()
+            try:
+                expired = await asyncio.to_thread(self.sweep_once)
+                if expired:
+                    logger.info("Waitlist sweep passed on %d expired offers", expired)
+                backoff = self.interval
+            except Exception:
+                logger.exception("Waitlist sweep failed")
+                backoff = min(backoff * 2, 30 * 60.0)
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=backoff)
+            except asyncio.TimeoutError:
+                pass
+
+    def stop(self) -> None:
+        self._stopping = True
+        if self._loop is not None:
+            self._loop.call_soon_threadsafe(self._wakeup.set)
+
+
+def main() -> None:
+    logging.basicConfig(level=logging.INFO)
+    sweeper = WaitlistOfferSweeper()
+    try:
+        asyncio.run(sweeper.run())
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,152 @@
+# utils/export.py
+"""
+Streaming encoders for bulk exports (CSV, NDJSON, Parquet).
+
+Rows come from a generator that owns its DB session and reads from a
+server-side cursor; each encoder turns rows into byte chunks as they arrive,
+so memory stays constant whatever the export size. Parquet needs pyarrow
+(optional dependency) and is written one row group at a time, with the
+schema built from the declared column types rather than guessed from the
+first rows (an all-NULL column would otherwise break a later row group).
+"""
+import csv
+import io
+import json
+from datetime import date, datetime, time
+from decimal import Decimal
+from functools import partial
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence
+
+from fastapi import HTTPException
+from fastapi.responses import StreamingResponse
+
+CHUNK_ROWS = 1000
+
+Row = Sequence[Any]
+# Column name -> "int", "float", "str", "bool", "date", "time" or "datetime"
+ColumnTypes = Dict[str, str]
+
+
+def _plain(value: Any) -> Any:
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "value"):  # enums
+        return value.value
+    return value
+
+
+def _chunks(rows: Iterable[Row], size: int = CHUNK_ROWS) -> Iterator[List[Row]]:
+    chunk = []
+    for row in rows:
+        chunk.append(row)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def encode_csv(columns: List[str], rows: Iterable[Row]) -> Iterator[bytes]:
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow(columns)
+    for chunk in _chunks(rows):
+        writer.writerows([[_plain(value) for value in row] for row in chunk])
+        yield buffer.getvalue().encode("utf-8")
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode("utf-8")
+
+
+def encode_ndjson(columns: List[str], rows: Iterable[Row]) -> Iterator[bytes]:
+    dumps = json.JSONEncoder(separators=(",", ":"), default=str).encode
+    for chunk in _chunks(rows):
+        yield "".join(
+            dumps({name: _plain(value) for name, value in zip(columns, row)}) + "\n" for row in chunk
+        ).encode("utf-8")
+
+
+class _Drain(io.RawIOBase):
+    """Write-only sink whose contents are taken after each row group."""
+
+    def __init__(self):
+        self._parts: List[bytes] = []
+
+    def writable(self) -> bool:
+        return True
+
+    def write(self, data) -> int:
+        self._parts.append(bytes(data))
+        return len(data)
+
+    def take(self) -> bytes:
+        data, self._parts = b"".join(self._parts), []
+        return data
+
+
+def _arrow_value(value: Any) -> Any:
+    if isinstance(value, Decimal):
+        return float(value)
+    if hasattr(value, "value"):  # enums
+        return value.value
+    return value
+
+
+def _arrow_schema(columns: List[str], types: ColumnTypes):
+    import pyarrow as pa
+
+    arrow_types = {
+        "int": pa.int64(), "float": pa.float64(), "str": pa.string(), "bool": pa.bool_(),
+        "date": pa.date32(), "time": pa.time64("us"), "datetime": pa.timestamp("us"),
+    }
+    return pa.schema([(name, arrow_types[types[name]]) for name in columns])
+
+
+def encode_parquet(columns: List[str], rows: Iterable[Row], types: ColumnTypes) -> Iterator[bytes]:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+
+    schema = _arrow_schema(columns, types)
+    sink = _Drain()
+    writer = pq.ParquetWriter(sink, schema)
+    for chunk in _chunks(rows, size=CHUNK_ROWS * 10):
+        writer.write_table(pa.table(
+            {name: [_arrow_value(row[i]) for row in chunk] for i, name in enumerate(columns)}, schema=schema
+        ))
+        yield sink.take()
+    writer.close()
+    yield sink.take()
+
+
+FORMATS = {
+    "csv": ("text/csv", "csv", encode_csv),
+    "ndjson": ("application/x-ndjson", "ndjson", encode_ndjson),
+    "parquet": ("application/vnd.apache.parquet", "parquet", encode_parquet),
+}
+
+
+def streaming_export(
+    name: str, fmt: str, columns: List[str], rows: Iterable[Row], types: Optional[ColumnTypes] = None
+) -> StreamingResponse:
+    """
+    Stream `rows` in the requested format. `rows` should be a generator that
+    opens its session on first iteration, so the session lives exactly as
+    long as the stream. Parquet needs `types` for every column.
+    """
+    if fmt not in FORMATS:
+        raise HTTPException(status_code=400, detail=f"Unknown format {fmt!r}; use one of {', '.join(FORMATS)}")
+    media_type, extension, encoder = FORMATS[fmt]
+    if fmt == "parquet":
+        try:
+            import pyarrow  # noqa: F401
+        except ImportError:
+            raise HTTPException(status_code=400, detail="Parquet export requires pyarrow on the server")
+        encoder = partial(encoder, types=types)
+    return StreamingResponse(
+        encoder(columns, rows),
+        media_type=media_type,
+        headers={"Content-Disposition": f'attachment; filename="{name}.{extension}"'},
+    )